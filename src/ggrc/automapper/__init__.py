@@ -17,7 +17,7 @@ from ggrc.models.mixins import ChangeTracked
 from ggrc.rbac.permissions import is_allowed_update
 from ggrc.services.common import get_cache
 from ggrc.services import signals
-from ggrc.utils import benchmark, with_nop
+from ggrc.utils import benchmark, list_chunks, with_nop
 
 
 # pylint: disable=invalid-name
@@ -39,9 +39,11 @@ class AutomapperGenerator(object):
 
   def __init__(self, use_benchmark=True):
     self.processed = set()
-    self.queue = set()
+    # queued entries mapped to the relationship whose automappings they are
+    self.queue = dict()
     self.cache = collections.defaultdict(set)
     self.instance_cache = {}
+    self.permission_cache = {}
     self.auto_mappings = set()
     if use_benchmark:
       self.benchmark = benchmark
@@ -55,6 +57,14 @@ class AutomapperGenerator(object):
     # results in a few steps. This drastically reduces number of queries.
     stubs = {s for rel in self.queue for s in rel}
     stubs.add(obj)
+    self._prefetch(stubs)
+    return self.cache[obj]
+
+  def _prefetch(self, stubs):
+    """Load neighborhoods and instances of objects into the caches."""
+    stubs = {s for s in stubs if s not in self.cache}
+    if not stubs:
+      return
     # Union is here to convince mysql to use two separate indices and
     # merge te results. Just using `or` results in a full-table scan
     # Manual column list avoids loading the full object which would also try to
@@ -72,6 +82,9 @@ class AutomapperGenerator(object):
                    Relationship.destination_id).in_(
                        [(s.type, s.id) for s in stubs]))
     ).all()
+    # we queried complete neighborhoods of all stubs, including empty ones
+    for stub in stubs:
+      self.cache[stub] = set()
     batch_requests = collections.defaultdict(set)
     for (src_type, src_id, dst_type, dst_id) in relationships:
       src = Stub(src_type, src_id)
@@ -90,7 +103,6 @@ class AutomapperGenerator(object):
       instances = model.query.filter(model.id.in_(ids))
       for instance in instances:
         self.instance_cache[Stub(type_, instance.id)] = instance
-    return self.cache[obj]
 
   def relate(self, src, dst):
     if src < dst:
@@ -106,14 +118,15 @@ class AutomapperGenerator(object):
       # neighborhood
       src = Stub.from_source(relationship)
       dst = Stub.from_destination(relationship)
-      self._step(src, dst)
-      self._step(dst, src)
+      self._step(src, dst, relationship)
+      self._step(dst, src, relationship)
       count = 0
       while len(self.queue) > 0:
         if len(self.auto_mappings) > rules.count_limit:
           break
         count += 1
-        src, dst = entry = self.queue.pop()
+        entry, _ = self.queue.popitem()
+        src, dst = entry
 
         if not (self._can_map_to(src, relationship) and
                 self._can_map_to(dst, relationship)):
@@ -125,8 +138,9 @@ class AutomapperGenerator(object):
           # If the edge already exists it means that auto mappings for it have
           # already been processed and it is safe to cut here.
           continue
-        self._step(src, dst)
-        self._step(dst, src)
+        self.auto_mappings.add(entry)
+        self._step(src, dst, relationship)
+        self._step(dst, src, relationship)
 
       if len(self.auto_mappings) <= rules.count_limit:
         self._flush(relationship)
@@ -135,12 +149,92 @@ class AutomapperGenerator(object):
             'automapping_limit_exceeded': True
         }
 
+  def generate_automappings_bulk(self, relationships):
+    """Generate automappings of many relationships at once.
+
+    Rule closure of all relationships is explored with a single queue, so
+    neighborhoods of queued objects are fetched together for all of them. A
+    mapping belongs to the relationship that reached it first and the count
+    limit applies to every relationship separately. Mappings of all
+    relationships are written at the end.
+
+    Args:
+      relationships: list of new Relationship instances.
+    """
+    with self.benchmark("Automapping generate_automappings_bulk"):
+      mappings = collections.OrderedDict(
+          (relationship, set()) for relationship in relationships)
+      posted = set()
+      for relationship in relationships:
+        posted.add(self.relate(Stub.from_source(relationship),
+                               Stub.from_destination(relationship)))
+      self._prefetch({stub for entry in posted for stub in entry})
+
+      # initial relationships are special since they are already created, so
+      # we manually enqueue their neighborhoods
+      for relationship in relationships:
+        src = Stub.from_source(relationship)
+        dst = Stub.from_destination(relationship)
+        self._step(src, dst, relationship)
+        self._step(dst, src, relationship)
+
+      while self.queue:
+        entry, relationship = self.queue.popitem()
+        if len(mappings[relationship]) > rules.count_limit:
+          continue
+        src, dst = entry
+
+        if not (self._can_map_to(src, relationship) and
+                self._can_map_to(dst, relationship)):
+          continue
+
+        created = self._ensure_relationship(src, dst)
+        self.processed.add(entry)
+        if not created:
+          continue
+        mappings[relationship].add(entry)
+        self._step(src, dst, relationship)
+        self._step(dst, src, relationship)
+
+      for_insert = collections.OrderedDict()
+      for relationship, auto_mappings in mappings.iteritems():
+        if len(auto_mappings) <= rules.count_limit:
+          for_insert[relationship] = auto_mappings - posted
+        else:
+          relationship._json_extras = {
+              'automapping_limit_exceeded': True
+          }
+      self._insert(for_insert)
+
   def _can_map_to(self, obj, parent_relationship):
-    return is_allowed_update(obj.type, obj.id, parent_relationship.context)
+    key = (obj, parent_relationship.context)
+    if key not in self.permission_cache:
+      self.permission_cache[key] = is_allowed_update(
+          obj.type, obj.id, parent_relationship.context)
+    return self.permission_cache[key]
 
   def _flush(self, parent_relationship):
     if len(self.auto_mappings) == 0:
       return
+    original = self.relate(Stub.from_source(parent_relationship),
+                           Stub.from_destination(parent_relationship))
+    self._insert({parent_relationship: {
+        entry for entry in self.auto_mappings
+        if entry != original  # entries are sorted
+    }})
+
+  def _insert(self, auto_mappings):
+    """Write automappings of parent relationships.
+
+    Args:
+      auto_mappings: dict of sets of (src, dst) stub pairs by the
+        relationships that caused them.
+    """
+    rows = [(parent_relationship, src, dst)
+            for parent_relationship, entries in auto_mappings.iteritems()
+            for src, dst in entries]
+    if not rows:
+      return
     with self.benchmark("Automapping flush"):
       current_user = get_current_user()
       now = datetime.now()
@@ -150,52 +244,59 @@ class AutomapperGenerator(object):
       # it means that the mapping was already created by another request
       # and we can safely ignore it.
       inserter = Relationship.__table__.insert().prefix_with("IGNORE")
-      original = self.relate(Stub.from_source(parent_relationship),
-                             Stub.from_destination(parent_relationship))
-      db.session.execute(inserter.values([{
-          "id": None,
-          "modified_by_id": current_user.id,
-          "created_at": now,
-          "updated_at": now,
-          "source_id": src.id,
-          "source_type": src.type,
-          "destination_id": dst.id,
-          "destination_type": dst.type,
-          "context_id": None,
-          "status": None,
-          "automapping_id": parent_relationship.id}
-          for src, dst in self.auto_mappings
-          if (src, dst) != original]))  # (src, dst) is sorted
+      for chunk in list_chunks(rows):
+        db.session.execute(inserter.values([{
+            "id": None,
+            "modified_by_id": current_user.id,
+            "created_at": now,
+            "updated_at": now,
+            "source_id": src.id,
+            "source_type": src.type,
+            "destination_id": dst.id,
+            "destination_type": dst.type,
+            "context_id": None,
+            "status": None,
+            "automapping_id": parent_relationship.id}
+            for parent_relationship, src, dst in chunk]))
       cache = get_cache(create=True)
       if cache:
         # Add inserted relationships into new objects collection of the cache,
         # so that they will be logged within event and appropriate revisions
         # will be created.
-        cache.new.update(
-            (relationship, relationship.log_json())
-            for relationship in Relationship.query.filter_by(
-                automapping_id=parent_relationship.id,
-                modified_by_id=current_user.id,
-                created_at=now,
-                updated_at=now,
-            )
-        )
-
-  def _step(self, src, dst):
+        for chunk in list_chunks(rows):
+          cache.new.update(
+              (relationship, relationship.log_json())
+              for relationship in Relationship.query.filter(
+                  Relationship.modified_by_id == current_user.id,
+                  Relationship.created_at == now,
+                  Relationship.updated_at == now,
+                  tuple_(
+                      Relationship.source_type,
+                      Relationship.source_id,
+                      Relationship.destination_type,
+                      Relationship.destination_id,
+                  ).in_([(src.type, src.id, dst.type, dst.id)
+                         for _, src, dst in chunk]),
+              )
+          )
+
+  def _enqueue(self, entry, relationship):
+    if entry not in self.processed:
+      self.queue.setdefault(entry, relationship)
+
+  def _step(self, src, dst, relationship):
     explicit, implicit = rules[src.type, dst.type]
-    self._step_explicit(src, dst, explicit)
-    self._step_implicit(src, dst, implicit)
+    self._step_explicit(src, dst, explicit, relationship)
+    self._step_implicit(src, dst, implicit, relationship)
 
-  def _step_explicit(self, src, dst, explicit):
+  def _step_explicit(self, src, dst, explicit, relationship):
     if len(explicit) != 0:
       src_related = (o for o in self.related(src)
                      if o.type in explicit and o != dst)
       for r in src_related:
-        entry = self.relate(r, dst)
-        if entry not in self.processed:
-          self.queue.add(entry)
+        self._enqueue(self.relate(r, dst), relationship)
 
-  def _step_implicit(self, src, dst, implicit):
+  def _step_implicit(self, src, dst, implicit, relationship):
     if not hasattr(models.all_models, src.type):
       logger.warning('Automapping by attr: cannot find model %s', src.type)
       return
@@ -215,9 +316,8 @@ class AutomapperGenerator(object):
           values = [values]
         for value in values:
           if value is not None:
-            entry = self.relate(Stub(value.type, value.id), dst)
-            if entry not in self.processed:
-              self.queue.add(entry)
+            self._enqueue(self.relate(Stub(value.type, value.id), dst),
+                          relationship)
           else:
             logger.warning('Automapping by attr: %s is None', attr.name)
       else:
@@ -232,8 +332,6 @@ class AutomapperGenerator(object):
     if src in self.cache.get(dst, []):
       return False
 
-    self.auto_mappings.add((src, dst))
-
     if src in self.cache:
       self.cache[src].add(dst)
     if dst in self.cache:
@@ -256,13 +354,13 @@ def register_automapping_listeners():
     Args:
       objects: list of relationship Models.
     """
+    if any(obj is None for obj in objects):
+      logger.warning("Automapping listener: no obj, no mappings created")
+      return
     automapper = AutomapperGenerator()
-    for obj in objects:
-      if obj is None:
-        logger.warning("Automapping listener: no obj, no mappings created")
-        return
-      automapper.generate_automappings(obj)
+    automapper.generate_automappings_bulk(objects)
 
+    for obj in objects:
       if obj.source_type != u"Comment" and obj.destination_type != u"Comment":
         continue
 
@@ -3,5 +3,6 @@
 
 
 from .localcache import LocalCache
+from .localcache import get_local_cache
 from .memcache import MemCache
 from .cachemanager import CacheManager
@@ -147,7 +147,8 @@ class CacheManager:
     Args:
       data: keys for bulk get
     Returns:
-     Result of cache get_multi
+     dictionary of keys found in cache and their values, keys that are not
+     in cache are left out
     """
     return self.cache_object.get_multi(data)
 
@@ -157,7 +158,7 @@ class CacheManager:
     Args:
       data: keys for bulk add
     Returns:
-     Result of cache add_multi
+     list of keys that were not added
     """
     return self.cache_object.add_multi(data, expiration_time)
 
@@ -170,13 +171,11 @@ class CacheManager:
     Args:
       data: keys for bulk update
     Returns:
-     Result of cache update_multi
+     list of keys present in cache that were not updated
     """
     get_result = self.cache_object.get_multi(data.keys())
-    for data_key, data_value in data.items():
-      for update_key, update_value in data_value.items():
-        if data_key in get_result:
-          get_result[data_key][update_key] = update_value
+    for data_key, data_value in get_result.items():
+      data_value.update(data[data_key])
     return self.cache_object.update_multi(get_result, expiration_time)
 
   def bulk_delete(self, data, lockadd_seconds):
@@ -185,7 +184,7 @@ class CacheManager:
     Args:
       data: keys for bulk delete
     Returns:
-     Result of cache remove_multi
+     True if all keys were deleted or were not in cache, False otherwise
     """
     return self.cache_object.remove_multi(data, lockadd_seconds)
 
@@ -1,9 +1,17 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import cPickle
+import random
+import threading
+import time
+from collections import Counter
 from collections import OrderedDict
+from collections import defaultdict
+
 from cache import Cache
 from cache import all_cache_entries
+from ggrc import settings
 
 """
 LocalCache implements the caching mechanism that is local to
@@ -15,27 +23,197 @@ class LocalCache(Cache):
   """ LocalCache inherits from cache and it provides caching mechanism that is
       local to a particular GGRC instance
 
+      Entries are kept in least recently used order and the cache is bounded
+      by the number of entries, their total pickled size and a time to live.
+      Values are stored pickled, so that callers can modify returned values
+      without changing the cached ones.
+
+      Entries can be stored with the generation of their resource type kept
+      in memcache. Every instance increments the generation of a resource
+      type when it invalidates its entries, so entries stored with an older
+      generation are discarded by all instances.
+
       Attributes:
-        cache_entries: Ordered dictionary containing resource id as key and
-        value as JSON object (dictionary)
+        cache_entries: Ordered dictionary containing cache key as key and
+        (expiration time, size, pickled value, generation) tuple as value
+        stats: hits and misses per resource type
   """
 
-  cache_entries = OrderedDict()
-
-  def __init__(self):
+  def __init__(self, max_entries=None, max_bytes=None, ttl=None):
     self.name = 'local'
+    self.max_entries = max_entries or settings.LOCAL_CACHE_MAX_ENTRIES
+    self.max_bytes = max_bytes or settings.LOCAL_CACHE_MAX_BYTES
+    self.ttl = settings.LOCAL_CACHE_TTL if ttl is None else ttl
+    self.cache_entries = OrderedDict()
+    self.size = 0
+    self.stats = defaultdict(Counter)
+    self.lock = threading.Lock()
 
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural] = \
             cache_entry.class_name
 
-    for key in self.supported_resources.keys():
-      self.cache_entries['collection:' + key] = {}
-
   def get_name(self):
     return self.name
 
+  @staticmethod
+  def get_resource_type(key):
+    """Get resource type of a "collection:<type>:<id>" cache key."""
+    parts = key.split(":")
+    return parts[1] if len(parts) > 2 else parts[0]
+
+  @staticmethod
+  def get_generation_key(resource_type):
+    """Get memcache key of the generation of a resource type."""
+    return "LocalCacheGeneration:" + resource_type
+
+  def get_generations(self, memcache_client, keys):
+    """ Get current generations of resource types of the given keys
+
+    Generations missing in memcache are initialized with a random value, so
+    that entries stored before the generation was evicted from memcache do
+    not match the new one.
+
+    Args:
+      memcache_client: client of the memcache shared by all instances
+      keys: list of cache keys
+
+    Returns:
+      dictionary of generation keys and their values
+    """
+    generation_keys = list({
+        self.get_generation_key(self.get_resource_type(key)) for key in keys
+    })
+    generations = memcache_client.get_multi(generation_keys)
+    missing = {key: random.randint(1, 2 ** 31) for key in generation_keys
+               if key not in generations}
+    if missing:
+      memcache_client.add_multi(missing)
+      generations.update(memcache_client.get_multi(missing.keys()))
+    return generations
+
+  def invalidate(self, memcache_client, keys):
+    """ Remove entries from local caches of all instances
+
+    Args:
+      memcache_client: client of the memcache shared by all instances
+      keys: list of cache keys
+    """
+    self.remove_multi(keys)
+    for generation_key in {self.get_generation_key(self.get_resource_type(key))
+                           for key in keys}:
+      memcache_client.incr(generation_key)
+
+  def _get_generation(self, key, generations):
+    return generations.get(
+        self.get_generation_key(self.get_resource_type(key)))
+
+  def _pop(self, key):
+    _, size, _, _ = self.cache_entries.pop(key)
+    self.size -= size
+
+  def _evict(self):
+    """Remove least recently used entries until the cache fits its bounds."""
+    while self.cache_entries and (len(self.cache_entries) > self.max_entries or
+                                  self.size > self.max_bytes):
+      self._pop(next(iter(self.cache_entries)))
+
+  def get_multi(self, keys, generations=None):
+    """ Get entries from local cache
+
+    Args:
+      keys: list of cache keys
+      generations: current generations from get_generations, entries stored
+        with other generations are discarded
+
+    Returns:
+      dictionary of found keys and their values
+    """
+    result = {}
+    now = time.time()
+    with self.lock:
+      for key in keys:
+        entry = self.cache_entries.get(key)
+        if entry is not None and (
+            entry[0] < now or
+            generations is not None and (
+                entry[3] is None or
+                entry[3] != self._get_generation(key, generations))):
+          self._pop(key)
+          entry = None
+        if entry is None:
+          self.stats[self.get_resource_type(key)]["misses"] += 1
+          continue
+        # move the entry to the most recently used end
+        del self.cache_entries[key]
+        self.cache_entries[key] = entry
+        self.stats[self.get_resource_type(key)]["hits"] += 1
+        result[key] = entry[2]
+    return {key: cPickle.loads(value) for key, value in result.iteritems()}
+
+  def add_multi(self, data, expiration_time=0, generations=None):
+    """ Add or replace entries in local cache
+
+    Args:
+      data: dictionary of cache keys and values
+      expiration_time: time to live in seconds, defaults to the cache ttl
+      generations: generations from get_generations read before the values
+        were loaded
+
+    Returns:
+      list of keys that were not stored
+    """
+    generations = generations or {}
+    expires_at = time.time() + (expiration_time or self.ttl)
+    pickled = {key: cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+               for key, value in data.iteritems()}
+    failed = []
+    with self.lock:
+      for key, value in pickled.iteritems():
+        if len(value) > self.max_bytes:
+          failed.append(key)
+          continue
+        if key in self.cache_entries:
+          self._pop(key)
+        self.cache_entries[key] = (expires_at, len(value), value,
+                                   self._get_generation(key, generations))
+        self.size += len(value)
+      self._evict()
+    return failed
+
+  def update_multi(self, data, expiration_time=0):
+    """ Update entries that are already in local cache
+
+    Args:
+      data: dictionary of cache keys and values
+      expiration_time: time to live in seconds, defaults to the cache ttl
+
+    Returns:
+      list of keys that were not stored
+    """
+    with self.lock:
+      missing = [key for key in data if key not in self.cache_entries]
+    existing = dict(data)
+    for key in missing:
+      del existing[key]
+    return missing + self.add_multi(existing, expiration_time)
+
+  def remove_multi(self, data, lockadd_seconds=0):
+    """ Remove entries from local cache
+
+    Args:
+      data: list of cache keys
+
+    Returns:
+      True
+    """
+    with self.lock:
+      for key in data:
+        if key in self.cache_entries:
+          self._pop(key)
+    return True
+
   def get(self, category, resource, filter):
     """ Get data from local cache for the specified filter
 
@@ -45,29 +223,31 @@ class LocalCache(Cache):
       filter: dictionary containing ids and optional attrs
 
     Returns:
-      All or None policy is applied by default
       None on any errors
-      Mapping of DTO formatted string, e.g. JSON string representation
+      otherwise mapping of ids found in cache to their JSON representation,
+      ids missing in cache are left out
     """
     if not self.is_caching_supported(category, resource):
       return None
 
     cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return None
-
-    entries = self.cache_entries.get(cache_key)
-    if entries is None:
-      return None
-
     ids, attrs = self.parse_filter(filter)
-    if ids is None and attrs is None:
+    if ids is None:
       return None
-    else:
-      if ids is None:
-        return self.get_data(entries.keys(), entries, attrs)
+
+    keys = OrderedDict((cache_key + ":" + str(id_), id_) for id_ in ids)
+    entries = self.get_multi(keys.keys())
+    data = OrderedDict()
+    for key, id_ in keys.iteritems():
+      if key not in entries:
+        continue
+      attrvalues = entries[key]
+      if attrs is None or attrvalues is None:
+        data[id_] = attrvalues
       else:
-        return self.get_data(ids, entries, attrs)
+        data[id_] = {attr: attrvalues[attr] for attr in attrs
+                     if attr in attrvalues}
+    return data
 
   def add(self, category, resource, data, expiration_time=0):
     """ Add data to local cache for the specified data
@@ -84,96 +264,84 @@ class LocalCache(Cache):
     if not self.is_caching_supported(category, resource):
       return None
     cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return None
-    if self.cache_entries is None:
-      return None
-    entries = self.cache_entries.get(cache_key)
-    if entries is None:
+    if self.add_multi({cache_key + ":" + str(key): value
+                       for key, value in data.iteritems()}, expiration_time):
       return None
-
-    # TODO(dan): Should we perform deep copy of data
-    for key in data.keys():
-      entries[key] = data.get(key)
-
-    return entries
+    return data
 
   def update(self, category, resource, data, expiration_time=0):
     """ Update data in local cache for the specified data
-    TODO(dan): updates is not available for local cache
-    """
-    return None
 
-  def remove(self, category, resource, data, lockadd_seconds=0):
-    """ Remove data from local cache for the specified data
     Args:
       category: collection or stub
       resource: regulation, controls, etc.
-      data: List of keys
+      data: dictionary containing ids and attrs
 
     Returns:
       None on any errors
-      mapping of DTO formatted string, e.g. JSON string representation
+      Mapping of DTO formatted string, e.g. JSON string representation
     """
     if not self.is_caching_supported(category, resource):
       return None
     cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return None
-    if self.cache_entries is None:
+    if self.update_multi({cache_key + ":" + str(key): value
+                          for key, value in data.iteritems()},
+                         expiration_time):
       return None
-    entries = self.cache_entries.get(cache_key)
-
-    for key in data.keys():
-      del entries[key]
-
-    return entries
+    return data
 
-  def get_data(self, keys, cacheitems, attrs):
-    """ Get data from cache for the given set of keys and attributes in cache
-        TODO(dan): all or none default policy is implemeted here, it should be
-        in cachemanager
+  def remove(self, category, resource, data, lockadd_seconds=0):
+    """ Remove data from local cache for the specified data
     Args:
-      keys: set of keys to search from local cache
-      cacheitems: cache entries
-      attrs:  set of attributes to search from local cache
+      category: collection or stub
+      resource: regulation, controls, etc.
+      data: List of keys
 
     Returns:
       None on any errors
       mapping of DTO formatted string, e.g. JSON string representation
     """
-    data = OrderedDict()
-
-    for key in keys:
-      if key not in cacheitems:
-        #  ALL or None Policy: if a key is not in cache, stop processing and
-        #  continue as before going to Data-ORM layer
-        return None
-      attrvalues = cacheitems.get(key)
-      targetattrs = None
-      if attrs is None and attrvalues is not None:
-        targetattrs = attrvalues.keys()
-      elif attrvalues is None:
-        # Do nothing as there are no attrs to get
-        continue
-      else:
-        targetattrs = attrs
-
-      attr_dict = {}
-      for attr in targetattrs:
-        if attr in attrvalues:
-          attr_dict[attr] = attrvalues.get(attr)
-
-      data[key] = attr_dict
-
+    if not self.is_caching_supported(category, resource):
+      return None
+    cache_key = self.get_key(category, resource)
+    self.remove_multi([cache_key + ":" + str(key) for key in data])
     return data
 
+  def get_stats(self):
+    """ Get hit and miss counts and hit ratios per resource type
+    """
+    with self.lock:
+      stats = {resource_type: dict(counts)
+               for resource_type, counts in self.stats.iteritems()}
+    for counts in stats.itervalues():
+      requests = counts.get("hits", 0) + counts.get("misses", 0)
+      counts["hit_ratio"] = (float(counts.get("hits", 0)) / requests
+                             if requests else 0.0)
+    return stats
+
   def clean(self):
     """ Cleanup
     """
-    self.cache_entries.clear()
+    with self.lock:
+      self.cache_entries.clear()
+      self.size = 0
+    return True
 
   def __repr__(self):
     """ Print content of cache
     """
-    return str(self.cache_entries.keys()) + str(self.cache_entries.values())
+    return str(self.cache_entries.keys())
+
+
+_local_cache = None  # pylint: disable=invalid-name
+_local_cache_lock = threading.Lock()  # pylint: disable=invalid-name
+
+
+def get_local_cache():
+  """Get the local cache instance shared by the whole process."""
+  global _local_cache  # pylint: disable=global-statement,invalid-name
+  if _local_cache is None:
+    with _local_cache_lock:
+      if _local_cache is None:
+        _local_cache = LocalCache()
+  return _local_cache
@@ -2,29 +2,59 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
-from google.appengine.api import memcache
+import cPickle
+import threading
+import time
+from collections import OrderedDict
+
 from cache import Cache
 from cache import all_cache_entries
-from collections import OrderedDict
-from copy import deepcopy
+from ggrc import settings
+from ggrc.extensions import get_extension_module
+from ggrc.extensions import get_extension_name
+from ggrc.utils import list_chunks
 
 """
     Memcache implements the remote AppEngine Memcache mechanism
 
 """
+
+DEFAULT_CLIENT = "google.appengine.api.memcache.Client"
+
+
+def get_client_class():
+  """Get memcache client class set in the MEMCACHE_CLIENT setting.
+
+  The client must implement the multi key methods of the AppEngine memcache
+  client, which allows running the cache against a stand-in outside
+  AppEngine.
+  """
+  client_name = get_extension_name("MEMCACHE_CLIENT", DEFAULT_CLIENT)
+  module_name, class_name = client_name.rsplit(".", 1)
+  return getattr(get_extension_module(module_name), class_name)
+
+
 class MemCache(Cache):
-  def __init__(self):
+  def __init__(self, client=None):
     self.name = 'memcache'
-    self.client = None
 
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
+    self.memcache_client = client or get_client_class()()
 
   def get_name(self):
     return self.name
 
+  def get_ids_keys(self, category, resource, ids):
+    """ Get memcache keys of resource ids
+
+    Returns:
+      ordered mapping of memcache keys to ids
+    """
+    cache_key = self.get_key(category, resource)
+    return OrderedDict((cache_key + ":" + str(id), id) for id in ids)
+
   def get(self, category, resource, filter):
     """ get items from mem cache for specified filter
 
@@ -34,44 +64,33 @@ class MemCache(Cache):
       filter: dictionary containing ids and optional attrs
 
     Returns:
-      All or None policy is applied by default
       None on any errors
-      otherwise returns JSON string representation
+      otherwise mapping of ids found in cache to their JSON representation,
+      ids missing in cache are left out
     """
 
     if not self.is_caching_supported(category, resource):
       return None
-    # TODO(dan): use memcache.Client.get_multi() instead of gets()
-    #
-    data = OrderedDict()
-    cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return  None
     ids, attrs = self.parse_filter(filter)
-    if ids is None and attrs is None:
+    if ids is None:
       return None
-    else:
-      if ids is None:
-        return None
-    for id in ids:
-      attrvalues= self.memcache_client.gets(cache_key + ":" + str(id))
-      if attrvalues is not None:
-        if attrs is None:
-          data[id] = attrvalues
-        else:
-          attr_dict = OrderedDict()
-          for attr in attrs:
-            if attrvalues.has_key(attr):
-              attr_dict[attr] = deepcopy(attrvalues.get(attr))
-          data[id] = attr_dict
+    keys = self.get_ids_keys(category, resource, ids)
+    values = self.get_multi(keys.keys())
+    data = OrderedDict()
+    for key, id in keys.iteritems():
+      if key not in values:
+        continue
+      attrvalues = values[key]
+      if attrs is None:
+        data[id] = attrvalues
       else:
-        # All or None policy is enforced, if one of the objects is not available in cache, then we return empty
-        # TODO(dan): cannot distinguish network failures vs id not found in memcache, both scenarios return empty list
-        return None
+        # values are unpickled for every call so they are not shared
+        data[id] = OrderedDict((attr, attrvalues[attr]) for attr in attrs
+                               if attr in attrvalues)
     return data
 
   def add(self, category, resource, data, expiration_time=0):
-    """ add data to mem cache
+    """ add data to mem cache, replacing existing entries
 
     Args:
       category: collection or stub
@@ -80,35 +99,20 @@ class MemCache(Cache):
 
     Returns:
       None on any errors
-      Mapping of DTO formatted string, e.g. JSON string representation
+      otherwise mapping of stored ids to their data
     """
     if not self.is_caching_supported(category, resource):
       return None
-    entries = {}
-    cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return None
-    # TODO(dan): use memcache.Client.add_multi() instead of add()
-    for key in data.keys():
-      id = cache_key + ":" + str(key)
-      cache_data = self.memcache_client.gets(id)
-      if cache_data is None:
-        if self.memcache_client.add(id, data.get(key), expiration_time) is False:
-          # We stop processing any further
-          # TODO(ggrcdev): Should we throw exceptions and/or log critical events
-          return None
-        else:
-          entries[key] = data
-      else:
-        # This could occur on import scenarios
-        #
-        if self.memcache_client.cas(id, data.get(key), expiration_time) is False:
-          # We stop processing any further
-          # TODO(ggrcdev): Should we throw exceptions and/or log critical events
-          return None
-        else:
-          entries[key] = data
-    return entries
+    keys = self.get_ids_keys(category, resource, data.keys())
+    mapping = {key: data[id] for key, id in keys.iteritems()}
+    # add fails for entries that are already in cache, which could occur on
+    # import scenarios, those are replaced with compare and set
+    existing = self.add_multi(mapping, expiration_time)
+    current = self.get_multi(existing)
+    failed = set(key for key in existing if key not in current)
+    failed.update(self.update_multi(
+        {key: mapping[key] for key in current}, expiration_time))
+    return {id: data[id] for key, id in keys.iteritems() if key not in failed}
 
   def update(self, category, resource, data, expiration_time):
     """ Update items from mem cache for specified data
@@ -120,25 +124,17 @@ class MemCache(Cache):
 
     Returns:
       None on any errors
-      Mapping of DTO formatted string, e.g. JSON string representation
+      otherwise mapping of updated ids to their data, ids that are not in
+      cache are left out
     """
     if not self.is_caching_supported(category, resource):
       return None
-    entries = {}
-    cache_key = self.get_key(category, resource)
-    if cache_key is None:
-      return None
-    # TODO(ggrcdev): use memcache.Client.cas_multi(), get_multi() instead of cas(), gets()
-    #
-    for key in data.keys():
-      id = cache_key + ":" + str(key)
-      if self.memcache_client.cas(id, data.get(key), expiration_time) is False:
-        # RPC Error or value is not id is not found in cache.
-        # Cannot proceed further with update (All or None) policy
-        return None
-      else:
-        entries[key] = data
-    return entries
+    keys = self.get_ids_keys(category, resource, data.keys())
+    current = self.get_multi(keys.keys())
+    failed = set(key for key in keys if key not in current)
+    failed.update(self.update_multi(
+        {key: data[keys[key]] for key in current}, expiration_time))
+    return {id: data[id] for key, id in keys.iteritems() if key not in failed}
 
   def remove(self, category, resource, data, lockadd_seconds=0):
     """ delete items from mem cache for specified data
@@ -154,89 +150,196 @@ class MemCache(Cache):
     """
     if not self.is_caching_supported(category, resource):
       return None
-    entries = {}
-    cache_key = self.get_key(category, resource)
-    if cache_key is None:
+    keys = self.get_ids_keys(category, resource, data)
+    if not self.remove_multi(keys.keys(), lockadd_seconds):
+      # Network failure, the entries could still be in cache
       return None
-    # TODO(dan): use memcache.Client.delete_multi(), get_multi() instead of delete(), gets()
-    #
-    for key in data.keys():
-      id = cache_key + ":" + str(key)
-      retvalue = self.memcache_client.delete(id, lockadd_seconds)
-      # Log the event of delete failures
-      if retvalue is 0:
-        # retvalue of 0 indicates Network failure, Cannot proceed further with delete (All or None) policy
-        return None
-      elif retvalue is 2:
-        # retvalue of 2 indicates Success
-        entries[key] = data
-      elif retvalue is 1:
-        # retvalue of 1 indicates id is not present in memcache (could be expired), proceed with next entry
-        continue
-      else:
-        # Any other return value, Cannot proceed further with delete (All or None) policy
-        #
-        return None
-    return entries
+    return {id: data for id in keys.itervalues()}
 
   def add_multi(self, data, expiration_time=0):
     """ Add multiple entries to memcache
     There are limits to size of data in memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids and dictionary of attrs
+      data: dictionary of keys and values
 
     Returns:
-      memcache client API add_multi
+      list of keys that were not added
     """
-    # TODO(dan): import scenarios, add will return non-empty list, we should invoke update_multi for those items
-    #
-    return self.memcache_client.add_multi(data, expiration_time)
+    failed = []
+    for keys in list_chunks(data.keys(), settings.MEMCACHE_BATCH_SIZE):
+      failed.extend(self.memcache_client.add_multi(
+          {key: data[key] for key in keys}, expiration_time))
+    return failed
 
   def get_multi(self, data):
     """ Get multiple entries from memcache
     There are limits to size of data in memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids
+      data: list of keys
 
     Returns:
-      memcache client API get_multi
+      dictionary of found keys and their values, the values can be updated
+      with update_multi
     """
-    return self.memcache_client.get_multi(data, '', None, True)
+    result = {}
+    for keys in list_chunks(list(data), settings.MEMCACHE_BATCH_SIZE):
+      result.update(self.memcache_client.get_multi(keys, for_cas=True))
+    return result
 
   def update_multi(self, data, expiration_time=0):
-    """ update multiple entries to memcache
+    """ update multiple entries that are already in memcache
     There are limits to size of data in memcache
 
+    The entries must have been read with get_multi of this cache first, so
+    that the compare and set can detect concurrent changes.
+
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids and dictionary of attrs
+      data: dictionary of keys and values
 
     Returns:
-      memcache client API cas_multi (compare and set)
+      list of keys that were not updated
     """
-    return self.memcache_client.cas_multi(data, expiration_time)
+    failed = []
+    for keys in list_chunks(data.keys(), settings.MEMCACHE_BATCH_SIZE):
+      failed.extend(self.memcache_client.cas_multi(
+          {key: data[key] for key in keys}, expiration_time))
+    return failed
 
-  def remove_multi(self, data, lockadd_seconds):
+  def remove_multi(self, data, lockadd_seconds=0):
     """ delete multiple entries to memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
       data:  list of keys
 
     Returns:
-      memcache client API delete_multi
+      True if all entries were deleted or were not in cache, False on errors
     """
-    return self.memcache_client.delete_multi(data, lockadd_seconds)
+    success = True
+    for keys in list_chunks(list(data), settings.MEMCACHE_BATCH_SIZE):
+      success = self.memcache_client.delete_multi(
+          keys, lockadd_seconds) and success
+    return success
 
   def clean(self):
     """ flush everything from memcache """
     return self.memcache_client.flush_all()
 
+
+class LocalMemcacheClient(object):
+  """In process stand-in for the AppEngine memcache client.
+
+  Implements the client methods used by GGRC on a dictionary shared by all
+  clients in the process. Values are pickled like in memcache. Set the
+  MEMCACHE_CLIENT setting to "ggrc.cache.memcache.LocalMemcacheClient" to
+  run the cache outside AppEngine, e.g. for benchmarks.
+  """
+
+  _data = {}
+  _lock = threading.Lock()
+
+  def __init__(self):
+    self._cas_values = {}
+
+  def _get_entry(self, key):
+    entry = self._data.get(key)
+    if entry is not None and entry[0] and entry[0] < time.time():
+      del self._data[key]
+      return None
+    return entry
+
+  @staticmethod
+  def _expires_at(expiration_time):
+    return time.time() + expiration_time if expiration_time else 0
+
+  def get(self, key):
+    return self.get_multi([key]).get(key)
+
+  def gets(self, key):
+    return self.get_multi([key], for_cas=True).get(key)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    # pylint: disable=unused-argument
+    result = {}
+    with self._lock:
+      for key in keys:
+        entry = self._get_entry(key_prefix + key)
+        if entry is None:
+          continue
+        if for_cas:
+          self._cas_values[key_prefix + key] = entry[1]
+        result[key] = cPickle.loads(entry[1])
+    return result
+
+  def _store_multi(self, mapping, time_, key_prefix, should_store):
+    failed = []
+    with self._lock:
+      for key, value in mapping.iteritems():
+        entry = self._get_entry(key_prefix + key)
+        if not should_store(key_prefix + key, entry):
+          failed.append(key)
+          continue
+        self._data[key_prefix + key] = (
+            self._expires_at(time_),
+            cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL),
+        )
+    return failed
+
+  def set(self, key, value, time=0):  # pylint: disable=redefined-outer-name
+    return not self.set_multi({key: value}, time)
+
+  def set_multi(self, mapping, time=0, key_prefix='', **_):
+    # pylint: disable=redefined-outer-name
+    return self._store_multi(mapping, time, key_prefix,
+                             lambda key, entry: True)
+
+  def add(self, key, value, time=0):  # pylint: disable=redefined-outer-name
+    return not self.add_multi({key: value}, time)
+
+  def add_multi(self, mapping, time=0, key_prefix='', **_):
+    # pylint: disable=redefined-outer-name
+    return self._store_multi(mapping, time, key_prefix,
+                             lambda key, entry: entry is None)
+
+  def cas(self, key, value, time=0):  # pylint: disable=redefined-outer-name
+    return not self.cas_multi({key: value}, time)
+
+  def cas_multi(self, mapping, time=0, key_prefix='', **_):
+    # pylint: disable=redefined-outer-name
+    def is_unchanged(key, entry):
+      read_value = self._cas_values.pop(key, None)
+      return entry is not None and entry[1] == read_value
+    return self._store_multi(mapping, time, key_prefix, is_unchanged)
+
+  def delete(self, key, seconds=0):
+    """Delete a key, returns 2 if it was deleted and 1 if it was missing."""
+    with self._lock:
+      return 2 if self._data.pop(key, None) is not None else 1
+
+  def delete_multi(self, keys, seconds=0, key_prefix='', **_):
+    # pylint: disable=unused-argument
+    with self._lock:
+      for key in keys:
+        self._data.pop(key_prefix + key, None)
+    return True
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    # pylint: disable=unused-argument
+    with self._lock:
+      entry = self._get_entry(key)
+      if entry is None:
+        if initial_value is None:
+          return None
+        value, expires_at = initial_value, 0
+      else:
+        value, expires_at = cPickle.loads(entry[1]), entry[0]
+      value += delta
+      self._data[key] = (expires_at,
+                         cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL))
+      return value
+
+  def flush_all(self):
+    with self._lock:
+      self._data.clear()
+    return True
@@ -23,3 +23,11 @@ def contributed_notifications():
       "Assessment": data_handlers.get_assignable_data,
       "Comment": data_handlers.get_comment_data,
   }
+
+
+def contributed_batch_notifications():
+  """Get handler functions for lists of ggrc notifications of one type."""
+  return {
+      "Assessment": data_handlers.get_assignable_data_batch,
+      "Comment": data_handlers.get_comment_data_batch,
+  }
@@ -58,6 +58,8 @@ class Converter(object):
     self.dry_run = kwargs.get("dry_run", True)
     self.csv_data = kwargs.get("csv_data", [])
     self.ids_by_type = kwargs.get("ids_by_type", [])
+    self.chunk_size = kwargs.get("chunk_size", settings.IMPORT_CHUNK_SIZE)
+    self.progress_callback = kwargs.get("progress_callback")
     self.block_converters = []
     self.new_objects = defaultdict(structures.CaseInsensitiveDict)
     self.shared_state = {}
@@ -68,6 +70,7 @@ class Converter(object):
   def to_array(self):
     with benchmark("Create block converters"):
       self.block_converters_from_ids()
+      self.row_converters_from_ids()
     with benchmark("Handle row data"):
       self.handle_row_data()
     with benchmark("Make block array"):
@@ -91,14 +94,57 @@ class Converter(object):
       csv_data.extend(block_data)
     return csv_data
 
+  def generate_csv_rows(self):
+    """Generate csv rows of all blocks, one block at a time.
+
+    Rows have the same layout as the rows returned by to_block_array, except
+    that every row is padded only to the width of its own block. Block
+    converters must be created with block_converters_from_ids first.
+    """
+    for block_converter in self.block_converters:
+      with benchmark("Generate rows for {}".format(block_converter.name)):
+        rows = block_converter.generate_csv_rows()
+        header_description = next(rows, [])
+        header_names = next(rows, [])
+        width = max(len(header_description), len(header_names))
+        yield ["Object type"] + header_description
+        yield [block_converter.name] + header_names
+        for row in rows:
+          yield [""] + row
+        # multi block csv is separated by two empty lines
+        for _ in range(2):
+          yield [""] * (width + 1)
+      self.report_progress()
+
   def import_csv(self):
     self.block_converters_from_csv()
-    self.row_converters_from_csv()
-    self.handle_priority_columns()
-    self.import_objects()
-    self.import_secondary_objects()
+    if self.use_chunks():
+      self.import_csv_chunks()
+    else:
+      self.row_converters_from_csv()
+      self.handle_priority_columns()
+      self.import_objects()
+      self.import_secondary_objects()
     self.drop_cache()
 
+  def use_chunks(self):
+    """Check if any block is too long to be imported at once."""
+    if not self.chunk_size:
+      return False
+    return any(len(block_converter.rows) > self.chunk_size
+               for block_converter in self.block_converters)
+
+  def import_csv_chunks(self):
+    """Import all blocks in windows of chunk_size rows.
+
+    Objects of all blocks are saved before any mapping columns are handled,
+    so that rows can be mapped to objects created by later blocks or windows.
+    """
+    for block_converter in self.block_converters:
+      block_converter.import_chunks(self.priority_columns, self.chunk_size)
+    for block_converter in self.block_converters:
+      block_converter.import_mapping_chunks(self.chunk_size)
+
   def handle_priority_columns(self):
     for attr_name in self.priority_columns:
       for block_converter in self.block_converters:
@@ -108,6 +154,10 @@ class Converter(object):
     for converter in self.block_converters:
       converter.handle_row_data()
 
+  def row_converters_from_ids(self):
+    for converter in self.block_converters:
+      converter.row_converters_from_ids()
+
   def row_converters_from_csv(self):
     for converter in self.block_converters:
       converter.row_converters_from_csv()
@@ -115,7 +165,8 @@ class Converter(object):
   def block_converters_from_ids(self):
     """ fill the block_converters class variable
 
-    Generate block converters from a list of tuples with an object name and ids
+    Generate block converters from a list of tuples with an object name and
+    ids. Objects of the blocks are not loaded here.
     """
     object_map = {o.__name__: o for o in self.exportable.values()}
     for object_data in self.ids_by_type:
@@ -131,7 +182,6 @@ class Converter(object):
                                          fields=fields, object_ids=object_ids,
                                          class_name=class_name)
         block_converter.check_block_restrictions()
-        block_converter.row_converters_from_ids()
         self.block_converters.append(block_converter)
 
   def block_converters_from_csv(self):
@@ -160,6 +210,16 @@ class Converter(object):
     for converter in self.block_converters:
       converter.handle_row_data()
       converter.import_objects()
+      self.report_progress()
+
+  def report_progress(self):
+    """Send number of processed rows of every block to progress_callback."""
+    if not self.progress_callback:
+      return
+    self.progress_callback({
+        "blocks": [converter.get_progress()
+                   for converter in self.block_converters],
+    })
 
   def import_secondary_objects(self):
     for converter in self.block_converters:
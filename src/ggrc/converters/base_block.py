@@ -21,6 +21,7 @@ from ggrc import db
 from ggrc import models
 from ggrc.rbac import permissions
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.utils import structures
 from ggrc.converters import errors
 from ggrc.converters import get_shared_unique_rules
@@ -28,6 +29,7 @@ from ggrc.converters import pre_commit_checks
 from ggrc.converters.base_row import RowConverter
 from ggrc.converters.import_helper import get_column_order
 from ggrc.converters.import_helper import get_object_column_definitions
+from ggrc.models.reflection import AttributeInfo
 from ggrc.services.common import get_modified_objects
 from ggrc.services.common import update_index
 from ggrc.services.common import update_memcache_after_commit
@@ -75,6 +77,17 @@ class BlockConverter(object):
 
   """
 
+  # Number of objects loaded at once when generating csv rows.
+  CHUNK_SIZE = 500
+
+  # Columns handled only after objects of all blocks have been imported when
+  # importing in chunks.
+  MAPPING_PREFIXES = (
+      AttributeInfo.MAPPING_PREFIX,
+      AttributeInfo.UNMAPPING_PREFIX,
+      AttributeInfo.SNAPSHOT_MAPPING_PREFIX,
+  )
+
   def get_unique_counts_dict(self, object_class):
     """ get a the varible for storing unique counts
 
@@ -90,6 +103,20 @@ class BlockConverter(object):
       )
     return shared_state[classes]
 
+  def get_unique_lines_dict(self, object_class):
+    """Get the variable for storing first lines of unique values.
+
+    This is the chunked import counterpart of get_unique_counts_dict. Only
+    the first line of every value is stored instead of all lines.
+    """
+    sharing_rules = get_shared_unique_rules()
+    classes = sharing_rules.get(object_class, object_class)
+    shared_state = self.converter.shared_state
+    key = ("unique_lines", classes)
+    if key not in shared_state:
+      shared_state[key] = defaultdict(structures.CaseInsensitiveDict)
+    return shared_state[key]
+
   def __init__(self, converter, **options):
     # pylint: disable=too-many-instance-attributes,protected-access
     # This class holds cache and object data for all rows and handlers below
@@ -111,6 +138,14 @@ class BlockConverter(object):
     self.row_errors = []
     self.row_warnings = []
     self.row_converters = []
+    # Number of rows imported or objects exported so far.
+    self.rows_done = 0
+    # Row counts of windows released during a chunked import.
+    self.row_counts = Counter()
+    # Row index -> id of the imported object, or the object itself in dry
+    # runs, for rows with mapping columns left for import_mapping_chunks.
+    self._mapping_rows = OrderedDict()
+    self._new_rows = set()
     self.ignore = False
     self._has_non_importable_columns = False
     # For import contains model name from csv file.
@@ -173,11 +208,12 @@ class BlockConverter(object):
     return self._ca_definitions_cache
 
   def _get_relationships(self):
-    """Get all relationships for any of the object in the current block."""
+    """Get all relationships for any of the loaded objects in the block."""
     relationship = models.Relationship
     with benchmark("Fetch all block relationships"):
       relationships = []
-      if self.object_ids:
+      object_ids = [row.obj.id for row in self.row_converters]
+      if object_ids:
         relationships = db.session.query(
             relationship.source_id,
             relationship.source_type,
@@ -186,11 +222,11 @@ class BlockConverter(object):
         ).filter(or_(
             and_(
                 relationship.source_type == self.object_class.__name__,
-                relationship.source_id.in_(self.object_ids),
+                relationship.source_id.in_(object_ids),
             ),
             and_(
                 relationship.destination_type == self.object_class.__name__,
-                relationship.destination_id.in_(self.object_ids),
+                relationship.destination_id.in_(object_ids),
             )
         )).all()
       return relationships
@@ -348,6 +384,36 @@ class BlockConverter(object):
     csv_body = self.generate_csv_body()
     return csv_header, csv_body
 
+  def generate_csv_rows(self, chunk_size=None):
+    """Generate csv header and body rows of the block.
+
+    Objects are loaded and converted in chunks of ids and released before the
+    next chunk is loaded, so only a single chunk of objects is kept in memory.
+
+    Args:
+      chunk_size (int): number of objects loaded at once.
+    """
+    for row in self.generate_csv_header():
+      yield row
+    if self.ignore:
+      return
+    for ids in list_chunks(self.object_ids, chunk_size or self.CHUNK_SIZE):
+      self.row_converters_from_ids(ids)
+      for row_converter in self.row_converters:
+        row_converter.handle_row_data()
+      for row in self.generate_csv_body():
+        yield row
+      self.release_row_converters()
+      self.rows_done += len(ids)
+      self.converter.report_progress()
+
+  def release_row_converters(self):
+    """Drop loaded row converters and caches built for them."""
+    self.row_converters = []
+    self._mapping_cache = None
+    self._owners_cache = None
+    self._user_roles_cache = None
+
   def get_header_names(self):
     """ Get all posible user column names for current object """
     header_names = {
@@ -396,23 +462,36 @@ class BlockConverter(object):
       if len(row) > index:
         row.pop(index)
 
-  def row_converters_from_csv(self):
-    """ Generate a row converter object for every csv row """
+  def row_converters_from_csv(self, start=0, stop=None):
+    """ Generate a row converter object for every csv row
+
+    Args:
+      start (int): index of the first row that should be converted.
+      stop (int): index of the row after the last converted row, all rows
+        after start are converted if not set.
+    """
     if self.ignore:
       return
     self.row_converters = []
-    for i, row in enumerate(self.rows):
+    for i, row in enumerate(self.rows[start:stop], start):
       row = RowConverter(self, self.object_class, row=row,
                          headers=self.headers, index=i)
       self.row_converters.append(row)
 
-  def row_converters_from_ids(self):
-    """ Generate a row converter object for every csv row """
-    if self.ignore or not self.object_ids:
+  def row_converters_from_ids(self, object_ids=None):
+    """ Generate a row converter object for every csv row
+
+    Args:
+      object_ids (list of int): ids of objects that should be loaded, all
+        block objects are loaded if not set.
+    """
+    if object_ids is None:
+      object_ids = self.object_ids
+    if self.ignore or not object_ids:
       return
     self.row_converters = []
     objects = self.object_class.eager_query().filter(
-        self.object_class.id.in_(self.object_ids)).all()
+        self.object_class.id.in_(object_ids)).all()
     for i, obj in enumerate(objects):
       row = RowConverter(self, self.object_class, obj=obj,
                          headers=self.headers, index=i)
@@ -445,24 +524,172 @@ class BlockConverter(object):
     for key, counts in self.unique_counts.items():
       self.remove_duplicate_keys(key, counts)
 
-  def get_info(self):
-    created, updated, ignored, deleted = 0, 0, 0, 0
+  def check_unique_keys(self):
+    """Ignore rows with unique values that were used on previous lines.
+
+    Unlike check_unique_columns this only needs the current row converters,
+    so it can be used on windows of rows in a chunked import.
+    """
+    first_lines = self.get_unique_lines_dict(self.object_class)
+    unique = [key for key, header in self.object_headers.items()
+              if header["unique"]]
+    for key in unique:
+      for row_converter in self.row_converters:
+        value = row_converter.get_value(key)
+        if not value:
+          continue
+        first_line = first_lines[key].setdefault(value, row_converter.line)
+        if first_line == row_converter.line:
+          continue
+        self.row_errors.append(
+            errors.DUPLICATE_VALUE_IN_CSV.format(
+                line_list="{}, {}".format(first_line, row_converter.line),
+                column_name=self.headers[key]["display_name"],
+                s="",
+                value=value,
+                ignore_lines=row_converter.line,
+            )
+        )
+        row_converter.set_ignore()
+
+  def get_mapping_fields(self):
+    """Get mapping columns of the block that are imported last."""
+    return [field for field in self.headers
+            if field.startswith(self.MAPPING_PREFIXES)]
+
+  def import_chunks(self, priority_columns, chunk_size):
+    """Import objects of the block in windows of chunk_size rows.
+
+    Every window is parsed, checked, saved, indexed and logged before the
+    next one is loaded, and its row converters and caches are released
+    afterwards. Mapping columns are skipped here and imported by
+    import_mapping_chunks once objects of all blocks exist.
+
+    Args:
+      priority_columns (list of str): columns handled before any other
+        column of a row.
+      chunk_size (int): number of rows in a single window.
+    """
+    if self.ignore:
+      return
+    mapping_fields = self.get_mapping_fields()
+    fields = [field for field in self.headers if field not in mapping_fields]
+    unique_fields = [field for field in fields
+                     if self.headers[field]["unique"] and
+                     field not in priority_columns]
+    for start in range(0, len(self.rows), chunk_size):
+      if self.ignore:
+        return
+      with benchmark("Import {} rows {}-{}".format(
+          self.name, start, start + chunk_size)):
+        self.row_converters_from_csv(start, start + chunk_size)
+        for attr_name in priority_columns:
+          self.handle_row_data([attr_name])
+        # Duplicates of previous lines must be found before comparing values
+        # with the database, where objects of previous windows already are.
+        for row_converter in self.row_converters:
+          row_converter.handle_csv_row_data(unique_fields, check_unique=False)
+        self.check_unique_keys()
+        for row_converter in self.row_converters:
+          row_converter.check_unique_consistency(unique_fields)
+          row_converter.handle_csv_row_data(fields)
+        self.check_mandatory_fields()
+        self.import_objects()
+        self.import_secondary_objects(self.converter.new_objects)
+        self._store_chunk_rows(mapping_fields)
+        self.release_row_converters()
+        self.converter.report_progress()
+
+  def _store_chunk_rows(self, mapping_fields):
+    """Keep row counts and rows that still need their mappings imported."""
+    self.row_counts.update(self._get_row_statuses())
+    new_objects = self.converter.new_objects[self.object_class]
+    for row_converter in self.row_converters:
+      if not self.converter.dry_run:
+        # saved objects are found in the database by the following rows
+        new_objects.pop(row_converter.get_value(row_converter.id_key), None)
+      if not mapping_fields or row_converter.ignore or row_converter.is_delete:
+        continue
+      if self.converter.dry_run:
+        self._mapping_rows[row_converter.index] = row_converter.obj
+      else:
+        self._mapping_rows[row_converter.index] = row_converter.obj.id
+      if row_converter.is_new:
+        self._new_rows.add(row_converter.index)
+
+  def _get_mapping_objects(self, indexes):
+    """Get objects of the given rows stored by import_chunks."""
+    if self.converter.dry_run:
+      return {index: self._mapping_rows[index] for index in indexes}
+    ids = [self._mapping_rows[index] for index in indexes]
+    objects = {obj.id: obj for obj in self.object_class.query.filter(
+        self.object_class.id.in_(ids))}
+    return {index: objects.get(self._mapping_rows[index])
+            for index in indexes}
+
+  def import_mapping_chunks(self, chunk_size):
+    """Import mapping columns of rows imported by import_chunks.
+
+    Args:
+      chunk_size (int): number of rows in a single window.
+    """
+    if self.ignore:
+      return
+    mapping_fields = self.get_mapping_fields()
+    for indexes in list_chunks(self._mapping_rows.keys(), chunk_size):
+      if self.ignore:
+        return
+      objects = self._get_mapping_objects(indexes)
+      for index in indexes:
+        if objects[index] is None:
+          continue
+        row_converter = RowConverter(self, self.object_class,
+                                     row=self.rows[index],
+                                     headers=self.headers, index=index)
+        row_converter.obj = objects[index]
+        row_converter.is_new = index in self._new_rows
+        row_converter.handle_row_data(mapping_fields)
+        self.row_converters.append(row_converter)
+      self.import_secondary_objects(self.converter.new_objects)
+      for row_converter in self.row_converters:
+        if row_converter.ignore:
+          status = "created" if row_converter.is_new else "updated"
+          self.row_counts[status] -= 1
+          self.row_counts["ignored"] += 1
+      self.release_row_converters()
+    self._mapping_rows = OrderedDict()
+    self._new_rows = set()
+
+  def _get_row_statuses(self):
+    """Get import status of every loaded row."""
     for row in self.row_converters:
       if row.ignore:
-        ignored += 1
+        yield "ignored"
       elif row.is_delete:
-        deleted += 1
+        yield "deleted"
       elif row.is_new:
-        created += 1
+        yield "created"
       else:
-        updated += 1
+        yield "updated"
+
+  def get_progress(self):
+    """Get number of processed rows of the block."""
+    if self.operation == 'import':
+      total = len(self.rows)
+    else:
+      total = len(self.object_ids)
+    return {"name": self.name, "total": total, "done": self.rows_done}
+
+  def get_info(self):
+    counts = Counter(self.row_counts)
+    counts.update(self._get_row_statuses())
     info = {
         "name": self.name,
         "rows": len(self.rows),
-        "created": created,
-        "updated": updated,
-        "ignored": ignored,
-        "deleted": deleted,
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "ignored": counts["ignored"],
+        "deleted": counts["deleted"],
         "block_warnings": self.block_warnings,
         "block_errors": self.block_errors,
         "row_warnings": self.row_warnings,
@@ -525,6 +752,7 @@ class BlockConverter(object):
       import_event = self.save_import()
       for row_converter in self.row_converters:
         row_converter.send_post_commit_signals(event=import_event)
+    self.rows_done += len(self.row_converters)
 
   def clean_session_from_ignored_objs(self):
     """Clean DB session from ignored objects.
@@ -59,8 +59,14 @@ class RowConverter(object):
     message = template.format(line=self.line, **kwargs)
     self.block_converter.row_warnings.append(message)
 
-  def handle_csv_row_data(self, field_list=None):
-    """ Pack row data with handlers """
+  def handle_csv_row_data(self, field_list=None, check_unique=True):
+    """ Pack row data with handlers
+
+    Args:
+      field_list (list of strings): fields that should be handled, all fields
+        are handled if not set.
+      check_unique (bool): compare unique values with existing objects.
+    """
     handle_fields = self.headers if field_list is None else field_list
     for i, (attr_name, header_dict) in enumerate(self.headers.items()):
       if attr_name not in handle_fields or \
@@ -79,7 +85,8 @@ class RowConverter(object):
         self.id_key = attr_name
         self.obj = self.get_or_generate_object(attr_name)
         item.set_obj_attr()
-      item.check_unique_consistency()
+      if check_unique:
+        item.check_unique_consistency()
 
   def handle_obj_row_data(self):
     for attr_name, header_dict in self.headers.items():
@@ -96,6 +103,15 @@ class RowConverter(object):
     else:
       self.handle_csv_row_data(field_list)
 
+  def check_unique_consistency(self, field_list):
+    """Compare unique values of handled fields with existing objects."""
+    if self.ignore:
+      return
+    for attr_name in field_list:
+      item = self.attrs.get(attr_name) or self.objects.get(attr_name)
+      if item:
+        item.check_unique_consistency()
+
   def check_mandatory_fields(self):
     """Check if the new object contains all mandatory columns."""
     if not self.is_new or self.is_delete or self.ignore:
@@ -52,6 +52,18 @@ def get_column_order(columns):
   return AttributeInfo.get_column_order(columns)
 
 
+def generate_csv_lines(csv_rows):
+  """Generate utf-8 encoded csv file lines from an iterable of rows."""
+  output_buffer = StringIO()
+  writer = csv.writer(output_buffer)
+  for row in csv_rows:
+    writer.writerow([val.encode("utf-8") for val in row])
+    yield output_buffer.getvalue()
+    output_buffer.seek(0)
+    output_buffer.truncate()
+  output_buffer.close()
+
+
 def generate_csv_string(csv_data):
   """ Turn 2d string array into a string representing a csv file """
   output_buffer = StringIO()
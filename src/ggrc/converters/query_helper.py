@@ -14,8 +14,8 @@ from ggrc import db
 from ggrc import models
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.models import inflector
-from ggrc.rbac import context_query_filter
-from ggrc.utils import query_helpers, benchmark
+from ggrc.utils import benchmark
+from ggrc.utils import permission_filter
 from ggrc.converters import custom_operators
 from ggrc.converters.exceptions import BadQueryException
 
@@ -215,19 +215,8 @@ class QueryHelper(object):
     Prepare query to filter models based on the available contexts and
     resources for the given type of object.
     """
-    contexts, resources = query_helpers.get_context_resource(
-        model_name=model.__name__, permission_type=permission_type
-    )
-
-    if contexts is not None:
-      if resources:
-        resource_sql = model.id.in_(resources)
-      else:
-        resource_sql = sa.sql.false()
-
-      return sa.or_(
-          context_query_filter(model.context_id, contexts),
-          resource_sql)
+    return permission_filter.get_permission_filter().get_model_filter(
+        model, permission_type)
 
   def _get_objects(self, object_query):
     """Get a set of objects described in the filters."""
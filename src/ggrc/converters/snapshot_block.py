@@ -54,11 +54,16 @@ class SnapshotBlockConverter(object):
     self.converter = converter
     self.ids = ids
     self.fields = fields or []
+    self.rows_done = 0
 
   @staticmethod
   def handle_row_data():
     pass
 
+  @staticmethod
+  def row_converters_from_ids():
+    pass
+
   @property
   def name(self):
     return "{} Snapshot".format(self.child_type)
@@ -307,3 +312,17 @@ class SnapshotBlockConverter(object):
   def to_array(self):
     """Get 2D list representing the CSV file."""
     return self._header_list, self._body_list
+
+  def generate_csv_rows(self):
+    """Generate csv header and body rows of the block.
+
+    Column headers depend on custom attributes of all snapshots, so the whole
+    block is loaded at once.
+    """
+    for row in self._header_list + self._body_list:
+      yield row
+    self.rows_done = len(self.ids)
+
+  def get_progress(self):
+    """Get number of exported snapshots of the block."""
+    return {"name": self.name, "total": len(self.ids), "done": self.rows_done}
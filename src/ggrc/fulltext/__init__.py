@@ -46,11 +46,19 @@ class Indexer(object):
     raise NotImplementedError()
 
 
+SEARCH_MODE_INDEXERS = {
+    "like": "Indexer",
+    "fulltext": "FulltextIndexer",
+}
+
+
 def resolve_default_text_indexer():
-  """Get indexer for settings fulltest db"""
+  """Get indexer for settings fulltest db and search mode"""
   from ggrc import settings
   db_scheme = settings.SQLALCHEMY_DATABASE_URI.split(':')[0].split('+')[0]
-  return 'ggrc.fulltext.{db_scheme}.Indexer'.format(db_scheme=db_scheme)
+  indexer_name = SEARCH_MODE_INDEXERS[settings.FULLTEXT_SEARCH_MODE]
+  return 'ggrc.fulltext.{db_scheme}.{indexer_name}'.format(
+      db_scheme=db_scheme, indexer_name=indexer_name)
 
 
 def get_indexer():
@@ -5,7 +5,7 @@
 import itertools
 from collections import namedtuple
 
-from sqlalchemy import inspect, orm
+from sqlalchemy import orm
 
 from ggrc import db
 
@@ -47,17 +47,22 @@ class Indexed(object):
     return (self.__class__.__name__, self.id)
 
   @classmethod
-  def get_insert_query_for(cls, ids):
-    """Return insert class record query. It will return None, if it's empty."""
+  def get_index_rows_for(cls, ids):
+    """Return list of full text record values for instances with given ids."""
     if not ids:
-      return
+      return []
     instances = cls.indexed_query().filter(cls.id.in_(ids))
     indexer = fulltext.get_indexer()
-    keys = inspect(indexer.record_type).c
     records = (indexer.fts_record_for(i) for i in instances)
-    rows = itertools.chain(*[indexer.records_generator(i) for i in records])
-    values = [{c.name: getattr(r, a) for a, c in keys.items()} for r in rows]
+    return list(itertools.chain.from_iterable(
+        indexer.rows_generator(r) for r in records))
+
+  @classmethod
+  def get_insert_query_for(cls, ids):
+    """Return insert class record query. It will return None, if it's empty."""
+    values = cls.get_index_rows_for(ids)
     if values:
+      indexer = fulltext.get_indexer()
       return indexer.record_type.__table__.insert().values(values)
 
   @classmethod
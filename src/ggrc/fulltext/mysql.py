@@ -1,6 +1,7 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 """Full text index engine for Mysql DB backend"""
+import re
 from collections import defaultdict
 
 from sqlalchemy import and_
@@ -8,9 +9,7 @@ from sqlalchemy import case
 from sqlalchemy import distinct
 from sqlalchemy import func
 from sqlalchemy import literal
-from sqlalchemy import or_
 from sqlalchemy import union
-from sqlalchemy.sql import false
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import select
@@ -20,8 +19,8 @@ from ggrc import db
 from ggrc.login import is_creator
 from ggrc.models import all_models
 from ggrc.models.inflector import get_model
+from ggrc.utils import permission_filter
 from ggrc.utils import query_helpers
-from ggrc.rbac import context_query_filter
 from ggrc.fulltext.sql import SqlIndexer
 
 
@@ -66,33 +65,12 @@ class MysqlIndexer(SqlIndexer):
                             permission_model=None):
     """Prepare the query based on the allowed contexts and resources for
      each of the required objects(models).
+
+    Allowed contexts and resources are computed once per request by the
+    permission filter of the request.
     """
-    type_queries = []
-    for model_name in model_names:
-      contexts, resources = query_helpers.get_context_resource(
-          model_name=model_name,
-          permission_type=permission_type,
-          permission_model=permission_model
-      )
-      if contexts is not None:
-        if resources:
-          resource_sql = and_(
-              MysqlRecordProperty.type == model_name,
-              MysqlRecordProperty.key.in_(resources))
-        else:
-          resource_sql = false()
-
-        type_query = or_(
-            and_(
-                MysqlRecordProperty.type == model_name,
-                context_query_filter(MysqlRecordProperty.context_id, contexts)
-            ),
-            resource_sql)
-        type_queries.append(type_query)
-
-    return and_(
-        MysqlRecordProperty.type.in_(model_names),
-        or_(*type_queries))
+    return permission_filter.get_permission_filter().get_records_filter(
+        MysqlRecordProperty, model_names, permission_type, permission_model)
 
   @staticmethod
   def search_get_owner_query(query, types=None, contact_id=None):
@@ -225,7 +203,39 @@ class MysqlIndexer(SqlIndexer):
     return query.all()
 
 
+class MysqlFulltextIndexer(MysqlIndexer):
+  """Indexer that searches with the MySQL FULLTEXT index in boolean mode.
+
+  Search terms are matched as word prefixes, so the FULLTEXT index on the
+  content column is used instead of scanning the table with LIKE.
+  """
+
+  # Words shorter than innodb_ft_min_token_size are not indexed and are
+  # matched with LIKE on the rows found through the index.
+  MIN_TOKEN_SIZE = 3
+
+  WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+  @classmethod
+  def _get_filter_query(cls, terms):
+    """Get the whitelist of fields to filter in full text table."""
+    whitelist = MysqlRecordProperty.property.in_(
+        ['title', 'name', 'email', 'notes', 'description', 'slug'])
+    if not terms:
+      return whitelist
+    words = cls.WORD_RE.findall(terms)
+    long_words = [w for w in words if len(w) >= cls.MIN_TOKEN_SIZE]
+    if not long_words:
+      return and_(whitelist, MysqlRecordProperty.content.contains(terms))
+    boolean_terms = u" ".join(u"+{}*".format(w) for w in long_words)
+    filters = [whitelist, MysqlRecordProperty.content.match(boolean_terms)]
+    filters.extend(MysqlRecordProperty.content.contains(w)
+                   for w in words if len(w) < cls.MIN_TOKEN_SIZE)
+    return and_(*filters)
+
+
 Indexer = MysqlIndexer
+FulltextIndexer = MysqlFulltextIndexer
 
 
 @event.listens_for(db.session.__class__, 'before_commit')
@@ -0,0 +1,335 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Resumable full reindex of the full text search table.
+
+The full reindex never touches the live full text table. All records are
+written into a shadow copy of the table, which is atomically swapped with the
+live table once every model has been processed, so search results stay
+complete while the index is being rebuilt.
+
+The objects of every model are split into partitions by id ranges. Progress
+is stored per partition as a high-water mark (id of the last indexed object)
+in the ``fulltext_reindex_checkpoints`` table and committed together with the
+records of each chunk. If the reindex is interrupted, the next run continues
+from the stored checkpoints into the existing shadow table.
+
+Partitions can be indexed by a pool of worker processes, each of them using
+its own database connections. The number of workers is set with the
+``FULLTEXT_REINDEX_WORKERS`` setting.
+"""
+
+import logging
+import multiprocessing
+import time
+
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import not_
+from sqlalchemy.sql import column
+from sqlalchemy.sql import select
+from sqlalchemy.sql import table
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexed_model_names
+from ggrc.fulltext import mixin
+from ggrc.models import all_models
+from ggrc.models.inflector import get_model
+from ggrc.snapshotter import indexer as snapshot_indexer
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+SNAPSHOT_MODEL_NAME = "Snapshot"
+
+RENAME_TMPL = "RENAME TABLE {live} TO {old}, {shadow} TO {live}"
+
+
+class ReindexCheckpoint(db.Model):
+  """Progress of a full reindex for a single partition of a model.
+
+  A partition covers objects with ids in the (range_start, range_end] range.
+  The last partition of every model has no upper bound.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "fulltext_reindex_checkpoints"
+
+  model_name = db.Column(db.String(64), primary_key=True)
+  range_start = db.Column(db.Integer, primary_key=True, default=0,
+                          autoincrement=False)
+  range_end = db.Column(db.Integer, nullable=True)
+  last_id = db.Column(db.Integer, nullable=False, default=0)
+  done = db.Column(db.Boolean, nullable=False, default=False)
+  created_at = db.Column(db.DateTime, nullable=False, default=func.now())
+  updated_at = db.Column(db.DateTime, nullable=False, default=func.now(),
+                         onupdate=func.now())
+
+  def get_progress(self, indexed=0, duration=0):
+    """Get progress report for this partition."""
+    return {
+        "model": self.model_name,
+        "range_start": self.range_start,
+        "range_end": self.range_end,
+        "last_id": self.last_id,
+        "done": self.done,
+        "indexed": indexed,
+        "duration": round(duration, 3),
+    }
+
+
+def _init_worker():
+  """Drop database connections inherited from the parent process."""
+  db.engine.dispose()
+
+
+def _reindex_partition_worker(partition):
+  """Index a single partition in a worker process."""
+  from ggrc.app import app
+  with app.app_context():
+    reindexer = Reindexer()
+    reindexer.load_cache()
+    try:
+      return reindexer.reindex_partition(*partition)
+    finally:
+      db.session.remove()
+
+
+class Reindexer(object):
+  """Full reindex engine that builds the index into a shadow table."""
+
+  CHUNK_SIZE = 1000
+
+  def __init__(self, chunk_size=None, partition_size=None):
+    self.chunk_size = chunk_size or self.CHUNK_SIZE
+    self.partition_size = (partition_size or
+                           settings.FULLTEXT_REINDEX_PARTITION_SIZE)
+    self.indexer = get_indexer()
+    live_table = self.indexer.record_type.__table__
+    self.live_name = live_table.name
+    self.shadow_name = "{}_shadow".format(self.live_name)
+    self.old_name = "{}_old".format(self.live_name)
+    self.shadow = table(self.shadow_name,
+                        *[column(col.name) for col in live_table.c])
+
+  @staticmethod
+  def get_model_names():
+    """Get names of all models that are indexed by the full reindex."""
+    return sorted(get_indexed_model_names()) + [SNAPSHOT_MODEL_NAME]
+
+  @staticmethod
+  def _get_model(model_name):
+    if model_name == SNAPSHOT_MODEL_NAME:
+      return all_models.Snapshot
+    return get_model(model_name)
+
+  def can_resume(self):
+    """Check if there is an interrupted reindex that can be continued."""
+    return (db.engine.has_table(self.shadow_name) and
+            db.session.query(ReindexCheckpoint).count() > 0)
+
+  def start(self):
+    """Prepare an empty shadow table and fresh partition checkpoints."""
+    db.session.query(ReindexCheckpoint).delete()
+    db.session.commit()
+    db.session.execute("DROP TABLE IF EXISTS {}".format(self.shadow_name))
+    db.session.execute("CREATE TABLE {} LIKE {}".format(self.shadow_name,
+                                                        self.live_name))
+    for model_name in self.get_model_names():
+      for range_start, range_end in self.get_partition_ranges(model_name):
+        db.session.add(ReindexCheckpoint(
+            model_name=model_name,
+            range_start=range_start,
+            range_end=range_end,
+            last_id=range_start,
+        ))
+    db.session.commit()
+
+  def get_partition_ranges(self, model_name):
+    """Split ids of a model into (range_start, range_end) partitions."""
+    model = self._get_model(model_name)
+    min_id, max_id = db.session.query(func.min(model.id),
+                                      func.max(model.id)).one()
+    if min_id is None:
+      return [(0, None)]
+    bounds = range(min_id - 1, max_id, self.partition_size)
+    return zip(bounds, bounds[1:] + [None])
+
+  def get_pending_partitions(self):
+    """Get (model_name, range_start) keys of unfinished partitions."""
+    return db.session.query(
+        ReindexCheckpoint.model_name,
+        ReindexCheckpoint.range_start,
+    ).filter(
+        not_(ReindexCheckpoint.done)
+    ).order_by(
+        ReindexCheckpoint.model_name,
+        ReindexCheckpoint.range_start,
+    ).all()
+
+  def load_cache(self):
+    """Load lookup data shared by the record builders."""
+    people = db.session.query(all_models.Person.id, all_models.Person.name,
+                              all_models.Person.email)
+    self.indexer.cache["people_map"] = {p.id: (p.name, p.email)
+                                        for p in people}
+    self.indexer.cache["ac_role_map"] = dict(db.session.query(
+        all_models.AccessControlRole.id,
+        all_models.AccessControlRole.name,
+    ))
+
+  def get_rows(self, model_name, ids):
+    """Get full text record values for the objects with the given ids."""
+    if model_name == SNAPSHOT_MODEL_NAME:
+      return snapshot_indexer.get_snapshots_payload(ids)
+    model = self._get_model(model_name)
+    if issubclass(model, mixin.Indexed):
+      return model.get_index_rows_for(ids)
+    # pylint: disable=protected-access
+    mapper_class = model._sa_class_manager.mapper.base_mapper.class_
+    query = model.query.options(
+        db.undefer_group(mapper_class.__name__ + '_complete'),
+    ).filter(model.id.in_(ids))
+    rows = []
+    for instance in query:
+      rows.extend(self.indexer.rows_generator(
+          self.indexer.fts_record_for(instance)))
+    return rows
+
+  def write_rows(self, model_name, ids):
+    """Replace shadow table records for the given objects.
+
+    Existing records are removed first so that a chunk which was written but
+    not checkpointed before a crash can be safely written again.
+    """
+    db.session.execute(self.shadow.delete().where(and_(
+        self.shadow.c.type == model_name,
+        self.shadow.c.key.in_(ids),
+    )))
+    rows = self.get_rows(model_name, ids)
+    if rows:
+      db.session.execute(self.shadow.insert(), rows)
+
+  def reindex_partition(self, model_name, range_start):
+    """Index all objects of a partition starting from its checkpoint.
+
+    Returns:
+      Progress report dict for the indexed partition.
+    """
+    checkpoint = db.session.query(ReindexCheckpoint).get(
+        (model_name, range_start))
+    if checkpoint.done:
+      return checkpoint.get_progress()
+    model = self._get_model(model_name)
+    logger.info("Updating index for: %s from id %s",
+                model_name, checkpoint.last_id)
+    indexed = 0
+    start = time.time()
+    with benchmark("Create records for %s" % model_name):
+      while True:
+        query = db.session.query(model.id).filter(
+            model.id > checkpoint.last_id
+        )
+        if checkpoint.range_end is not None:
+          query = query.filter(model.id <= checkpoint.range_end)
+        ids = [row.id for row in
+               query.order_by(model.id).limit(self.chunk_size)]
+        if not ids:
+          break
+        self.write_rows(model_name, ids)
+        checkpoint.last_id = ids[-1]
+        indexed += len(ids)
+        db.session.commit()
+      checkpoint.done = True
+      db.session.commit()
+    return checkpoint.get_progress(indexed, time.time() - start)
+
+  def catch_up(self):
+    """Apply changes made to the live data while the reindex was running.
+
+    Objects updated after the reindex started are indexed again and records
+    of objects that no longer exist are removed from the shadow table.
+    """
+    started_at = db.session.query(
+        func.min(ReindexCheckpoint.created_at)).scalar()
+    for model_name in self.get_model_names():
+      model = self._get_model(model_name)
+      with benchmark("Catch up records for %s" % model_name):
+        ids = [row.id for row in db.session.query(model.id).filter(
+            model.updated_at >= started_at
+        )]
+        for ids_chunk in list_chunks(ids, self.chunk_size):
+          self.write_rows(model_name, ids_chunk)
+        db.session.execute(self.shadow.delete().where(and_(
+            self.shadow.c.type == model_name,
+            not_(self.shadow.c.key.in_(select([model.id]))),
+        )))
+        db.session.commit()
+
+  def swap(self):
+    """Atomically replace the live table with the shadow table."""
+    db.session.execute("DROP TABLE IF EXISTS {}".format(self.old_name))
+    db.session.execute(RENAME_TMPL.format(
+        live=self.live_name,
+        old=self.old_name,
+        shadow=self.shadow_name,
+    ))
+    db.session.execute("DROP TABLE {}".format(self.old_name))
+    db.session.query(ReindexCheckpoint).delete()
+    db.session.commit()
+
+  def run(self, workers=None, progress_callback=None):
+    """Run or resume the full reindex.
+
+    Args:
+      workers: number of worker processes used to index partitions. Defaults
+          to the FULLTEXT_REINDEX_WORKERS setting.
+      progress_callback: optional function that receives the progress report
+          dict after every finished partition.
+    Returns:
+      Progress report dict with reports for all partitions indexed by this run.
+    """
+    workers = workers or settings.FULLTEXT_REINDEX_WORKERS
+    if self.can_resume():
+      logger.info("Resuming interrupted full text reindex")
+    else:
+      self.start()
+    partitions = self.get_pending_partitions()
+    progress = {
+        "workers": workers,
+        "total": len(partitions),
+        "done": 0,
+        "partitions": [],
+    }
+
+    def report(partition_progress):
+      progress["done"] += 1
+      progress["partitions"].append(partition_progress)
+      if progress_callback:
+        progress_callback(progress)
+
+    try:
+      self.load_cache()
+      if workers > 1:
+        # workers must not share connections of the current process
+        db.session.remove()
+        db.engine.dispose()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+        try:
+          for partition_progress in pool.imap_unordered(
+              _reindex_partition_worker, partitions):
+            report(partition_progress)
+        finally:
+          pool.close()
+          pool.join()
+      else:
+        for model_name, range_start in partitions:
+          report(self.reindex_partition(model_name, range_start))
+      self.catch_up()
+      self.swap()
+    finally:
+      self.indexer.invalidate_cache()
+    return progress
@@ -3,24 +3,38 @@
 
 """SQL routines for full-text indexing."""
 
+from sqlalchemy.sql.expression import tuple_
+
 from ggrc import db
 from ggrc.fulltext import Indexer
+from ggrc.utils import list_chunks
 
 
 class SqlIndexer(Indexer):
-  def records_generator(self, record):
+  """Indexer that stores full text records in an SQL table."""
+
+  # Maximal number of (type, key) tuples in a single DELETE statement.
+  DELETE_CHUNK_SIZE = 1000
+
+  @staticmethod
+  def rows_generator(record):
+    """Yield column value dicts for all non empty properties of a record."""
     for prop, value in record.properties.items():
       for subproperty, content in value.items():
         if content is not None:
-          yield self.record_type(
-              key=record.key,
-              type=record.type,
-              context_id=record.context_id,
-              tags=record.tags,
-              property=prop,
-              subproperty=unicode(subproperty),
-              content=unicode(content),
-          )
+          yield {
+              "key": record.key,
+              "type": record.type,
+              "context_id": record.context_id,
+              "tags": record.tags,
+              "property": prop,
+              "subproperty": unicode(subproperty),
+              "content": unicode(content),
+          }
+
+  def records_generator(self, record):
+    for row in self.rows_generator(record):
+      yield self.record_type(**row)
 
   def create_record(self, record, commit=True):
     for db_record in self.records_generator(record):
@@ -46,6 +60,46 @@ class SqlIndexer(Indexer):
     if commit:
       db.session.commit()
 
+  def delete_records_by_pairs(self, pairs, commit=True):
+    """Delete all index entries for the given objects.
+
+    Args:
+      pairs: iterable of (type, key) tuples of objects whose index entries
+          should be removed.
+      commit: commit the session after removing the entries.
+    """
+    table = self.record_type.__table__
+    for chunk in list_chunks(sorted(set(pairs)), self.DELETE_CHUNK_SIZE):
+      db.session.execute(table.delete().where(
+          tuple_(table.c.type, table.c.key).in_(chunk)
+      ))
+    if commit:
+      db.session.commit()
+
+  def bulk_update_records(self, records, deleted_pairs=(), commit=True):
+    """Replace index entries for many objects with set based statements.
+
+    All existing entries for the given records and deleted objects are removed
+    with multi row DELETE statements and the new entries are inserted with a
+    single executemany INSERT.
+
+    Args:
+      records: iterable of fulltext records that should be (re)indexed.
+      deleted_pairs: iterable of (type, key) tuples of objects whose index
+          entries should only be removed.
+      commit: commit the session after writing the entries.
+    """
+    records = list(records)
+    pairs = {(record.type, record.key) for record in records}
+    pairs.update(deleted_pairs)
+    if pairs:
+      self.delete_records_by_pairs(pairs, commit=False)
+    rows = [row for record in records for row in self.rows_generator(record)]
+    if rows:
+      db.session.execute(self.record_type.__table__.insert(), rows)
+    if commit:
+      db.session.commit()
+
   def delete_all_records(self, commit=True):
     db.session.query(self.record_type).delete()
     if commit:
@@ -0,0 +1,37 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add fulltext reindex checkpoints
+
+Create Date: 2017-05-30 10:15:12.463128
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3f4a9e1b2c7d'
+down_revision = '59d9fbfb42dc'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'fulltext_reindex_checkpoints',
+      sa.Column('model_name', sa.String(length=64), nullable=False),
+      sa.Column('last_id', sa.Integer(), nullable=False, server_default="0"),
+      sa.Column('done', sa.Boolean(), nullable=False, server_default="0"),
+      sa.Column('created_at', sa.DateTime(), nullable=False),
+      sa.Column('updated_at', sa.DateTime(), nullable=False),
+      sa.PrimaryKeyConstraint('model_name')
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('fulltext_reindex_checkpoints')
+  op.execute("DROP TABLE IF EXISTS fulltext_record_properties_shadow")
@@ -0,0 +1,48 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add id ranges to fulltext reindex checkpoints
+
+Create Date: 2017-06-06 14:30:27.918264
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4c1e5a2f8d90'
+down_revision = '3f4a9e1b2c7d'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  # Checkpoints of an interrupted reindex can not be mapped to partitions.
+  op.execute("DELETE FROM fulltext_reindex_checkpoints")
+  op.add_column(
+      'fulltext_reindex_checkpoints',
+      sa.Column('range_start', sa.Integer(), nullable=False,
+                server_default="0"),
+  )
+  op.add_column(
+      'fulltext_reindex_checkpoints',
+      sa.Column('range_end', sa.Integer(), nullable=True),
+  )
+  op.execute("""
+      ALTER TABLE fulltext_reindex_checkpoints
+      DROP PRIMARY KEY, ADD PRIMARY KEY (model_name, range_start)
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.execute("DELETE FROM fulltext_reindex_checkpoints")
+  op.execute("""
+      ALTER TABLE fulltext_reindex_checkpoints
+      DROP PRIMARY KEY, ADD PRIMARY KEY (model_name)
+  """)
+  op.drop_column('fulltext_reindex_checkpoints', 'range_end')
+  op.drop_column('fulltext_reindex_checkpoints', 'range_start')
@@ -0,0 +1,39 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add FULLTEXT index on fulltext record content
+
+The index is used by the "fulltext" FULLTEXT_SEARCH_MODE, the default "like"
+mode does not use it. While it exists every write of full text records also
+updates the index.
+
+Creating the first FULLTEXT index of the table rebuilds the whole table to
+add the hidden FTS_DOC_ID column, which blocks writes to full text records
+for the duration of the rebuild. On large installations this migration should
+run in a maintenance window.
+
+Create Date: 2017-06-08 11:25:44.217093
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2d8b7c6e1f35'
+down_revision = '4c1e5a2f8d90'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.execute("""
+      CREATE FULLTEXT INDEX ft_fulltext_record_properties_content
+      ON fulltext_record_properties (content)
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_index('ft_fulltext_record_properties_content',
+                table_name='fulltext_record_properties')
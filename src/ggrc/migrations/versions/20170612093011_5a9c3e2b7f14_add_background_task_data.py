@@ -0,0 +1,38 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add background task data
+
+Create Date: 2017-06-12 09:30:11.582640
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '5a9c3e2b7f14'
+down_revision = '2d8b7c6e1f35'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'background_task_data',
+      sa.Column('task_id', sa.Integer(), nullable=False),
+      sa.Column('name', sa.String(length=64), nullable=False),
+      sa.Column('position', sa.Integer(), nullable=False),
+      sa.Column('content', mysql.MEDIUMBLOB(), nullable=False),
+      sa.ForeignKeyConstraint(['task_id'], ['background_tasks.id'],
+                              ondelete='CASCADE'),
+      sa.PrimaryKeyConstraint('task_id', 'name', 'position')
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('background_task_data')
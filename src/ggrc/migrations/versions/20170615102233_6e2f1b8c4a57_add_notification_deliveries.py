@@ -0,0 +1,38 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add notification deliveries
+
+Create Date: 2017-06-15 10:22:33.815624
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6e2f1b8c4a57'
+down_revision = '5a9c3e2b7f14'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'notification_deliveries',
+      sa.Column('recipient', sa.String(length=250), nullable=False),
+      sa.Column('day', sa.Date(), nullable=False),
+      sa.Column('notification_ids', sa.Text(), nullable=False),
+      sa.Column('claimed_at', sa.DateTime(), nullable=False),
+      sa.Column('sent_at', sa.DateTime(), nullable=True),
+      sa.PrimaryKeyConstraint('recipient', 'day')
+  )
+  op.create_index('ix_notification_deliveries_day',
+                  'notification_deliveries', ['day'])
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('notification_deliveries')
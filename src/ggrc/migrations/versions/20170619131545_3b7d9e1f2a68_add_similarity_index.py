@@ -0,0 +1,79 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add similarity index
+
+Create Date: 2017-06-19 13:15:45.264913
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3b7d9e1f2a68'
+down_revision = '6e2f1b8c4a57'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'similarity_index',
+      sa.Column('object_type', sa.String(length=250), nullable=False),
+      sa.Column('object_id', sa.Integer(), nullable=False),
+      sa.Column('related_type', sa.String(length=250), nullable=False),
+      sa.Column('related_id', sa.Integer(), nullable=False),
+      sa.Column('via_snapshot', sa.Boolean(), nullable=False),
+      sa.Column('mappings', sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint('object_type', 'object_id', 'related_type',
+                              'related_id', 'via_snapshot')
+  )
+  op.create_index('ix_similarity_index_related', 'similarity_index',
+                  ['related_type', 'related_id', 'via_snapshot'])
+  # Assessments are the only objects with similarity options, with Controls
+  # and Objectives as relevant types
+  op.execute("""
+      INSERT INTO similarity_index (
+          object_type, object_id, related_type, related_id, via_snapshot,
+          mappings
+      )
+      SELECT object_type, object_id, related_type, related_id, via_snapshot,
+             COUNT(*)
+      FROM (
+          SELECT source_type AS object_type, source_id AS object_id,
+                 destination_type AS related_type,
+                 destination_id AS related_id, 0 AS via_snapshot
+          FROM relationships
+          WHERE source_type = 'Assessment' AND
+                destination_type IN ('Control', 'Objective')
+          UNION ALL
+          SELECT destination_type, destination_id, source_type, source_id, 0
+          FROM relationships
+          WHERE destination_type = 'Assessment' AND
+                source_type IN ('Control', 'Objective')
+          UNION ALL
+          SELECT r.source_type, r.source_id, s.child_type, s.child_id, 1
+          FROM relationships AS r
+          JOIN snapshots AS s ON r.destination_type = 'Snapshot' AND
+                                 r.destination_id = s.id
+          WHERE r.source_type = 'Assessment' AND
+                s.child_type IN ('Control', 'Objective')
+          UNION ALL
+          SELECT r.destination_type, r.destination_id, s.child_type,
+                 s.child_id, 1
+          FROM relationships AS r
+          JOIN snapshots AS s ON r.source_type = 'Snapshot' AND
+                                 r.source_id = s.id
+          WHERE r.destination_type = 'Assessment' AND
+                s.child_type IN ('Control', 'Objective')
+      ) AS mappings
+      GROUP BY object_type, object_id, related_type, related_id, via_snapshot
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('similarity_index')
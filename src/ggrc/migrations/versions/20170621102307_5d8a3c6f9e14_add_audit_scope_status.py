@@ -0,0 +1,31 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add audit scope status
+
+Create Date: 2017-06-21 10:23:07.218459
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5d8a3c6f9e14'
+down_revision = '7c4e2a9d1b35'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column(
+      'audits',
+      sa.Column('scope_status', sa.String(length=250), nullable=True)
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_column('audits', 'scope_status')
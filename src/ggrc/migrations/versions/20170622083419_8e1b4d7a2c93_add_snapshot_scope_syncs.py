@@ -0,0 +1,34 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add snapshot scope syncs
+
+Create Date: 2017-06-22 08:34:19.604127
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e1b4d7a2c93'
+down_revision = '5d8a3c6f9e14'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'snapshot_scope_syncs',
+      sa.Column('parent_type', sa.String(length=250), nullable=False),
+      sa.Column('parent_id', sa.Integer(), nullable=False),
+      sa.Column('revision_id', sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint('parent_type', 'parent_id')
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('snapshot_scope_syncs')
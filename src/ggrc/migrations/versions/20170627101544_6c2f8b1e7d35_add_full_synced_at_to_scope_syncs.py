@@ -0,0 +1,31 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add full_synced_at to snapshot scope syncs
+
+Create Date: 2017-06-27 10:15:44.215378
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6c2f8b1e7d35'
+down_revision = '8e1b4d7a2c93'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column(
+      'snapshot_scope_syncs',
+      sa.Column('full_synced_at', sa.DateTime(), nullable=True)
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_column('snapshot_scope_syncs', 'full_synced_at')
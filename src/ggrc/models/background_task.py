@@ -1,6 +1,8 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import io
+import zlib
 from logging import getLogger
 from functools import wraps
 from time import time
@@ -16,6 +18,7 @@ from ggrc.models.mixins import Base
 from ggrc.models.deferred import deferred
 from ggrc.models.mixins import Stateful
 from ggrc.models.types import CompressedType
+from ggrc.utils import as_json
 
 
 # pylint: disable=invalid-name
@@ -48,11 +51,85 @@ class BackgroundTask(Base, Stateful, db.Model):
       }
   }
 
+  # Uncompressed size of a single stored data chunk.
+  DATA_CHUNK_SIZE = 64 * 1024
+
   def start(self):
     self.status = "Running"
     db.session.add(self)
     db.session.commit()
 
+  def update_progress(self, progress):
+    """Store intermediate JSON progress report of a running task.
+
+    The report is written with its own connection, outside of the current
+    session transaction, so progress of uncommitted work such as a dry run
+    import can be reported too.
+    """
+    result = {'content': as_json(progress),
+              'status_code': 200,
+              'headers': [('Content-Type', 'application/json')]}
+    table = self.__table__
+    db.engine.execute(
+        table.update().where(table.c.id == self.id).values(result=result))
+
+  def write_data(self, name, lines):
+    """Store lines of a file with the task.
+
+    Lines are stored in compressed chunks of about DATA_CHUNK_SIZE bytes as
+    they are read, so the file is never held in memory as a whole. Every
+    chunk is committed right away.
+
+    Args:
+      name (str): name of the stored file, such as "input" or "output".
+      lines (iterable): lines of the file.
+    """
+    position = 0
+    chunk, size = [], 0
+    for line in lines:
+      if isinstance(line, unicode):  # noqa
+        line = line.encode("utf-8")
+      chunk.append(line)
+      size += len(line)
+      if size >= self.DATA_CHUNK_SIZE:
+        self._write_data_chunk(name, position, "".join(chunk))
+        position += 1
+        chunk, size = [], 0
+    if chunk:
+      self._write_data_chunk(name, position, "".join(chunk))
+
+  def _write_data_chunk(self, name, position, content):
+    db.session.execute(BackgroundTaskData.__table__.insert(), {
+        "task_id": self.id,
+        "name": name,
+        "position": position,
+        "content": zlib.compress(content),
+    })
+    db.session.commit()
+
+  def iter_data(self, name):
+    """Generate chunks of a file stored with write_data.
+
+    Chunks are loaded from the database one at a time.
+    """
+    positions = db.session.query(BackgroundTaskData.position).filter(
+        BackgroundTaskData.task_id == self.id,
+        BackgroundTaskData.name == name,
+    ).order_by(BackgroundTaskData.position).all()
+    for position, in positions:
+      content = db.session.query(BackgroundTaskData.content).filter(
+          BackgroundTaskData.task_id == self.id,
+          BackgroundTaskData.name == name,
+          BackgroundTaskData.position == position,
+      ).scalar()
+      yield zlib.decompress(content)
+
+  def iter_data_lines(self, name):
+    """Generate lines of a file stored with write_data."""
+    for chunk in self.iter_data(name):
+      for line in io.BytesIO(chunk):
+        yield line
+
   def finish(self, status, result):
     # Ensure to not commit any not-yet-committed changes
     db.session.rollback()
@@ -78,8 +155,34 @@ class BackgroundTask(Base, Stateful, db.Model):
                               self.result['headers']))
 
 
-def create_task(name, url, queued_callback=None, parameters=None):
-
+class BackgroundTaskData(db.Model):
+  """Compressed chunk of a file stored with a background task."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = 'background_task_data'
+
+  task_id = db.Column(
+      db.Integer,
+      db.ForeignKey('background_tasks.id', ondelete='CASCADE'),
+      primary_key=True,
+      autoincrement=False,
+  )
+  name = db.Column(db.String(64), primary_key=True)
+  position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  content = db.Column(db.LargeBinary, nullable=False)
+
+
+def create_task(name, url, queued_callback=None, parameters=None, data=None):
+  """Create a background task and schedule it.
+
+  Args:
+    name (str): task name prefix.
+    url (str): url of the view that runs the task.
+    queued_callback: function that runs the task when task queues are not
+        available.
+    parameters: task parameters.
+    data (dict): files stored with the task before it is scheduled, file
+        names mapped to iterables of lines.
+  """
   # task name must be unique
   if not parameters:
     parameters = {}
@@ -88,6 +191,8 @@ def create_task(name, url, queued_callback=None, parameters=None):
   task.modified_by = get_current_user()
   db.session.add(task)
   db.session.commit()
+  for data_name, lines in (data or {}).iteritems():
+    task.write_data(data_name, lines)
 
   # schedule a task queue
   if getattr(settings, 'APP_ENGINE', False):
@@ -5,6 +5,9 @@
 
 This defines a procedure of getting "similar" objects which have similar
 relationships.
+
+Similar objects are looked up in the precomputed similarity index when it
+covers the requested types, see ggrc.models.similarity_index.
 """
 
 from sqlalchemy import and_
@@ -15,6 +18,7 @@ from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func
 
 from ggrc import db
+from ggrc.models import similarity_index
 from ggrc.models.relationship import Relationship
 from ggrc.models.snapshot import Snapshot
 
@@ -59,6 +63,10 @@ class WithSimilarityScore(object):
     if threshold is None:
       threshold = cls.similarity_options["threshold"]
 
+    if cls._is_indexed(types, relevant_types, threshold):
+      return cls._query_similarity_index(id_, types, relevant_types,
+                                         threshold)
+
     # naming: self is "object", the object mapped to it is "related",
     # the object mapped to "related" is "similar"
 
@@ -115,6 +123,65 @@ class WithSimilarityScore(object):
 
     return result
 
+  @classmethod
+  def _is_indexed(cls, types, relevant_types, threshold):
+    """Check whether the similarity index holds all mappings for a query.
+
+    Mappings to objects that are not relevant are not indexed, so queries
+    where those count (with a threshold of zero or below) are not indexed
+    either.
+    """
+    object_types, related_types = similarity_index.get_indexed_types()
+    return (types != "all" and
+            cls.__name__ in object_types and
+            object_types.issuperset(types) and
+            related_types.issuperset(relevant_types) and
+            threshold > 0)
+
+  @classmethod
+  def _query_similarity_index(cls, id_, types, relevant_types, threshold):
+    """Get similar objects with a self-join of the similarity index.
+
+    Returns:
+      the same query as get_similar_objects_query.
+    """
+    index = similarity_index.SimilarityIndex
+    related = aliased(index, name="related")
+    similar = aliased(index, name="similar")
+
+    weight_case = case(
+        [(related.related_type == type_, parameters["weight"])
+         for type_, parameters in relevant_types.items()],
+        else_=0)
+    # objects with several mappings to the same related object are counted
+    # once per pair of mappings, like in the relationships based query
+    weight_sum = func.sum(
+        weight_case * related.mappings * similar.mappings
+    ).label("weight")
+
+    return db.session.query(
+        similar.object_id.label("id"),
+        similar.object_type.label("type"),
+        weight_sum,
+    ).join(
+        related,
+        and_(related.related_type == similar.related_type,
+             related.related_id == similar.related_id,
+             related.via_snapshot == similar.via_snapshot),
+    ).filter(
+        related.object_type == cls.__name__,
+        related.object_id == id_,
+        related.related_type.in_(relevant_types.keys()),
+        similar.object_type.in_(types),
+        or_(similar.object_id != id_,
+            similar.object_type != cls.__name__),
+    ).group_by(
+        similar.object_type,
+        similar.object_id,
+    ).having(
+        weight_sum >= threshold,
+    )
+
   @classmethod
   def _join_snapshots(cls, id_, types):
     """Retrieves related objects with snapshots
@@ -3,6 +3,9 @@
 
 """Defines a Revision model for storing snapshots."""
 
+from sqlalchemy import event
+from sqlalchemy import text
+
 from ggrc import builder
 from ggrc import db
 from ggrc.models.mixins import Base
@@ -61,18 +64,31 @@ class Revision(Base, db.Model):
     )
 
   def __init__(self, obj, modified_by_id, action, content):
-    self.resource_id = obj.id
-    self.resource_type = obj.__class__.__name__
-    self.resource_slug = getattr(obj, "slug", None)
-    self.modified_by_id = modified_by_id
-    self.action = action
-    self.content = content
+    for attr, value in self.get_row(obj, modified_by_id, action,
+                                    content).iteritems():
+      setattr(self, attr, value)
+
+  @staticmethod
+  def get_row(obj, modified_by_id, action, content):
+    """Get values of a revision row for the given object.
 
+    The returned dicts can be inserted into the revisions table directly,
+    which is used for writing many revisions with a single statement.
+    """
+    row = {
+        "resource_id": obj.id,
+        "resource_type": obj.__class__.__name__,
+        "resource_slug": getattr(obj, "slug", None),
+        "modified_by_id": modified_by_id,
+        "action": action,
+        "content": content,
+    }
     for attr in ["source_type",
                  "source_id",
                  "destination_type",
                  "destination_id"]:
-      setattr(self, attr, getattr(obj, attr, None))
+      row[attr] = getattr(obj, attr, None)
+    return row
 
   @builder.simple_property
   def description(self):
@@ -115,3 +131,53 @@ class Revision(Base, db.Model):
     if self.event.action == "BULK":
       result += ", via bulk action"
     return result
+
+
+class LatestRevision(db.Model):
+  """Id of the newest revision of an object.
+
+  Rows of revisions added through the ORM are updated on insert, code that
+  inserts revisions directly into the table has to call
+  update_latest_revisions with the event of the new revisions.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "latest_revisions"
+
+  resource_type = db.Column(db.String(250), primary_key=True)
+  resource_id = db.Column(db.Integer, primary_key=True)
+  revision_id = db.Column(db.Integer, nullable=False)
+
+
+def update_latest_revisions(event_id, executor=None):
+  """Point latest_revisions rows to revisions of an event.
+
+  Args:
+    event_id: id of the event of newly inserted revisions.
+    executor: session or engine that inserted the revisions, defaults to
+      db.session.
+  """
+  (executor or db.session).execute(text("""
+      INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+      SELECT resource_type, resource_id, MAX(id)
+      FROM revisions
+      WHERE event_id = :event_id
+      GROUP BY resource_type, resource_id
+      ON DUPLICATE KEY UPDATE
+          revision_id = GREATEST(revision_id, VALUES(revision_id))
+  """), {"event_id": event_id})
+
+
+@event.listens_for(Revision, "after_insert")
+def update_latest_revision(mapper, connection, target):
+  """Point the latest_revisions row of an object to its new revision."""
+  # pylint: disable=unused-argument
+  connection.execute(text("""
+      INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+      VALUES (:resource_type, :resource_id, :revision_id)
+      ON DUPLICATE KEY UPDATE
+          revision_id = GREATEST(revision_id, VALUES(revision_id))
+  """), {
+      "resource_type": target.resource_type,
+      "resource_id": target.resource_id,
+      "revision_id": target.id,
+  })
@@ -0,0 +1,211 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Precomputed index of mappings used for finding similar objects.
+
+Objects are similar if they are mapped to the same "related" objects, either
+directly or through snapshots of the same object (see WithSimilarityScore).
+For every object of a model with similarity_options the index holds a row per
+related object of a relevant type, with the number of mappings between them.
+Similar objects are then found by a self-join of the index on the related
+object, instead of joining the whole relationships table twice.
+
+Rows of an object are recomputed from its relationships before every commit
+that creates or deletes a relationship of the object.
+"""
+
+import collections
+
+from flask import has_request_context
+from sqlalchemy import and_
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import union_all
+
+from ggrc import db
+from ggrc.models.relationship import Relationship
+from ggrc.models.snapshot import Snapshot
+from ggrc.utils import list_chunks
+
+
+class SimilarityIndex(db.Model):
+  """Mappings of an object to a related object of a relevant type.
+
+  via_snapshot marks mappings to snapshots of the related object, these only
+  match mappings to snapshots of the same object.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "similarity_index"
+
+  object_type = db.Column(db.String(250), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True)
+  related_type = db.Column(db.String(250), primary_key=True)
+  related_id = db.Column(db.Integer, primary_key=True)
+  via_snapshot = db.Column(db.Boolean, primary_key=True)
+  mappings = db.Column(db.Integer, nullable=False)
+
+  __table_args__ = (
+      db.Index("ix_similarity_index_related",
+               "related_type", "related_id", "via_snapshot"),
+  )
+
+
+def get_indexed_types():
+  """Get types of indexed objects and of their related objects.
+
+  Returns:
+    (set, set): names of models with similarity_options and names of types
+      relevant for any of them.
+  """
+  from ggrc.models import all_models
+  object_types = set()
+  related_types = set()
+  for model in all_models.all_models:
+    options = getattr(model, "similarity_options", None)
+    if options:
+      object_types.add(model.__name__)
+      related_types.update(options["relevant_types"])
+  return object_types, related_types
+
+
+def _get_mappings_query(object_type, ids, related_types):
+  """Get index rows of objects computed from the relationships table."""
+  rel = Relationship.__table__
+  snapshot = Snapshot.__table__
+  queries = []
+  for obj, other in (("source", "destination"), ("destination", "source")):
+    obj_type, obj_id = rel.c[obj + "_type"], rel.c[obj + "_id"]
+    other_type, other_id = rel.c[other + "_type"], rel.c[other + "_id"]
+    queries.append(select([
+        obj_type.label("object_type"),
+        obj_id.label("object_id"),
+        other_type.label("related_type"),
+        other_id.label("related_id"),
+        literal(False).label("via_snapshot"),
+    ]).where(and_(
+        obj_type == object_type,
+        obj_id.in_(ids),
+        other_type.in_(related_types),
+    )))
+    queries.append(select([
+        obj_type.label("object_type"),
+        obj_id.label("object_id"),
+        snapshot.c.child_type.label("related_type"),
+        snapshot.c.child_id.label("related_id"),
+        literal(True).label("via_snapshot"),
+    ]).select_from(rel.join(snapshot, and_(
+        other_type == "Snapshot",
+        other_id == snapshot.c.id,
+    ))).where(and_(
+        obj_type == object_type,
+        obj_id.in_(ids),
+        snapshot.c.child_type.in_(related_types),
+    )))
+  mappings = union_all(*queries).alias("mappings")
+  columns = [
+      mappings.c.object_type,
+      mappings.c.object_id,
+      mappings.c.related_type,
+      mappings.c.related_id,
+      mappings.c.via_snapshot,
+  ]
+  return select(columns + [func.count().label("mappings")]).group_by(*columns)
+
+
+def reindex(objects):
+  """Recompute index rows of objects.
+
+  Args:
+    objects (iterable): (type, id) pairs of objects, objects of types that are
+      not indexed are skipped.
+  """
+  object_types, related_types = get_indexed_types()
+  ids_by_type = collections.defaultdict(set)
+  for type_, id_ in objects:
+    if type_ in object_types:
+      ids_by_type[type_].add(id_)
+  table = SimilarityIndex.__table__
+  for object_type, ids in ids_by_type.iteritems():
+    for ids_chunk in list_chunks(list(ids)):
+      db.session.execute(table.delete().where(and_(
+          table.c.object_type == object_type,
+          table.c.object_id.in_(ids_chunk),
+      )))
+      rows = db.session.execute(
+          _get_mappings_query(object_type, ids_chunk, related_types))
+      values = [dict(row) for row in rows]
+      if values:
+        db.session.execute(table.insert(), values)
+
+
+def get_changed_objects(new, deleted):
+  """Get objects with outdated index rows.
+
+  Args:
+    new (iterable): created instances.
+    deleted (iterable): deleted instances.
+
+  Returns:
+    set of (type, id) pairs of objects mapped by the created or deleted
+      relationships and of the deleted objects.
+  """
+  changed = set()
+  for obj in new:
+    if isinstance(obj, Relationship):
+      changed.add((obj.source_type, obj.source_id))
+      changed.add((obj.destination_type, obj.destination_id))
+  for obj in deleted:
+    if isinstance(obj, Relationship):
+      changed.add((obj.source_type, obj.source_id))
+      changed.add((obj.destination_type, obj.destination_id))
+    else:
+      changed.add((obj.__class__.__name__, obj.id))
+  return changed
+
+
+def get_bulk_inserted_relationships():
+  """Get objects mapped by relationships inserted without the ORM.
+
+  Bulk inserted relationships, e.g. automappings, are added to the request
+  cache with their ids, while relationships created through the ORM are
+  cached before they get their ids and are tracked by the session listener.
+  """
+  from ggrc.services.common import get_cache
+  cache = get_cache() if has_request_context() else None
+  if not cache:
+    return set()
+  changed = set()
+  for obj, json in cache.new.iteritems():
+    if isinstance(obj, Relationship) and json["id"] is not None:
+      changed.add((json["source_type"], json["source_id"]))
+      changed.add((json["destination_type"], json["destination_id"]))
+  return changed
+
+
+@event.listens_for(db.session.__class__, "after_flush")
+def collect_changed_objects(session, flush_context):
+  """Remember objects with outdated index rows until the commit."""
+  # pylint: disable=unused-argument
+  if not hasattr(session, "similarity_changed"):
+    session.similarity_changed = set()
+  session.similarity_changed.update(
+      get_changed_objects(session.new, session.deleted))
+
+
+@event.listens_for(db.session.__class__, "before_commit")
+def update_index(session):
+  """Update index rows of objects with changed relationships."""
+  session.flush()
+  changed = getattr(session, "similarity_changed", set())
+  changed.update(get_bulk_inserted_relationships())
+  session.similarity_changed = set()
+  if changed:
+    reindex(changed)
+
+
+@event.listens_for(db.session.__class__, "after_rollback")
+def clear_changed_objects(session):
+  """Drop objects collected in the rolled back transaction."""
+  session.similarity_changed = set()
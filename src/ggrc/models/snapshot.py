@@ -148,12 +148,26 @@ class Snapshot(relationship.Relatable, mixins.Base, db.Model):
 
 
 class Snapshotable(object):
-  """Provide `snapshotted_objects` on for parent objects."""
+  """Provide `snapshotted_objects` on for parent objects.
+
+  scope_status is only set for objects whose snapshots are created by a
+  background task, it is "Pending" until all snapshots are created and
+  "Ready" or "Failed" afterwards.
+  """
+
+  SCOPE_PENDING = "Pending"
+  SCOPE_READY = "Ready"
+  SCOPE_FAILED = "Failed"
 
   _publish_attrs = [
       "snapshotted_objects",
+      reflection.PublishOnly("scope_status"),
   ]
 
+  @declared_attr
+  def scope_status(cls):  # pylint: disable=no-self-argument
+    return db.Column(db.String(length=250), nullable=True)
+
   @declared_attr
   def snapshotted_objects(cls):  # pylint: disable=no-self-argument
     """Return all snapshotted objects"""
@@ -177,6 +191,22 @@ class Snapshotable(object):
     )
 
 
+class SnapshotScopeSync(db.Model):
+  """Newest revision considered by the last snapshot scope sync of a parent.
+
+  Changes to the scope of the parent after the last sync are found among
+  revisions with higher ids. full_synced_at is the time of the last sync
+  that compared the whole scope of the parent.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "snapshot_scope_syncs"
+
+  parent_type = db.Column(db.String(250), primary_key=True)
+  parent_id = db.Column(db.Integer, primary_key=True)
+  revision_id = db.Column(db.Integer, nullable=False)
+  full_synced_at = db.Column(db.DateTime, nullable=True)
+
+
 def handle_post_flush(session, flush_context, instances):
   """Handle snapshot objects on api post requests."""
   # pylint: disable=unused-argument
@@ -8,7 +8,10 @@ Add Json and Compressed type declaration for use in ORM models.
 
 import json
 import pickle
+import zlib
+
 import sqlalchemy.types as types
+
 from ggrc import utils
 from ggrc.models import exceptions
 
@@ -69,18 +72,51 @@ class CompressedType(types.TypeDecorator):
   # pylint: disable=W0223
   """ Custom Compresed data type
 
-  Custom type for storing any python object in our database as serialized text.
+  Custom type for storing JSON serializable python objects in our database as
+  compressed JSON.
+
+  Stored values start with a header made of MAGIC and a format version byte.
+  Values without the header were stored as plain pickles by older versions
+  and can still be read.
   """
   MAX_BINARY_LENGTH = 16777215
   impl = types.LargeBinary(length=MAX_BINARY_LENGTH)
 
+  # pickles never start with a zero byte
+  MAGIC = "\x00GC"
+  # version 1: zlib compressed utf-8 encoded JSON
+  VERSION = 1
+  COMPRESSION_LEVEL = 6
+
+  @classmethod
+  def encode(cls, value):
+    """Serialize a value into the current storage format."""
+    data = utils.as_json(value)
+    if isinstance(data, unicode):  # noqa
+      data = data.encode("utf-8")
+    return (cls.MAGIC + chr(cls.VERSION) +
+            zlib.compress(data, cls.COMPRESSION_LEVEL))
+
+  @classmethod
+  def decode(cls, value):
+    """Deserialize a value stored in any of the known formats."""
+    if not value.startswith(cls.MAGIC):
+      return pickle.loads(value)
+    header_length = len(cls.MAGIC) + 1
+    version = ord(value[header_length - 1])
+    if version != cls.VERSION:
+      raise ValueError("Unknown compressed value version: {}".format(version))
+    return json.loads(zlib.decompress(value[header_length:]))
+
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = pickle.loads(value)
+      value = self.decode(value)
     return value
 
   def process_bind_param(self, value, dialect):
-    value = pickle.dumps(value)
+    if value is None:
+      return value
+    value = self.encode(value)
     if len(value) > self.MAX_BINARY_LENGTH:
       raise exceptions.ValidationError("Log record content too long")
     return value
@@ -8,11 +8,18 @@
 """
 
 
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date
 from datetime import datetime
 from logging import getLogger
 
+from flask import url_for
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.expression import true
 from werkzeug.exceptions import Forbidden
@@ -23,11 +30,18 @@ from ggrc import extensions
 from ggrc import settings
 from ggrc.models import Person
 from ggrc.models import Notification
+from ggrc.models import get_model
+from ggrc.models.background_task import create_task
+from ggrc.notifications import delivery
+from ggrc.notifications import transports
 from ggrc.rbac import permissions
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.utils import merge_dict
 
 from ggrc_workflows.notification.data_handler import (
-    cycle_tasks_cache, deleted_task_rels_cache, get_cycle_task_data
+    cycle_tasks_cache, deleted_task_rels_cache, get_cycle_task_data,
+    get_cycle_task_data_batch
 )
 
 
@@ -44,6 +58,7 @@ class Services(object):
   """
 
   services = []
+  batch_services = []
 
   @classmethod
   def get_service_function(cls, name):
@@ -89,9 +104,57 @@ class Services(object):
 
     return service(notif)
 
+  @classmethod
+  def get_batch_service_function(cls, name):
+    """Get callback function for a list of notifications of an object type.
+
+    Args:
+      name: Name of an object for which we want to get a batch service
+        function, such as "CycleTask", "Assessment", etc.
+
+    Returns:
+      callable: A function that takes a list of notifications and returns a
+        list of data dicts for those notifications, or None if the object
+        has no batch service.
+    """
+    if not cls.batch_services:
+      cls.batch_services = extensions.get_module_contributions(
+          "contributed_batch_notifications")
+    return cls.batch_services.get(name)
+
+  @classmethod
+  def call_service_batch(cls, object_type, notifications, **kwargs):
+    """Call data handler service for notifications of a single object type.
+
+    The batch service of the object type is called once for all given
+    notifications. Object types without a batch service fall back to calling
+    their service for each notification.
+
+    Args:
+      object_type (str): Object type of all given notifications.
+      notifications (list of Notification): Notifications for which we want
+        to get the notification data dicts.
+
+    Returns:
+      list of dicts: Results of the data handler for each notification.
+    """
+    service = cls.get_batch_service_function(object_type)
+    if service is None:
+      return [cls.call_service(notif, **kwargs) for notif in notifications]
+
+    if service is get_cycle_task_data_batch:
+      return service(
+          notifications,
+          tasks_cache=kwargs.get("tasks_cache"),
+          del_rels_cache=kwargs.get("del_rels_cache")
+      )
+
+    return service(notifications)
+
 
 def get_filter_data(
-    notification, people_cache, tasks_cache=None, del_rels_cache=None
+    notification, people_cache, tasks_cache=None, del_rels_cache=None,
+    data=None
 ):
   """Get filtered notification data.
 
@@ -107,14 +170,17 @@ def get_filter_data(
       accessible by their ID as a key
     del_rels_cache (dict): prefetched Revision instances representing the
       relationships to Tasks that were deleted grouped by task ID as a key
+    data (dict): result of the data handler for the notification, if it has
+      already been computed.
 
   Returns:
     dict: dictionary containing notification data for all users who should
       receive it, according to their notification settings.
   """
   result = {}
-  data = Services.call_service(
-      notification, tasks_cache=tasks_cache, del_rels_cache=del_rels_cache)
+  if data is None:
+    data = Services.call_service(
+        notification, tasks_cache=tasks_cache, del_rels_cache=del_rels_cache)
 
   for user, user_data in data.iteritems():
     if should_receive(notification, user_data, people_cache):
@@ -122,37 +188,131 @@ def get_filter_data(
   return result
 
 
-def get_notification_data(notifications):
-  """Get notification data for all notifications.
+def prefetch_notification_objects(notifications):
+  """Load objects of all notifications with a single query per object type.
 
-  This function returns a filtered data for all notifications for the users
-  that should receive it.
+  Loaded objects are kept in the session identity map, so data handlers that
+  get the notification objects by their primary key do not query them one by
+  one.
+
+  Args:
+    notifications (list of Notification): Notifications whose objects should
+      be loaded.
+
+  Returns:
+    dict: notifications grouped by their object type.
+  """
+  notif_by_type = defaultdict(list)
+  for notification in notifications:
+    notif_by_type[notification.object_type].append(notification)
+
+  for object_type, type_notifications in notif_by_type.iteritems():
+    model = get_model(object_type)
+    if model is None:
+      continue
+    object_ids = list({notif.object_id for notif in type_notifications})
+    for ids in list_chunks(object_ids):
+      model.query.filter(model.id.in_(ids)).all()
+  return notif_by_type
+
+
+def get_service_data(notifications, tasks_cache=None, del_rels_cache=None):
+  """Get unfiltered data handler results for all notifications.
+
+  Notifications are grouped by object type, after the objects of each type
+  have been loaded in bulk, and the data handler service of each type is
+  called once for the whole group.
+
+  Returns:
+    list of (Notification, dict) tuples with results of data handlers.
+  """
+  notif_by_type = prefetch_notification_objects(notifications)
+  service_data = []
+  for object_type, type_notifications in notif_by_type.iteritems():
+    service_data.extend(zip(type_notifications, Services.call_service_batch(
+        object_type, type_notifications, tasks_cache=tasks_cache,
+        del_rels_cache=del_rels_cache)))
+  return service_data
+
+
+def load_people(person_ids):
+  """Load people with their roles and notification configs in bulk.
+
+  Args:
+    person_ids (iterable): Ids of people that should be loaded.
+
+  Returns:
+    dict: people cache with Person objects accessible by their ids.
+  """
+  people_cache = {}
+  person_ids = list(set(person_ids) - {-1})
+  for ids in list_chunks(person_ids):
+    people = db.session.query(Person).options(
+        joinedload('user_roles').joinedload('role'),
+        joinedload('notification_configs')
+    ).filter(Person.id.in_(ids))
+    for person in people:
+      people_cache[person.id] = person
+  return people_cache
+
+
+def get_filtered_notification_data(notifications):
+  """Get data of every notification for the users that should receive it.
 
   Args:
     notifications (list of Notification): List of notification for which we
       want to get notification data.
 
   Returns:
-    dict: Filtered dictionary containing all the data that should be sent for
-      the given notification list.
+    list of (Notification, dict) tuples with filtered data of every
+      notification.
   """
   if not notifications:
-    return {}
-  aggregate_data = {}
-  people_cache = {}
+    return []
 
   tasks_cache = cycle_tasks_cache(notifications)
   deleted_rels_cache = deleted_task_rels_cache(tasks_cache.keys())
 
-  for notification in notifications:
-    filtered_data = get_filter_data(
-        notification, people_cache, tasks_cache=tasks_cache,
+  with benchmark("Get notification data handler results"):
+    service_data = get_service_data(
+        notifications, tasks_cache=tasks_cache,
         del_rels_cache=deleted_rels_cache)
-    aggregate_data = merge_dict(aggregate_data, filtered_data)
 
-  # Remove notifications for objects without a contact (such as task groups)
-  aggregate_data.pop("", None)
+  with benchmark("Load notification recipients"):
+    people_cache = load_people(
+        user_data["user"]["id"]
+        for _, data in service_data
+        for user_data in data.itervalues()
+    )
 
+  result = []
+  for notification, data in service_data:
+    filtered_data = get_filter_data(
+        notification, people_cache, data=data)
+    # Remove notifications for objects without a contact (such as task
+    # groups)
+    filtered_data.pop("", None)
+    result.append((notification, filtered_data))
+  return result
+
+
+def get_notification_data(notifications):
+  """Get notification data for all notifications.
+
+  This function returns a filtered data for all notifications for the users
+  that should receive it.
+
+  Args:
+    notifications (list of Notification): List of notification for which we
+      want to get notification data.
+
+  Returns:
+    dict: Filtered dictionary containing all the data that should be sent for
+      the given notification list.
+  """
+  aggregate_data = {}
+  for _, filtered_data in get_filtered_notification_data(notifications):
+    aggregate_data = merge_dict(aggregate_data, filtered_data)
   return aggregate_data
 
 
@@ -184,6 +344,14 @@ def get_pending_notifications():
   return notifications, data
 
 
+def get_daily_notification_list():
+  """Get today's and overdue notifications that were not sent yet."""
+  return db.session.query(Notification).filter(
+      (Notification.send_on <= datetime.today()) &
+      ((Notification.sent_at.is_(None)) | (Notification.repeating == true()))
+  ).all()
+
+
 def get_daily_notifications():
   """Get notification data for all future notifications.
 
@@ -191,11 +359,7 @@ def get_daily_notifications():
     list of Notifications, data: a tuple of notifications that were handled
       and corresponding data for those notifications.
   """
-  notifications = db.session.query(Notification).filter(
-      (Notification.send_on <= datetime.today()) &
-      ((Notification.sent_at.is_(None)) | (Notification.repeating == true()))
-  ).all()
-
+  notifications = get_daily_notification_list()
   return notifications, get_notification_data(notifications)
 
 
@@ -252,22 +416,224 @@ def should_receive(notif, user_data, people_cache):
   return has_digest
 
 
+@contextmanager
+def record_stage(timings, stage):
+  """Record duration of a digest stage in seconds."""
+  start = time.time()
+  with benchmark("Daily digest: {}".format(stage)):
+    yield
+  timings[stage] = time.time() - start
+
+
+def map_in_threads(function, items, workers):
+  """Call a function for all items in a pool of worker threads.
+
+  Args:
+    function (callable): function that is called with every item.
+    items (list): arguments for the function.
+    workers (int): number of threads, items are handled in the calling thread
+      if it is not greater than 1.
+
+  Returns:
+    list: results of the function in the order of the items.
+  """
+  if workers <= 1 or len(items) <= 1:
+    return [function(item) for item in items]
+
+  results = [None] * len(items)
+  errors = []
+  pending = iter(enumerate(items))
+  lock = threading.Lock()
+
+  def worker():
+    while not errors:
+      with lock:
+        index, item = next(pending, (None, None))
+      if index is None:
+        return
+      try:
+        results[index] = function(item)
+      except Exception:  # pylint: disable=broad-except
+        errors.append(sys.exc_info())
+
+  threads = [threading.Thread(target=worker)
+             for _ in range(min(workers, len(items)))]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  if errors:
+    exc_type, exc_value, exc_trace = errors[0]
+    raise exc_type, exc_value, exc_trace
+  return results
+
+
 def send_daily_digest_notifications():
   """Send emails for today's or overdue notifications.
 
+  With DIGEST_SHARDS set to more than one shard, the digest of every shard is
+  sent by a separate background task.
+
   Returns:
-    str: String containing a simple list of who received the notification.
+    str: String containing a simple list of who received the notification or
+      of the scheduled tasks.
   """
   # pylint: disable=invalid-name
-  notif_list, notif_data = get_daily_notifications()
+  shards = settings.DIGEST_SHARDS
+  day = date.today()
+  delivery.remove_expired(day)
+  if shards <= 1:
+    return send_daily_digest_shard(day=day)
+
+  from ggrc.views.notifications import send_daily_digest_shard_task
+  tasks = [
+      create_task(
+          "daily_digest_{}_".format(shard),
+          url_for(send_daily_digest_shard_task.__name__),
+          send_daily_digest_shard_task,
+          {"shard": shard, "shards": shards, "day": day.isoformat()},
+      )
+      for shard in range(shards)
+  ]
+  return "scheduled tasks: <br> {}".format(
+      "<br>".join(task.name for task in tasks))
+
+
+def get_recipient_digest(recipient, notif_data, delivered_ids):
+  """Get digest data of a recipient.
+
+  Args:
+    recipient (str): email of the recipient.
+    notif_data (list): (notification id, dict) tuples with filtered data of
+      pending notifications.
+    delivered_ids (set): ids of notifications that were already delivered to
+      the recipient.
+
+  Returns:
+    tuple: ids of notifications in the digest and digest data.
+  """
+  notification_ids = set()
+  data = {}
+  for notification_id, filtered_data in notif_data:
+    if recipient in filtered_data and notification_id not in delivered_ids:
+      notification_ids.add(notification_id)
+      data = merge_dict(data, copy.deepcopy(filtered_data[recipient]))
+  return notification_ids, data
+
+
+def send_daily_digest_shard(shard=0, shards=1, day=None):
+  """Send daily digest emails to recipients in a single shard.
+
+  Recipients are handled in batches of DIGEST_BATCH_SIZE. Digests of every
+  batch are claimed in the delivery ledger, rendered and sent by a pool of
+  DIGEST_WORKERS threads, with at most DIGEST_MAX_CONCURRENT_SENDS emails
+  being sent at once, and marked as sent in the ledger right after the batch.
+  Digests are built after they are claimed and leave out notifications that
+  other runs delivered in the meantime. Notifications are marked as sent once
+  they were delivered to all their recipients.
+
+  Args:
+    shard (int): index of the shard.
+    shards (int): number of shards.
+    day (date or str): day of the digest, defaults to today.
+
+  Returns:
+    str: String containing a simple list of who received the notification.
+  """
+  if day is None:
+    day = date.today()
+  elif isinstance(day, basestring):
+    day = datetime.strptime(day, "%Y-%m-%d").date()
+  timings = OrderedDict()
+  with record_stage(timings, "fetch"):
+    notif_list = get_daily_notification_list()
+    notif_data = get_filtered_notification_data(notif_list)
+    # ledger commits expire the notifications, so only plain values of them
+    # are used while sending
+    notif_info = [(notif.id, notif.repeating, notif.send_on)
+                  for notif in notif_list]
+    notif_by_id = {notif.id: notif for notif in notif_list}
+    notif_data = [(notification.id, filtered_data)
+                  for notification, filtered_data in notif_data]
+  all_recipients = {recipient for _, filtered_data in notif_data
+                    for recipient in filtered_data}
+  recipients = sorted(recipient for recipient in all_recipients
+                      if delivery.get_shard(recipient, shards) == shard)
+  with record_stage(timings, "ledger"):
+    delivered = delivery.get_delivered(recipients, day, notif_info)
+
+  subject = "GGRC daily digest for {}".format(day.strftime("%b %d"))
+  send_limit = threading.BoundedSemaphore(settings.DIGEST_MAX_CONCURRENT_SENDS)
+  render_times = []
+  send_times = []
+
+  def render_and_send(item):
+    """Render the digest for a single recipient and send it."""
+    user_email, data = item
+    try:
+      start = time.time()
+      email_body = settings.EMAIL_DIGEST.render(digest=modify_data(data))
+      render_times.append(time.time() - start)
+      with send_limit:
+        start = time.time()
+        send_email(user_email, subject, email_body)
+        send_times.append(time.time() - start)
+    except Exception:  # pylint: disable=broad-except
+      logger.exception("Failed to send daily digest to %s", user_email)
+      return False
+    return True
+
   sent_emails = []
-  subject = "GGRC daily digest for {}".format(date.today().strftime("%b %d"))
-  for user_email, data in notif_data.iteritems():
-    data = modify_data(data)
-    email_body = settings.EMAIL_DIGEST.render(digest=data)
-    send_email(user_email, subject, email_body)
-    sent_emails.append(user_email)
-  set_notification_sent_time(notif_list)
+  failed_emails = []
+  with record_stage(timings, "render and send"):
+    for batch in list_chunks(recipients, settings.DIGEST_BATCH_SIZE):
+      claimed_at, claimed = delivery.claim([
+          recipient for recipient in batch
+          if any(recipient in filtered_data and
+                 notification_id not in delivered.get(recipient, ())
+                 for notification_id, filtered_data in notif_data)
+      ], day)
+      # another run could have sent the digest after it was read from the
+      # ledger, claimed rows hold all notifications delivered on the day
+      digests = {}
+      for email in claimed:
+        digests[email] = get_recipient_digest(
+            email, notif_data,
+            delivered.get(email, set()) | set(claimed[email]))
+      emails = sorted(email for email in claimed if digests[email][0])
+      results = map_in_threads(
+          render_and_send, [(email, digests[email][1]) for email in emails],
+          settings.DIGEST_WORKERS)
+      sent = [email for email, success in zip(emails, results) if success]
+      failed = [email for email, success in zip(emails, results)
+                if not success]
+      # rows with nothing left to send are marked as sent again unchanged
+      delivery.mark_sent(day, claimed_at, {
+          email: set(claimed[email]) | digests[email][0]
+          for email in set(sent) | (set(claimed) - set(emails))
+      })
+      delivery.release(day, claimed_at, failed)
+      sent_emails.extend(sent)
+      failed_emails.extend(failed)
+  timings["render total"] = sum(render_times)
+  timings["send total"] = sum(send_times)
+
+  with record_stage(timings, "mark sent"):
+    delivered = delivery.get_delivered(all_recipients, day, notif_info)
+    set_notification_sent_time([
+        notif_by_id[notification_id]
+        for notification_id, filtered_data in notif_data
+        if all(notification_id in delivered.get(recipient, ())
+               for recipient in filtered_data)
+    ])
+  logger.info(
+      "Sent %d daily digests of shard %d/%d for %d notifications, "
+      "%d failed, stage timings: %s",
+      len(sent_emails), shard + 1, shards, len(notif_list),
+      len(failed_emails),
+      ", ".join("{} {:.3f}s".format(stage, duration)
+                for stage, duration in timings.iteritems()),
+  )
   return "emails sent to: <br> {}".format("<br>".join(sent_emails))
 
 
@@ -352,13 +718,7 @@ def send_email(user_email, subject, body):
     logger.error("APPENGINE_EMAIL setting is invalid.")
     return
 
-  message = mail.EmailMessage(sender=sender, subject=subject)
-
-  message.to = user_email
-  message.body = "TODO: add email in text mode."
-  message.html = body
-
-  message.send()
+  transports.get_transport_class()().send(sender, user_email, subject, body)
 
 
 def modify_data(data):
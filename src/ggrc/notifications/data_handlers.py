@@ -5,12 +5,19 @@
 
 Main contributed functions are:
   get_assignable_data,
+  get_comment_data,
+
+Batch variants of these functions load the objects of all given notifications
+in bulk before building the data of each notification.
 """
 
 import datetime
 import urlparse
 from logging import getLogger
 
+from sqlalchemy import and_
+from sqlalchemy import or_
+
 from ggrc import models
 from ggrc import utils
 
@@ -205,6 +212,26 @@ def get_notification_object(notif):
   return None
 
 
+def load_objects(model, object_ids):
+  """Load objects with their eager query options in bulk.
+
+  Loaded objects are kept in the session identity map, so their later lookups
+  by primary key do not query them again.
+
+  Args:
+    model (db.Model): Model of objects that should be loaded.
+    object_ids (iterable): Ids of objects that should be loaded.
+
+  Returns:
+    dict: loaded objects accessible by their ids.
+  """
+  objects = {}
+  for ids in utils.list_chunks(list(set(object_ids))):
+    for obj in model.eager_query().filter(model.id.in_(ids)):
+      objects[obj.id] = obj
+  return objects
+
+
 def get_assignable_data(notif):
   """Return data for assignable object notifications.
 
@@ -256,6 +283,33 @@ def generate_comment_notification(obj, comment, person):
   }
 
 
+def _get_comment_dict(notif, comment, comment_obj):
+  """Get dict data for a comment made on the given object.
+
+  Args:
+    notif (Notification): notification with a Comment object_type.
+    comment (Comment): Comment from the notification.
+    comment_obj (Assessment): Object on which the comment was made.
+
+  Returns:
+    Dict with all data needed for sending comment notifications.
+  """
+  data = {}
+  recipients = set()
+  if not comment_obj:
+    logger.warning('Comment object not found for notification %s', notif.id)
+    return {}
+
+  if comment_obj.recipients:
+    recipients = set(comment_obj.recipients.split(","))
+
+  for person, assignee_type in comment_obj.assignees:
+    if not recipients or recipients.intersection(set(assignee_type)):
+      data[person.email] = generate_comment_notification(
+          comment_obj, comment, person)
+  return data
+
+
 def get_comment_data(notif):
   """Return data for comment notifications.
 
@@ -270,23 +324,84 @@ def get_comment_data(notif):
   Returns:
     Dict with all data needed for sending comment notifications.
   """
-  data = {}
-  recipients = set()
   comment = get_notification_object(notif)
   comment_obj = None
   rel = models.Relationship.find_related(comment, models.Assessment())
 
   if rel:
     comment_obj = rel.Assessment_destination or rel.Assessment_source
-  if not comment_obj:
-    logger.warning('Comment object not found for notification %s', notif.id)
-    return {}
+  return _get_comment_dict(notif, comment, comment_obj)
 
-  if comment_obj.recipients:
-    recipients = set(comment_obj.recipients.split(","))
 
-  for person, assignee_type in comment_obj.assignees:
-    if not recipients or recipients.intersection(set(assignee_type)):
-      data[person.email] = generate_comment_notification(
-          comment_obj, comment, person)
-  return data
+def get_assignable_data_batch(notifications):
+  """Return data for a list of assignable object notifications.
+
+  Args:
+    notifications (list of Notification): notifications with an Assignable
+      object_type.
+
+  Returns:
+    list of dicts with data for each of the given notifications.
+  """
+  load_objects(models.Assessment, [
+      notif.object_id for notif in notifications
+      if notif.object_type == "Assessment"
+  ])
+  return [get_assignable_data(notif) for notif in notifications]
+
+
+def _get_commented_assessment_ids(comment_ids):
+  """Get ids of assessments on which the given comments were made.
+
+  Args:
+    comment_ids (list): Ids of comments.
+
+  Returns:
+    dict: assessment ids accessible by comment ids.
+  """
+  rel = models.Relationship
+  assessment_ids = {}
+  for ids in utils.list_chunks(comment_ids):
+    relationships = models.Relationship.query.filter(or_(
+        and_(rel.source_type == "Comment",
+             rel.source_id.in_(ids),
+             rel.destination_type == "Assessment"),
+        and_(rel.destination_type == "Comment",
+             rel.destination_id.in_(ids),
+             rel.source_type == "Assessment"),
+    ))
+    for relationship in relationships:
+      if relationship.source_type == "Comment":
+        assessment_ids.setdefault(relationship.source_id,
+                                  relationship.destination_id)
+      else:
+        assessment_ids.setdefault(relationship.destination_id,
+                                  relationship.source_id)
+  return assessment_ids
+
+
+def get_comment_data_batch(notifications):
+  """Return data for a list of comment notifications.
+
+  Comments, relationships to their assessments and the assessments with their
+  assignees are loaded with a fixed number of queries for all notifications.
+
+  Args:
+    notifications (list of Notification): notifications with a Comment
+      object_type.
+
+  Returns:
+    list of dicts with data for each of the given notifications.
+  """
+  comments = load_objects(
+      models.Comment, [notif.object_id for notif in notifications])
+  assessment_ids = _get_commented_assessment_ids(comments.keys())
+  assessments = load_objects(models.Assessment, assessment_ids.values())
+  return [
+      _get_comment_dict(
+          notif,
+          comments.get(notif.object_id),
+          assessments.get(assessment_ids.get(notif.object_id)),
+      )
+      for notif in notifications
+  ]
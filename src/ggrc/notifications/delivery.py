@@ -0,0 +1,218 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Delivery ledger of daily digest emails.
+
+Every daily digest sent to a recipient is recorded in the
+``notification_deliveries`` table, with a single row per recipient and day
+holding ids of all notifications delivered to the recipient on that day.
+
+Before a digest is sent, its row is claimed by the sender. Claims of rows that
+are not marked as sent expire after DIGEST_CLAIM_TIMEOUT seconds, so a digest
+interrupted by a crash or a deadline is sent again by the next run, while
+concurrent senders never send the same digest twice. Notifications that were
+already delivered to a recipient are left out of their next digests, so a
+partial run can be resumed without sending duplicates.
+
+Recipients are split into shards by a hash of their email, which allows
+sending the digest of each shard in a separate background task.
+"""
+
+import hashlib
+from datetime import datetime
+from datetime import timedelta
+from logging import getLogger
+
+from sqlalchemy import and_
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models.types import JsonType
+from ggrc.utils import list_chunks
+
+
+# pylint: disable=invalid-name
+logger = getLogger(__name__)
+
+
+class NotificationDelivery(db.Model):
+  """Daily digest delivered to a single recipient on a single day."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "notification_deliveries"
+
+  recipient = db.Column(db.String(250), primary_key=True)
+  day = db.Column(db.Date, primary_key=True)
+  notification_ids = db.Column(JsonType, nullable=False)
+  claimed_at = db.Column(db.DateTime, nullable=False)
+  sent_at = db.Column(db.DateTime, nullable=True)
+
+
+def get_shard(recipient, shards):
+  """Get the shard of a recipient email.
+
+  The shard does not depend on the process, unlike the builtin hash function.
+  """
+  return int(hashlib.md5(recipient.lower().encode("utf-8")).hexdigest(),
+             16) % shards
+
+
+def get_deliveries(recipients, since):
+  """Load ledger rows of recipients.
+
+  Args:
+    recipients (iterable): emails of recipients.
+    since (date): first day for which the rows are loaded.
+
+  Returns:
+    dict: lists of NotificationDelivery rows by recipient email.
+  """
+  deliveries = {}
+  for emails in list_chunks(list(recipients)):
+    rows = NotificationDelivery.query.filter(
+        NotificationDelivery.recipient.in_(emails),
+        NotificationDelivery.day >= since,
+    )
+    for row in rows:
+      deliveries.setdefault(row.recipient, []).append(row)
+  return deliveries
+
+
+def get_delivered(recipients, day, notifications):
+  """Get ids of notifications that were delivered to recipients.
+
+  Repeating notifications count as delivered only if they were delivered on
+  the given day, while the others count as delivered regardless of the day.
+
+  Args:
+    recipients (iterable): emails of recipients.
+    day (date): day of the digest.
+    notifications (list): (id, repeating, send_on) tuples of pending
+      notifications.
+
+  Returns:
+    dict: sets of delivered notification ids by recipient email.
+  """
+  repeating = {id_ for id_, is_repeating, _ in notifications if is_repeating}
+  since = min([send_on.date() for _, is_repeating, send_on in notifications
+               if not is_repeating] + [day])
+  delivered = {}
+  for recipient, rows in get_deliveries(recipients, since).iteritems():
+    ids = delivered.setdefault(recipient, set())
+    for row in rows:
+      # ids are only stored when a digest is sent, so even rows of digests
+      # that are being sent again only hold delivered notifications
+      if row.day == day:
+        ids.update(row.notification_ids)
+      else:
+        ids.update(id_ for id_ in row.notification_ids
+                   if id_ not in repeating)
+  return delivered
+
+
+def claim(recipients, day):
+  """Claim ledger rows of recipients for sending their digests.
+
+  Rows are claimed with conditional statements, so that a row can only be
+  claimed by a single sender, even if the senders run on different instances.
+
+  Args:
+    recipients (iterable): emails of recipients.
+    day (date): day of the digest.
+
+  Returns:
+    (datetime, dict): time of the claim and ids of notifications already
+      delivered on the given day by emails of claimed recipients.
+  """
+  table = NotificationDelivery.__table__
+  # the column has no fractional seconds and the claim time is matched later
+  now = datetime.utcnow().replace(microsecond=0)
+  expired = now - timedelta(seconds=settings.DIGEST_CLAIM_TIMEOUT)
+  existing = {row.recipient: row for rows in get_deliveries(
+      recipients, day).itervalues() for row in rows if row.day == day}
+  claimed = {}
+  for recipient in recipients:
+    row = existing.get(recipient)
+    if row is None:
+      result = db.session.execute(table.insert().prefix_with("IGNORE"), {
+          "recipient": recipient,
+          "day": day,
+          "notification_ids": [],
+          "claimed_at": now,
+      })
+      delivered_ids = []
+    elif row.sent_at is None and row.claimed_at > expired:
+      # the digest is being sent by another sender
+      continue
+    else:
+      result = db.session.execute(table.update().where(and_(
+          table.c.recipient == recipient,
+          table.c.day == day,
+          table.c.claimed_at == row.claimed_at,
+      )).values(claimed_at=now, sent_at=None))
+      delivered_ids = row.notification_ids
+    if result.rowcount == 1:
+      claimed[recipient] = delivered_ids
+  db.session.commit()
+  return now, claimed
+
+
+def mark_sent(day, claimed_at, notification_ids):
+  """Mark claimed ledger rows as sent.
+
+  Rows that were claimed again by another sender after the claim of this
+  sender expired are left untouched, since they hold the notifications
+  delivered by that sender.
+
+  Args:
+    day (date): day of the digest.
+    claimed_at (datetime): time of the claim returned by claim.
+    notification_ids (dict): ids of all notifications delivered on the given
+      day by recipient email.
+
+  Returns:
+    list: emails of recipients whose rows were marked as sent.
+  """
+  table = NotificationDelivery.__table__
+  now = datetime.utcnow()
+  marked = []
+  for recipient, ids in notification_ids.iteritems():
+    result = db.session.execute(table.update().where(and_(
+        table.c.recipient == recipient,
+        table.c.day == day,
+        table.c.claimed_at == claimed_at,
+    )).values(notification_ids=sorted(ids), sent_at=now))
+    if result.rowcount == 1:
+      marked.append(recipient)
+    else:
+      logger.warning("Claim of the daily digest of %s expired before it was "
+                     "marked as sent", recipient)
+  db.session.commit()
+  return marked
+
+
+def release(day, claimed_at, recipients):
+  """Expire claims of digests that could not be sent.
+
+  Notifications delivered to the recipients earlier on the same day stay
+  recorded in their rows. Rows claimed again by another sender are kept.
+  """
+  table = NotificationDelivery.__table__
+  expired = datetime.utcnow() - timedelta(
+      seconds=settings.DIGEST_CLAIM_TIMEOUT + 1)
+  for emails in list_chunks(list(recipients)):
+    db.session.execute(table.update().where(and_(
+        table.c.recipient.in_(emails),
+        table.c.day == day,
+        table.c.claimed_at == claimed_at,
+        table.c.sent_at.is_(None),
+    )).values(claimed_at=expired))
+  db.session.commit()
+
+
+def remove_expired(day):
+  """Remove ledger rows older than DIGEST_LEDGER_RETENTION_DAYS."""
+  NotificationDelivery.query.filter(
+      NotificationDelivery.day <
+      day - timedelta(days=settings.DIGEST_LEDGER_RETENTION_DAYS)
+  ).delete(synchronize_session=False)
+  db.session.commit()
@@ -0,0 +1,63 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Mail transports used for sending notification emails.
+
+The transport is set with the NOTIFICATION_MAIL_TRANSPORT setting. A transport
+is a class with a ``send(sender, recipient, subject, body)`` method. Transports
+can be called from multiple threads at once, so they must not keep per message
+state on the instance.
+"""
+
+from logging import getLogger
+
+from google.appengine.api import mail
+
+from ggrc import extensions
+
+
+# pylint: disable=invalid-name
+logger = getLogger(__name__)
+
+DEFAULT_TRANSPORT = "ggrc.notifications.transports.AppEngineMailTransport"
+
+
+def get_transport_class():
+  """Get mail transport class set in the NOTIFICATION_MAIL_TRANSPORT setting."""
+  transport_name = extensions.get_extension_name(
+      "NOTIFICATION_MAIL_TRANSPORT", DEFAULT_TRANSPORT)
+  module_name, class_name = transport_name.rsplit(".", 1)
+  return getattr(extensions.get_extension_module(module_name), class_name)
+
+
+class AppEngineMailTransport(object):
+  """Send emails with the AppEngine mail API."""
+  # pylint: disable=too-few-public-methods
+
+  @staticmethod
+  def send(sender, recipient, subject, body):
+    """Send a html email.
+
+    Args:
+      sender (string): Email of an authorized sender.
+      recipient (string): Email of the recipient.
+      subject (string): Email subject.
+      body (basestring): Html body of the email.
+    """
+    message = mail.EmailMessage(sender=sender, subject=subject)
+
+    message.to = recipient
+    message.body = "TODO: add email in text mode."
+    message.html = body
+
+    message.send()
+
+
+class LoggingMailTransport(object):
+  """Log emails instead of sending them, e.g. for development instances."""
+  # pylint: disable=too-few-public-methods
+
+  @staticmethod
+  def send(sender, recipient, subject, body):
+    logger.info("Email from %s to %s: %s (%d characters)",
+                sender, recipient, subject, len(body))
@@ -0,0 +1,335 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Dependency tracking for user permissions cached in memcache.
+
+Permissions of every user are cached under the ``permissions:<user_id>`` key.
+Together with the permissions, the inputs they were derived from are recorded
+as dependencies: the person itself, the contexts of their roles and the
+objects whose mappings grant access to other objects. Every dependency is
+stored under its own ``permissions:dependencies:<dependency>`` key holding ids
+of the users whose cached permissions depend on it.
+
+Cached permissions are stored with the generation of their user, kept under
+the ``permissions:generation:<user_id>`` key, and with the clear generation
+of the whole cache. They are only used while both generations are unchanged,
+so a cache hit needs a single memcache call.
+
+After a write only the generations of users whose inputs were modified are
+removed. Changes that can affect permissions of any user, such as edits of
+role definitions, increase the clear generation instead.
+
+Invalidated dependency keys are replaced by markers holding the invalidation
+counter. Permissions are not stored if any of their dependencies was
+invalidated after their computation started or if the generation of their
+user changed in the meantime, so that permissions loaded from data that was
+modified concurrently are never cached.
+"""
+
+import random
+
+from sqlalchemy import inspect
+
+
+CACHE_TIMEOUT = 3600  # 60 minutes
+
+CLEAR_GENERATION_KEY = "permissions:clear_generation"
+INVALIDATION_KEY = "permissions:invalidations"
+USER_KEY_TMPL = "permissions:{}"
+USER_GENERATION_KEY_TMPL = "permissions:generation:{}"
+DEPENDENCY_KEY_TMPL = "permissions:dependencies:{}"
+STATS_KEY_TMPL = "permissions:stats:{}"
+
+STATS = ("hits", "misses", "invalidations")
+
+CAS_RETRIES = 3
+
+# changes of these models can affect permissions of any user
+GLOBAL_MODELS = frozenset(["Role", "AccessControlRole"])
+
+# models that grant permissions to the person in their person_id column
+PERSON_MODELS = frozenset(["UserRole", "ObjectOwner", "AccessControlList"])
+
+
+def get_user_key(user_id):
+  return USER_KEY_TMPL.format(user_id)
+
+
+def get_user_generation_key(user_id):
+  return USER_GENERATION_KEY_TMPL.format(user_id)
+
+
+def person_dependency(person_id):
+  return u"person:{}".format(person_id)
+
+
+def context_dependency(context_id):
+  return u"context:{}".format(context_id)
+
+
+def object_dependency(object_type, object_id):
+  return u"object:{}:{}".format(object_type, object_id)
+
+
+def record(cache, stat, delta=1):
+  """Increase a permission cache counter."""
+  if delta:
+    cache.incr(STATS_KEY_TMPL.format(stat), delta, initial_value=0)
+
+
+def get_stats(cache):
+  """Get hit, miss and invalidation counts of the permission cache."""
+  values = cache.get_multi([STATS_KEY_TMPL.format(stat) for stat in STATS])
+  stats = {stat: int(values.get(STATS_KEY_TMPL.format(stat)) or 0)
+           for stat in STATS}
+  requests = stats["hits"] + stats["misses"]
+  stats["hit_ratio"] = float(stats["hits"]) / requests if requests else 0.0
+  return stats
+
+
+def update_values(cache, keys, update, timeout=CACHE_TIMEOUT):
+  """Update values of memcache keys with compare-and-set.
+
+  Args:
+    cache: memcache client.
+    keys: keys that should be updated.
+    update: function that receives the key and its current value, or None
+        for missing keys, and returns the new value.
+    timeout: expiration time of updated keys.
+  Returns:
+    True if all keys were updated, False otherwise.
+  """
+  pending = list(keys)
+  for _ in range(CAS_RETRIES):
+    if not pending:
+      break
+    current = cache.get_multi(pending, for_cas=True)
+    existing = {key: update(key, current[key])
+                for key in pending if key in current}
+    missing = {key: update(key, None)
+               for key in pending if key not in current}
+    pending = []
+    if existing:
+      pending.extend(cache.cas_multi(existing, timeout))
+    if missing:
+      pending.extend(cache.add_multi(missing, timeout))
+  return not pending
+
+
+def make_dependency(user_ids, invalidated=0):
+  """Get the cached value of a dependency key."""
+  return {"users": user_ids, "invalidated": invalidated}
+
+
+def get_cached_permissions(cache, user_id):
+  """Get cached permissions of a user together with the current generations.
+
+  Missing user generations are initialized with a random value, so that
+  permissions stored before the generation was removed do not match the new
+  one.
+
+  Returns:
+    (dict, tuple): cached permissions or None if they are missing or
+      outdated, and the generations that loaded permissions should be stored
+      with.
+  """
+  user_key = get_user_key(user_id)
+  generation_key = get_user_generation_key(user_id)
+  values = cache.get_multi([user_key, generation_key, CLEAR_GENERATION_KEY,
+                            INVALIDATION_KEY])
+  if generation_key not in values:
+    cache.add_multi({generation_key: random.randint(1, 2 ** 31)})
+    values.update(cache.get_multi([generation_key]))
+  generations = (
+      values.get(generation_key),
+      values.get(CLEAR_GENERATION_KEY) or 0,
+      values.get(INVALIDATION_KEY) or 0,
+  )
+  entry = values.get(user_key)
+  if (entry and generations[0] is not None and
+          entry.get("generations") == list(generations[:2])):
+    return entry["permissions"], generations
+  return None, generations
+
+
+def register(cache, user_id, dependencies, invalidations):
+  """Record inputs that cached permissions of a user were derived from.
+
+  Args:
+    cache: memcache client.
+    user_id: id of the user whose permissions were loaded.
+    dependencies: inputs that the permissions were derived from.
+    invalidations: value of the invalidation counter before the permissions
+        were loaded.
+  Returns:
+    True if all dependencies were recorded and none of them was invalidated
+    while the permissions were loaded.
+  """
+  invalidated = []
+
+  def add_user(_, value):
+    value = value or make_dependency(set())
+    if value["invalidated"] > invalidations:
+      invalidated.append(value)
+    return make_dependency(value["users"] | {user_id}, value["invalidated"])
+
+  registered = update_values(
+      cache,
+      [DEPENDENCY_KEY_TMPL.format(dependency) for dependency in dependencies],
+      add_user,
+  )
+  return registered and not invalidated
+
+
+def store(cache, user_id, permissions, dependencies, generations):
+  """Store loaded permissions of a user if their inputs did not change.
+
+  Args:
+    cache: memcache client.
+    user_id: id of the user whose permissions were loaded.
+    permissions: loaded permissions.
+    dependencies: inputs that the permissions were derived from.
+    generations: generations returned by get_cached_permissions before
+        the permissions were loaded.
+  Returns:
+    True if the permissions were stored.
+  """
+  user_generation, clear_generation, invalidations = generations
+  if user_generation is None:
+    return False
+  if not register(cache, user_id, dependencies, invalidations):
+    return False
+  current = cache.get_multi([get_user_generation_key(user_id),
+                             CLEAR_GENERATION_KEY])
+  if (current.get(get_user_generation_key(user_id)) != user_generation or
+          (current.get(CLEAR_GENERATION_KEY) or 0) != clear_generation):
+    return False
+  cache.set(get_user_key(user_id), {
+      "permissions": permissions,
+      "generations": [user_generation, clear_generation],
+  }, CACHE_TIMEOUT)
+  return True
+
+
+def _get_relationship_dependencies(relationship_ids):
+  """Get dependencies of objects mapped by relationships."""
+  from ggrc import db
+  from ggrc.models.relationship import Relationship
+  relationship_ids = {id_ for id_ in relationship_ids if id_ is not None}
+  if not relationship_ids:
+    return set()
+  query = db.session.query(
+      Relationship.source_type, Relationship.source_id,
+      Relationship.destination_type, Relationship.destination_id,
+  ).filter(Relationship.id.in_(relationship_ids))
+  dependencies = set()
+  for source_type, source_id, destination_type, destination_id in query:
+    dependencies.add(object_dependency(source_type, source_id))
+    dependencies.add(object_dependency(destination_type, destination_id))
+  return dependencies
+
+
+def _get_history_values(obj, attr_names):
+  """Get current and previous values of object attributes."""
+  attrs = inspect(obj).attrs
+  values = []
+  for attr_name in attr_names:
+    history = attrs[attr_name].history
+    values.append([value for value in history.sum() if value is not None] or
+                  [getattr(obj, attr_name)])
+  return values
+
+
+def get_changed_dependencies(objects):
+  """Get dependencies of cached permissions affected by modified objects.
+
+  Args:
+    objects: iterable of created, updated or deleted objects.
+  Returns:
+    set of affected dependencies or None if permissions of all users can be
+    affected.
+  """
+  dependencies = set()
+  relationship_ids = set()
+  for obj in objects:
+    type_ = obj.__class__.__name__
+    if type_ in GLOBAL_MODELS:
+      return None
+    elif type_ == "Workflow":
+      kinds, = _get_history_values(obj, ["kind"])
+      if "Backlog" in kinds:
+        return None
+    elif type_ == "Person":
+      dependencies.add(person_dependency(obj.id))
+    elif type_ in PERSON_MODELS:
+      person_ids, = _get_history_values(obj, ["person_id"])
+      dependencies.update(person_dependency(person_id)
+                          for person_id in person_ids)
+    elif type_ == "ContextImplication":
+      context_ids, = _get_history_values(obj, ["source_context_id"])
+      dependencies.update(context_dependency(context_id)
+                          for context_id in context_ids)
+    elif type_ == "Relationship":
+      for end in ("source", "destination"):
+        types, ids = _get_history_values(obj, [end + "_type", end + "_id"])
+        dependencies.update(object_dependency(object_type, object_id)
+                            for object_type in types for object_id in ids)
+    elif type_ == "RelationshipAttr":
+      # assignee roles of people are stored as attributes of relationships
+      ids, = _get_history_values(obj, ["relationship_id"])
+      relationship_ids.update(ids)
+  dependencies |= _get_relationship_dependencies(relationship_ids)
+  return dependencies
+
+
+def get_modified_dependencies(modified_objects):
+  """Get dependencies affected by objects of a modified objects cache."""
+  if modified_objects is None:
+    return None
+  # objects in the cache have already been flushed, so changes of dirty
+  # objects that could move grants between people or objects are unknown
+  for obj in modified_objects.dirty:
+    if obj.__class__.__name__ in PERSON_MODELS | {"ContextImplication"}:
+      return None
+  return get_changed_dependencies(
+      list(modified_objects.new) +
+      list(modified_objects.dirty) +
+      list(modified_objects.deleted)
+  )
+
+
+def clear_all(cache):
+  """Make cached permissions of all users outdated."""
+  cache.incr(CLEAR_GENERATION_KEY, initial_value=0)
+  record(cache, "invalidations")
+
+
+def invalidate(cache, dependencies):
+  """Make cached permissions of users that depend on modified inputs outdated.
+
+  Args:
+    cache: memcache client.
+    dependencies: set of modified dependencies or None to invalidate cached
+        permissions of all users.
+  """
+  if dependencies is None:
+    clear_all(cache)
+    return
+  if not dependencies:
+    return
+  invalidations = cache.incr(INVALIDATION_KEY, initial_value=0)
+  user_ids = {}
+
+  def mark_invalidated(key, value):
+    # users read by the last successful compare-and-set are invalidated
+    user_ids[key] = value["users"] if value else set()
+    return make_dependency(set(), invalidations)
+
+  if not update_values(cache, [DEPENDENCY_KEY_TMPL.format(dependency)
+                               for dependency in dependencies],
+                       mark_invalidated):
+    clear_all(cache)
+    return
+  users = set().union(*user_ids.values())
+  cache.delete_multi([get_user_generation_key(user_id) for user_id in users])
+  record(cache, "invalidations", len(users))
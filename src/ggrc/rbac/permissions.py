@@ -125,7 +125,4 @@ def has_conditions(action, resource):
   Checks if the resource has a condition that needs to be checked with
   is_allowed_for
   """
-  _permissions = permissions_for()._permissions()
-  return bool(_permissions.get(action, {})
-              .get(resource, {})
-              .get('conditions', {}))
+  return permissions_for().has_conditions(action, resource)
@@ -142,6 +142,56 @@ _CONDITIONS_MAP = {
 }
 
 
+PermissionEntry = namedtuple(
+    'PermissionEntry',
+    'contexts resources conditions'
+)
+
+_EMPTY_ENTRY = PermissionEntry(frozenset(), frozenset(), {})
+
+
+class CompiledPermissions(object):
+  """Immutable lookup structure for a permissions dict.
+
+  Contexts and resources of every action and resource type are stored in
+  frozensets and conditions are grouped by context, so that permission checks
+  do not scan lists. The source dict is kept unchanged for serialization.
+  """
+
+  def __init__(self, permissions, admin_permission):
+    self.source = permissions
+    self._entries = {}
+    for action, resource_types in (permissions or {}).iteritems():
+      if not isinstance(resource_types, dict):
+        continue
+      for resource_type, entry in resource_types.iteritems():
+        if not entry:
+          continue
+        self._entries[(action, resource_type)] = PermissionEntry(
+            frozenset(entry.get('contexts', ())),
+            frozenset(entry.get('resources', ())),
+            {context_id: tuple(
+                (str(condition['condition']), condition.get('terms', {}))
+                for condition in conditions
+            ) for context_id, conditions in
+                entry.get('conditions', {}).iteritems()},
+        )
+    admin_entry = self.get(admin_permission.action,
+                           admin_permission.resource_type)
+    self.is_admin = (None in admin_entry.contexts or
+                     None in admin_entry.resources or
+                     admin_permission.context_id in admin_entry.contexts)
+    self.admin_conditions = admin_entry.conditions.get(None, ())
+
+  def has(self, action, resource_type):
+    """Check if there are any permissions for the action and type."""
+    return (action, resource_type) in self._entries
+
+  def get(self, action, resource_type):
+    """Get permission entry for the action and type."""
+    return self._entries.get((action, resource_type), _EMPTY_ENTRY)
+
+
 class DefaultUserPermissions(UserPermissions):
   # super user, context_id 0 indicates all contexts
   ADMIN_PERMISSION = Permission(
@@ -161,43 +211,41 @@ class DefaultUserPermissions(UserPermissions):
 
   def _permission_match(self, permission, permissions):
     """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
+    entry = permissions.get(permission.action, permission.resource_type)
+    if None in entry.contexts:
       return True
-    return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
+    return (
+        permission.resource_id in entry.resources or
+        permission.context_id in entry.contexts or
+        permission.context_id in permissions.get(
+            permission.action,
+            self.ADMIN_PERMISSION.resource_type,
+        ).contexts
+    )
 
   @staticmethod
   def _permissions():
     """Returns request permission from the global scope"""
     return getattr(g, '_request_permissions', {})
 
-  def _is_allowed(self, permission):
+  def _compiled_permissions(self):
+    """Get compiled permissions, compiling them once per permissions dict"""
     permissions = self._permissions()
+    compiled = getattr(g, '_compiled_permissions', None)
+    if compiled is None or compiled.source is not permissions:
+      compiled = CompiledPermissions(permissions, self.ADMIN_PERMISSION)
+      setattr(g, '_compiled_permissions', compiled)
+    return compiled
+
+  def _is_allowed(self, permission):
+    permissions = self._compiled_permissions()
     if permission.resource_type != '/admin' \
        and permission.context_id \
        and self._is_allowed(permission._replace(context_id=None)):
       return True
     if self._permission_match(permission, permissions):
       return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if permissions.is_admin:
       return True
     return self._permission_match(
         self._admin_permission_for_context(permission.context_id),
@@ -206,57 +254,37 @@ class DefaultUserPermissions(UserPermissions):
   @staticmethod
   def _check_conditions(instance, action, conditions):
     """Check if any condition is valid for the instance."""
-    for condition in conditions:
-      func = _CONDITIONS_MAP[str(condition['condition'])]
-      terms = condition.setdefault('terms', {})
+    for condition, terms in conditions:
+      func = _CONDITIONS_MAP[condition]
       if func(instance, _current_action=action, **terms):
         return True
     return False
 
   def _is_allowed_for(self, instance, action):
-    permissions = self._permissions()
+    permissions = self._compiled_permissions()
     # Check for admin permission
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      conditions = permissions[self.ADMIN_PERMISSION.action]\
-          .get(self.ADMIN_PERMISSION.resource_type)\
-          .get("conditions", {})\
-          .get(None, [])
-      if not conditions:
+    if permissions.is_admin:
+      if not permissions.admin_conditions:
         return True
-      return self._check_conditions(instance, action, conditions)
-    if (not permissions.get(action) or
-       not permissions[action].get(instance._inflector.model_singular)):
+      return self._check_conditions(instance, action,
+                                    permissions.admin_conditions)
+    resource_type = instance._inflector.model_singular
+    if not permissions.has(action, resource_type):
       return False
-    resources = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('resources', [])
-    contexts = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('contexts', [])
+    entry = permissions.get(action, resource_type)
     # We can't use instance.context_id, because it requires the
     # object <-> context mapping to be created,
     # which isn't the case when creating objects
     context_id = None
     if hasattr(instance, 'context') and hasattr(instance.context, 'id'):
       context_id = instance.context.id
-    if instance.id in resources:
+    if instance.id in entry.resources:
       return True
-    no_context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(None, [])
-
-    context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(context_id, [])
-    conditions = no_context_conditions + context_conditions
+    conditions = (entry.conditions.get(None, ()) +
+                  entry.conditions.get(context_id, ()))
     # Check any conditions applied per resource
-    if (None in contexts or context_id in contexts) and not conditions:
+    if (None in entry.contexts or context_id in entry.contexts) and \
+       not conditions:
       return True
     return self._check_conditions(instance, action, conditions)
 
@@ -303,9 +331,9 @@ class DefaultUserPermissions(UserPermissions):
   def _get_resources_for(self, action, resource_type):
     """Get resources resources (object ids) for a given action and
     resource_type"""
-    permissions = self._permissions()
+    permissions = self._compiled_permissions()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if permissions.is_admin:
       return None
 
     # Get the list of resources for a given resource type and any
@@ -314,19 +342,15 @@ class DefaultUserPermissions(UserPermissions):
 
     ret = []
     for resource_type in resource_types:
-      ret.extend(
-          permissions
-          .get(action, {})
-          .get(resource_type, {})
-          .get('resources', []))
+      ret.extend(permissions.get(action, resource_type).resources)
     return ret
 
   def _get_contexts_for(self, action, resource_type):
     # FIXME: (Security) When applicable, we should explicitly assert that no
     #   permissions are expected (e.g. that every user has ADMIN_PERMISSION).
-    permissions = self._permissions()
+    permissions = self._compiled_permissions()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if permissions.is_admin:
       return None
 
     # Get the list of contexts for a given resource type and any
@@ -335,16 +359,13 @@ class DefaultUserPermissions(UserPermissions):
 
     ret = []
     for resource_type in resource_types:
-      ret.extend(permissions.get(action, {})
-                            .get(resource_type, {})
-                            .get('contexts', []))
+      ret.extend(permissions.get(action, resource_type).contexts)
 
     # Extend with the list of all contexts for which the user is an ADMIN
-    admin_list = list(
-        permissions.get(self.ADMIN_PERMISSION.action, {})
-        .get(self.ADMIN_PERMISSION.resource_type, {})
-        .get('contexts', ()))
-    ret.extend(admin_list)
+    ret.extend(permissions.get(
+        self.ADMIN_PERMISSION.action,
+        self.ADMIN_PERMISSION.resource_type,
+    ).contexts)
     if None in ret:
       return None
     return ret
@@ -388,3 +409,8 @@ class DefaultUserPermissions(UserPermissions):
   def is_admin(self):
     """Whether the user has ADMIN permissions."""
     return self._is_allowed(self.ADMIN_PERMISSION)
+
+  def has_conditions(self, action, resource_type):
+    """Whether permissions for the resource type have any conditions."""
+    return bool(self._compiled_permissions().get(
+        action, resource_type).conditions)
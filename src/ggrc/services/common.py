@@ -29,14 +29,16 @@ from werkzeug.exceptions import BadRequest, Forbidden
 import ggrc.builder.json
 import ggrc.models
 from ggrc import db, utils
-from ggrc.utils import as_json, benchmark
+from ggrc.utils import as_json, benchmark, list_chunks
 from ggrc.fulltext import get_indexer
 from ggrc.login import get_current_user_id, get_current_user
 from ggrc.models.cache import Cache
 from ggrc.models.event import Event
 from ggrc.models.revision import Revision
+from ggrc.models.revision import update_latest_revisions
 from ggrc.models.exceptions import ValidationError, translate_message
 from ggrc.rbac import permissions, context_query_filter
+from ggrc.rbac import permission_cache
 from ggrc.services.attribute_query import AttributeQueryBuilder
 from ggrc.services import signals
 from ggrc.models.background_task import BackgroundTask, create_task
@@ -62,6 +64,11 @@ def _get_cache_manager():
   return cache_manager
 
 
+def _get_local_cache():
+  from ggrc.cache import get_local_cache
+  return get_local_cache()
+
+
 def get_cache_key(obj, type=None, id=None):
   """Returns a string identifier for the specified object or stub.
 
@@ -188,6 +195,8 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     return
 
   context.cache_manager = _get_cache_manager()
+  context.permission_dependencies = (
+      permission_cache.get_modified_dependencies(modified_objects))
 
   if modified_objects is not None:
     if len(modified_objects.new) > 0:
@@ -199,6 +208,8 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     if len(modified_objects.deleted) > 0:
       memcache_mark_for_deletion(context, modified_objects.deleted.items())
 
+  _get_local_cache().remove_multi(context.cache_manager.marked_for_delete)
+
   status_entries = {}
   for key in context.cache_manager.marked_for_delete:
     build_cache_status(status_entries, 'DeleteOp:' + key,
@@ -249,6 +260,10 @@ def update_memcache_after_commit(context):
     #            currently we log errors
     if delete_result is not True:
       logger.error("CACHE: Failed to remove collection from cache")
+    # entries could have been read into the local cache again before commit,
+    # local caches of other instances discard them by their generation
+    _get_local_cache().invalidate(cache_manager.cache_object.memcache_client,
+                                  cache_manager.marked_for_delete)
 
   status_entries = []
   for key in cache_manager.marked_for_delete:
@@ -260,7 +275,7 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  clear_permission_cache(getattr(context, "permission_dependencies", None))
   cache_manager.clear_cache()
 
 
@@ -317,27 +332,30 @@ def update_index(session, cache):
     return
   indexer = get_indexer()
   reindex_snapshots_list = []
+  records = []
   for obj in itertools.chain(cache.new, cache.dirty):
     if obj.type == "Snapshot":
       reindex_snapshots_list.append(obj.id)
     elif not isinstance(obj, Indexed):
-      indexer.update_record(indexer.fts_record_for(obj), commit=False)
-  for obj in cache.deleted:
-    indexer.delete_record(obj.id, obj.__class__.__name__, commit=False)
+      records.append(indexer.fts_record_for(obj))
+  deleted_pairs = [(obj.__class__.__name__, obj.id) for obj in cache.deleted]
+  indexer.bulk_update_records(records, deleted_pairs, commit=False)
   session.commit()
   if reindex_snapshots_list:
-    for snapshot_id in reindex_snapshots_list:
-      indexer.delete_record(snapshot_id, "Snapshot", commit=False)
+    indexer.delete_records_by_pairs(
+        [("Snapshot", snapshot_id) for snapshot_id in reindex_snapshots_list],
+        commit=False,
+    )
     reindex_snapshots(reindex_snapshots_list)
 
 
 def _revision_generator(user_id, action, objects):
   for obj in objects:
-    yield Revision(obj, user_id, action, obj.log_json())
+    yield Revision.get_row(obj, user_id, action, obj.log_json())
 
 
 def _get_log_revisions(current_user_id, obj=None, force_obj=False):
-  """Generate and return revisions for all cached objects."""
+  """Generate and return revision rows for all cached objects."""
   revisions = []
   cache = get_cache()
   if not cache:
@@ -367,8 +385,8 @@ def _get_log_revisions(current_user_id, obj=None, force_obj=False):
     # been changed, then this object will not be added into
     # ``cache.dirty set``. So that its revision will not be created.
     # The ``force_obj`` flag solves the issue, but in a bit dirty way.
-    revision = Revision(obj, current_user_id, 'modified', obj.log_json())
-    revisions.append(revision)
+    revisions.append(Revision.get_row(obj, current_user_id, 'modified',
+                                      obj.log_json()))
   revisions.extend(_revision_generator(
       current_user_id, "deleted", cache.deleted
   ))
@@ -379,6 +397,9 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
               force_obj=False):
   """Logs an event on object `obj`.
 
+  Revisions of all modified objects are inserted with a single statement
+  once the event has been flushed.
+
   Args:
     session: Current SQLAlchemy session (db.session)
     obj: object on which some operation took place
@@ -411,20 +432,47 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
         resource_id=resource_id,
         resource_type=resource_type,
         context_id=context_id)
-    event.revisions = revisions
     session.add(event)
+    session.flush()
+    for revision in revisions:
+      revision["event_id"] = event.id
+    with benchmark("Insert revisions"):
+      session.execute(Revision.__table__.insert(), revisions)
+      update_latest_revisions(event.id, session)
   return event
 
 
-def clear_permission_cache():
+def clear_permission_cache(dependencies=None):
+  """Remove cached permissions that depend on the modified inputs.
+
+  Args:
+    dependencies: set of permission cache dependencies affected by a write,
+        or None to remove cached permissions of all users.
+  """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
     return
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  cached_keys_set.add('permissions:list')
-  # We delete all the cached user permissions as well as
-  # the permissions:list value itself
-  cache.delete_multi(cached_keys_set)
+  permission_cache.invalidate(cache, dependencies)
+
+
+def clear_object_cache(objs):
+  """Remove cached collection entries of objects updated outside the session.
+
+  Objects written with core statements are not seen by the cache manager, so
+  their memcache entries and entries in local caches of all instances are
+  removed after the write is committed.
+
+  Args:
+    objs: list of updated objects.
+  """
+  if getattr(settings, 'MEMCACHE_MECHANISM', False) is False:
+    return
+  cache_manager = _get_cache_manager()
+  keys = [get_cache_key(obj) for obj in objs]
+  if cache_manager.bulk_delete(keys, 0) is not True:
+    logger.error("CACHE: Failed to remove collection from cache")
+  _get_local_cache().invalidate(cache_manager.cache_object.memcache_client,
+                                keys)
 
 
 class ModelView(View):
@@ -1088,13 +1136,14 @@ class Resource(ModelView):
             collection, self.collection_last_modified(), cache_op=cache_op)
 
   def get_resources_from_cache(self, matches):
-    """Get resources from cache for specified matches"""
+    """Get resources from local cache and memcache for specified matches"""
     resources = {}
     # Disable caching for background tasks
     # Setting background task status circumvents our memcache
     # invalidation logic so we have to disabling memcache.
     if self.model.__name__ == 'BackgroundTask':
       return resources
+    local_cache = _get_local_cache()
     # Skip right to memcache
     memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_matches = {}
@@ -1103,17 +1152,27 @@ class Resource(ModelView):
       key = get_cache_key(None, id=match[0], type=match[1])
       key_matches[key] = match
       keys.append(key)
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      result = memcache_client.get_multi(slice_keys)
-      for key in result:
-        if 'selfLink' in result[key]:
-          resources[key_matches[key]] = result[key]
+    # generations are read before any values, so that values loaded from
+    # memcache or the database are not stored with a newer generation
+    generations = local_cache.get_generations(memcache_client, keys)
+    self.request.local_cache_generations = generations
+    result = local_cache.get_multi(keys, generations)
+    missing_keys = [key for key in keys if key not in result]
+    for slice_keys in list_chunks(missing_keys, settings.MEMCACHE_BATCH_SIZE):
+      memcache_result = memcache_client.get_multi(slice_keys)
+      local_cache.add_multi({key: value
+                             for key, value in memcache_result.iteritems()
+                             if 'selfLink' in value}, generations=generations)
+      result.update(memcache_result)
+    for key in result:
+      if 'selfLink' in result[key]:
+        resources[key_matches[key]] = result[key]
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
+    local_cache = _get_local_cache()
+    generations = getattr(self.request, "local_cache_generations", None)
     # Skip right to memcache
     memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_objs = {}
@@ -1125,17 +1184,17 @@ class Resource(ModelView):
       keys.append(key)
       key_objs[key] = obj
       key_blockers[key] = delete_op_key
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
+    for slice_keys in list_chunks(keys, settings.MEMCACHE_BATCH_SIZE):
       blocker_keys = [key_blockers[slice_key] for slice_key in slice_keys]
       result = memcache_client.get_multi(blocker_keys)
       # Reduce `slice_keys` to only unblocked keys
       slice_keys = [
           slice_key for slice_key in slice_keys
           if key_blockers[slice_key] not in result]
-      memcache_client.add_multi(
-          {key: key_objs[key] for key in slice_keys})
+      unblocked = {key: key_objs[key] for key in slice_keys}
+      memcache_client.add_multi(unblocked)
+      if generations is not None:
+        local_cache.add_multi(unblocked, generations=generations)
 
   def json_create(self, obj, src):
     ggrc.builder.json.create(obj, src)
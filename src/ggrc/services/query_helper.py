@@ -3,10 +3,17 @@
 
 """This module contains special query helper class for query API."""
 
+import sqlalchemy as sa
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.orm.properties import ColumnProperty
+from sqlalchemy.orm.properties import RelationshipProperty
+
+from ggrc import db
 from ggrc.builder import json
 from ggrc.converters.query_helper import QueryHelper
 from ggrc.models import inflector
 from ggrc.utils import benchmark
+from ggrc.utils import url_for
 
 
 # pylint: disable=too-few-public-methods
@@ -49,7 +56,17 @@ class QueryAPIQueryHelper(QueryHelper):
         raise NotImplementedError("Only 'values', 'ids' and 'count' queries "
                                   "are supported now")
       model = inflector.get_model(object_query["object_name"])
-      if query_type == "values":
+      projection = None
+      if query_type == "values" and object_query.get("fields"):
+        projection = self._get_projection(model, object_query["fields"])
+      if projection is not None:
+        with benchmark("Get result set: get_results > _get_values"):
+          values, last_modified = self._get_values(object_query, model,
+                                                   projection)
+        object_query["count"] = len(values)
+        object_query["last_modified"] = last_modified
+        object_query["values"] = values
+      elif query_type == "values":
         with benchmark("Get result set: get_results > _get_objects"):
           objects = self._get_objects(object_query)
         object_query["count"] = len(objects)
@@ -70,6 +87,123 @@ class QueryAPIQueryHelper(QueryHelper):
           object_query["ids"] = ids
     return self.query
 
+  @staticmethod
+  def _get_projection(model, fields):
+    """Get SQL columns from which the requested fields can be published.
+
+    Fields that are plain columns are read directly, the "type" field is a
+    constant and many-to-one relationships are published as stubs from the
+    id and context_id of the related row. Fields that are not published by
+    the model are None, like in the builder output.
+
+    Returns:
+      list of (field, columns, render, join) tuples, where render makes the
+      field value from the values of columns and join is an outer join needed
+      for the columns or None. None is returned if any field needs the full
+      builder.
+    """
+    mapper = sa.inspect(model)
+    if len(list(mapper.self_and_descendants)) > 1:
+      # subclasses can publish different attributes
+      return None
+    builder = json.get_json_builder(model)
+    published = {getattr(attr, "attr_name", attr)
+                 for attr in builder._publish_attrs}
+    custom_publish = getattr(model, "_custom_publish", {})
+    projection = []
+    for field in fields:
+      class_attr = getattr(model, field, None)
+      if field not in published:
+        if field in ("selfLink", "viewLink"):
+          return None
+        projection.append((field, [], lambda: None, None))
+      elif field in custom_publish or field in builder._include_links:
+        return None
+      elif field == "type":
+        projection.append((field, [], lambda: model.__name__, None))
+      elif not isinstance(class_attr, InstrumentedAttribute):
+        return None
+      elif isinstance(class_attr.property, ColumnProperty):
+        projection.append((field, [class_attr], lambda value: value, None))
+      elif isinstance(class_attr.property, RelationshipProperty):
+        stub = QueryAPIQueryHelper._get_stub_projection(class_attr.property)
+        if stub is None:
+          return None
+        projection.append((field,) + stub)
+      else:
+        return None
+    return projection
+
+  @staticmethod
+  def _get_stub_projection(prop):
+    """Get columns publishing a related object as a stub.
+
+    Only many-to-one relationships on a foreign key to the id of a related
+    model without subclasses are supported, stubs are rendered like in
+    publish_representation.
+
+    Returns:
+      (columns, render, join) or None if the relationship is not supported.
+    """
+    target = prop.mapper
+    if (prop.uselist or len(prop.local_remote_pairs) != 1 or
+            len(list(target.self_and_descendants)) > 1 or
+            "context_id" not in target.c):
+      return None
+    local, remote = prop.local_remote_pairs[0]
+    if remote is not target.c.id:
+      return None
+    target_type = target.class_.__name__
+    alias = sa.orm.aliased(target.class_)
+
+    def render(id_, context_id):
+      if id_ is None:
+        return None
+      return {
+          "type": target_type,
+          "id": id_,
+          "context_id": context_id,
+          "href": url_for(target_type, id=id_),
+      }
+    return [alias.id, alias.context_id], render, (alias, alias.id == local)
+
+  def _get_values(self, object_query, model, projection):
+    """Get JSON values of fields from result rows without loading objects.
+
+    Returns:
+      (values, last_modified) - values in the order of filtered ids and the
+      time of last update of the objects.
+    """
+    with benchmark("Get ids: _get_values -> _get_ids"):
+      ids = self._get_ids(object_query)
+    if not ids:
+      return [], None
+
+    columns = [model.id]
+    if hasattr(model, "updated_at"):
+      columns.append(model.updated_at)
+    query = db.session.query(*columns)
+    for _, field_columns, _, join in projection:
+      if join is not None:
+        query = query.outerjoin(*join)
+      query = query.add_columns(*field_columns)
+    with benchmark("Get rows by ids: _get_values -> rows"):
+      rows = {row[0]: row for row in query.filter(model.id.in_(ids))}
+
+    values = []
+    for id_ in ids:
+      row = rows[id_]
+      value = {}
+      index = len(columns)
+      for field, field_columns, render, _ in projection:
+        value[field] = render(*row[index:index + len(field_columns)])
+        index += len(field_columns)
+      values.append(value)
+    last_modified = None
+    if len(columns) > 1:
+      last_modified = max(row[1] for row in rows.itervalues())
+    return values, last_modified
+
   @staticmethod
   def _transform_to_json(objects, fields=None):
     """Make a JSON representation of objects from the list."""
@@ -4,10 +4,11 @@
 APP_ENGINE = True
 ENABLE_JASMINE = False
 LOGIN_MANAGER = 'ggrc.login.appengine'
-FULLTEXT_INDEXER = 'ggrc.fulltext.mysql.MysqlIndexer'
 # Cannot access filesystem on AppEngine or when using SDK
 AUTOBUILD_ASSETS = False
 SQLALCHEMY_RECORD_QUERIES = False
 MEMCACHE_MECHANISM = True
 CALENDAR_MECHANISM = False
 BACKGROUND_COLLECTION_POST_SLEEP = 2.5  # seconds
+# Multiprocessing is not available on App Engine
+FULLTEXT_REINDEX_WORKERS = 1
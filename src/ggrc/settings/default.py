@@ -17,6 +17,12 @@ AUTOBUILD_ASSETS = False
 ENABLE_JASMINE = False
 DEBUG_ASSETS = False
 FULLTEXT_INDEXER = None
+# Search mode of the default full text indexer: "like" scans the full text
+# table with LIKE, "fulltext" uses the MySQL FULLTEXT index in boolean mode.
+# The "fulltext" mode needs the ft_fulltext_record_properties_content index
+# created by migration 2d8b7c6e1f35. The index is kept up to date in both
+# modes, so index writes pay for its maintenance even in the "like" mode.
+FULLTEXT_SEARCH_MODE = os.environ.get("GGRC_FULLTEXT_SEARCH_MODE", "like")
 USER_PERMISSIONS_PROVIDER = None
 EXTENSIONS = []
 exports = []
@@ -70,9 +76,70 @@ SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
 
+# Memcache client class, a stand-in such as
+# "ggrc.cache.memcache.LocalMemcacheClient" can be used outside AppEngine
+MEMCACHE_CLIENT = os.environ.get("GGRC_MEMCACHE_CLIENT",
+                                 "google.appengine.api.memcache.Client")
+
+# Number of keys read or written with a single memcache call
+MEMCACHE_BATCH_SIZE = int(os.environ.get("GGRC_MEMCACHE_BATCH_SIZE", "250"))
+
+# Bounds of the per process cache in front of memcache for collection GETs.
+# Entries invalidated by other instances are discarded by the generation of
+# their resource type kept in memcache.
+LOCAL_CACHE_MAX_ENTRIES = int(
+    os.environ.get("GGRC_LOCAL_CACHE_MAX_ENTRIES", "20000"))
+LOCAL_CACHE_MAX_BYTES = int(
+    os.environ.get("GGRC_LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LOCAL_CACHE_TTL = int(os.environ.get("GGRC_LOCAL_CACHE_TTL", "30"))
+
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
 
+# Mail transport class used for notification emails, e.g.
+# "ggrc.notifications.transports.LoggingMailTransport" only logs the emails
+NOTIFICATION_MAIL_TRANSPORT = os.environ.get(
+    "GGRC_NOTIFICATION_MAIL_TRANSPORT",
+    "ggrc.notifications.transports.AppEngineMailTransport")
+
+# Number of threads rendering and sending daily digests and the number of
+# digest emails that can be sent at once
+DIGEST_WORKERS = int(os.environ.get("GGRC_DIGEST_WORKERS", "8"))
+DIGEST_MAX_CONCURRENT_SENDS = int(
+    os.environ.get("GGRC_DIGEST_MAX_CONCURRENT_SENDS", "4"))
+
+# Number of daily digest shards sent by separate background tasks, number of
+# digests recorded in the delivery ledger at once, seconds after which an
+# unfinished digest can be sent again and days for which the ledger is kept
+DIGEST_SHARDS = int(os.environ.get("GGRC_DIGEST_SHARDS", "1"))
+DIGEST_BATCH_SIZE = int(os.environ.get("GGRC_DIGEST_BATCH_SIZE", "100"))
+DIGEST_CLAIM_TIMEOUT = int(os.environ.get("GGRC_DIGEST_CLAIM_TIMEOUT", "900"))
+DIGEST_LEDGER_RETENTION_DAYS = int(
+    os.environ.get("GGRC_DIGEST_LEDGER_RETENTION_DAYS", "30"))
+
+# Create snapshots of audits in a background task instead of in the request,
+# in batches of SNAPSHOT_BATCH_SIZE pairs, retrying a failed batch at most
+# SNAPSHOT_BATCH_RETRIES times
+SNAPSHOT_BACKGROUND = bool(os.environ.get("GGRC_SNAPSHOT_BACKGROUND"))
+SNAPSHOT_BATCH_SIZE = int(os.environ.get("GGRC_SNAPSHOT_BATCH_SIZE", "500"))
+SNAPSHOT_BATCH_RETRIES = int(
+    os.environ.get("GGRC_SNAPSHOT_BATCH_RETRIES", "2"))
+
+# Update audit snapshots only for objects mapped or changed since the last
+# snapshot update of the audit, instead of comparing the whole program scope.
+# The last update is marked with the newest revision id at its start, but a
+# concurrent transaction can commit a revision with a lower id afterwards, so
+# changes are looked up SNAPSHOT_SYNC_REVISION_MARGIN revisions before that
+# mark. Changes committed even later than that are only picked up by a full
+# comparison, which is made when the last one is older than
+# SNAPSHOT_FULL_SYNC_INTERVAL seconds.
+SNAPSHOT_INCREMENTAL_UPSERT = bool(
+    os.environ.get("GGRC_SNAPSHOT_INCREMENTAL_UPSERT"))
+SNAPSHOT_SYNC_REVISION_MARGIN = int(
+    os.environ.get("GGRC_SNAPSHOT_SYNC_REVISION_MARGIN", "1000"))
+SNAPSHOT_FULL_SYNC_INTERVAL = int(
+    os.environ.get("GGRC_SNAPSHOT_FULL_SYNC_INTERVAL", "86400"))
+
 CALENDAR_MECHANISM = False
 
 MAX_INSTANCES = os.environ.get('MAX_INSTANCES', '3')
@@ -119,6 +186,23 @@ LOGGING_LOGGERS = {
 
 DEBUG_BENCHMARK = os.environ.get("GGRC_BENCHMARK")
 
+# Full text reindex
+# Number of worker processes used for the full reindex, 1 means that all
+# partitions are indexed sequentially in the current process.
+FULLTEXT_REINDEX_WORKERS = int(
+    os.environ.get("GGRC_FULLTEXT_REINDEX_WORKERS", "1"))
+# Number of object ids covered by a single reindex partition.
+FULLTEXT_REINDEX_PARTITION_SIZE = int(
+    os.environ.get("GGRC_FULLTEXT_REINDEX_PARTITION_SIZE", "50000"))
+
+# Number of snapshots whose full text records are built and written at once.
+SNAPSHOT_INDEX_BATCH_SIZE = int(
+    os.environ.get("GGRC_SNAPSHOT_INDEX_BATCH_SIZE", "500"))
+
+# Csv files with blocks longer than this number of rows are imported in
+# windows of this size to keep memory usage flat, 0 disables chunked imports.
+IMPORT_CHUNK_SIZE = int(os.environ.get("GGRC_IMPORT_CHUNK_SIZE", "1000"))
+
 # GGRCQ integration
 GGRC_Q_INTEGRATION_URL = os.environ.get('GGRC_Q_INTEGRATION_URL', '')
 
@@ -14,3 +14,5 @@ FULLTEXT_INDEXER = 'ggrc.fulltext.mysql.MysqlIndexer'
 LOGIN_MANAGER = 'ggrc.login.noop'
 # SQLALCHEMY_ECHO = True
 MEMCACHE_MECHANISM = False
+# send digests in order, so that tests can check the last sent email
+DIGEST_WORKERS = 1
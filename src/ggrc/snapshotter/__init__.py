@@ -8,15 +8,29 @@ snapshot object represent a join between parent object (Audit),
 child object (e.g. Control, Regulation, ...) and a particular revision.
 """
 
+import sys
+from datetime import datetime
+from datetime import timedelta
 from logging import getLogger
 
+from flask import url_for
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import text
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql.expression import tuple_
 from sqlalchemy.sql.expression import bindparam
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.login import get_current_user_id
+from ggrc.models.background_task import create_task
+from ggrc.models.revision import update_latest_revisions
+from ggrc.models.snapshot import SnapshotScopeSync
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 
 from ggrc.snapshotter.datastructures import Attr
 from ggrc.snapshotter.datastructures import Pair
@@ -46,7 +60,10 @@ class SnapshotGenerator(object):
     self.children = set()
     self.snapshots = dict()
     self.context_cache = dict()
+    self.incremental_parents = set()
     self.dry_run = dry_run
+    # write through db.session without intermediate commits
+    self.atomic = False
 
   def add_parent(self, obj):
     """Add parent object and automatically scan neighborhood for snapshottable
@@ -72,6 +89,121 @@ class SnapshotGenerator(object):
     self.children = children
     self.context_cache[parent] = parent_object.context_id
 
+  def add_parent_changes(self, obj, since, revisions=None):
+    """Add parent object with children whose snapshots may have changed.
+
+    Only objects that were mapped to the parent's first degree objects or
+    got new revisions after the given revision are added, together with the
+    children that have specified revisions. Snapshots of all other children
+    were brought up to date by the sync that recorded the given revision.
+
+    Args:
+      obj: parent object.
+      since: id of the newest revision considered by the last scope sync.
+      revisions: A dict of pairs and revision ids to which snapshots should
+        be created or updated.
+    """
+    with benchmark("Snapshot.add_parent_changes"):
+      key = Stub.from_object(obj)
+      if key in self.parents:
+        return self.parents
+      related_objects = self._get_related_objects(obj)
+      children = self._fetch_new_neighbors(obj, related_objects, since)
+      children |= self._fetch_changed_children(key, since)
+      children |= {child for parent, child in revisions or {}
+                   if parent == key}
+      self.parents.add(key)
+      self.incremental_parents.add(key)
+      self.context_cache[key] = obj.context_id
+      self.children = self.children | children
+      self.snapshots[key] = children
+      return self.parents
+
+  def _fetch_new_neighbors(self, parent_object, objects, since):
+    """Get objects mapped to any of the given objects after a revision."""
+    with benchmark("Snapshot._fetch_new_neighbors"):
+      if not objects:
+        return set()
+      snd_types = self.rules.rules[parent_object.type]["snd"]
+      revision = models.Revision
+      created = db.session.query(
+          revision.source_type,
+          revision.source_id,
+          revision.destination_type,
+          revision.destination_id,
+      ).filter(
+          revision.resource_type == "Relationship",
+          revision.action == "created",
+          revision.id > since,
+          or_(
+              and_(
+                  tuple_(revision.source_type,
+                         revision.source_id).in_(objects),
+                  revision.destination_type.in_(snd_types),
+              ),
+              and_(
+                  tuple_(revision.destination_type,
+                         revision.destination_id).in_(objects),
+                  revision.source_type.in_(snd_types),
+              ),
+          ),
+      )
+      candidates = set()
+      for stype, sid, dtype, did in created:
+        source = Stub(stype, sid)
+        destination = Stub(dtype, did)
+        if source in objects:
+          candidates.add((source, destination))
+        else:
+          candidates.add((destination, source))
+      if not candidates:
+        return set()
+
+      # relationships created after the sync could have been removed since
+      rel = models.Relationship
+      existing = db.session.query(
+          rel.source_type,
+          rel.source_id,
+          rel.destination_type,
+          rel.destination_id,
+      ).filter(or_(
+          tuple_(rel.source_type, rel.source_id,
+                 rel.destination_type, rel.destination_id).in_(
+              {(obj.type, obj.id, child.type, child.id)
+               for obj, child in candidates}),
+          tuple_(rel.destination_type, rel.destination_id,
+                 rel.source_type, rel.source_id).in_(
+              {(obj.type, obj.id, child.type, child.id)
+               for obj, child in candidates}),
+      ))
+      neighbors = set()
+      for stype, sid, dtype, did in existing:
+        source = Stub(stype, sid)
+        destination = Stub(dtype, did)
+        neighbors.add(destination if source in objects else source)
+      return neighbors
+
+  @staticmethod
+  def _fetch_changed_children(parent, since):
+    """Get snapshotted children of a parent with revisions after a revision.
+    """
+    with benchmark("Snapshot._fetch_changed_children"):
+      changed = db.session.query(
+          models.Snapshot.child_type,
+          models.Snapshot.child_id,
+      ).join(
+          models.Revision,
+          and_(
+              models.Revision.resource_type == models.Snapshot.child_type,
+              models.Revision.resource_id == models.Snapshot.child_id,
+          ),
+      ).filter(
+          models.Revision.id > since,
+          models.Snapshot.parent_type == parent.type,
+          models.Snapshot.parent_id == parent.id,
+      ).distinct()
+      return {Stub(child_type, child_id) for child_type, child_id in changed}
+
   def _fetch_neighborhood(self, parent_object, objects):
     with benchmark("Snapshot._fetch_object_neighborhood"):
       query_pairs = set()
@@ -112,6 +244,14 @@ class SnapshotGenerator(object):
   def _get_snapshottable_objects(self, obj):
     """Get snapshottable objects from parent object's neighborhood."""
     with benchmark("Snapshot._get_snapshotable_objects"):
+      related_objects = self._get_related_objects(obj)
+
+      with benchmark("Snapshot._get_snapshotable_objects.fetch neighborhood"):
+        return self._fetch_neighborhood(obj, related_objects)
+
+  def _get_related_objects(self, obj):
+    """Get first degree objects of a parent object."""
+    with benchmark("Snapshot._get_related_objects"):
       related_mappings = set()
       object_rules = self.rules.rules[obj.type]
 
@@ -131,11 +271,8 @@ class SnapshotGenerator(object):
                            for rule in object_rules["fst"]
                            if isinstance(rule, Attr)}
 
-      related_objects = {Stub.from_object(obj)
-                         for obj in related_mappings | direct_mappings}
-
-      with benchmark("Snapshot._get_snapshotable_objects.fetch neighborhood"):
-        return self._fetch_neighborhood(obj, related_objects)
+      return {Stub.from_object(obj)
+              for obj in related_mappings | direct_mappings}
 
   def update(self, event, revisions, _filter=None):
     """Update parent object's snapshots."""
@@ -251,25 +388,40 @@ class SnapshotGenerator(object):
 
       with benchmark("Insert Snapshot entries into Revision"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._update_latest_revisions(event_id, revision_payload)
       return OperationResponse("update", True, for_update, response_data)
 
   def analyze(self):
     """Analyze which snapshots need to be updated and which created"""
-    query = set(db.session.query(
+    columns = db.session.query(
         models.Snapshot.parent_type,
         models.Snapshot.parent_id,
         models.Snapshot.child_type,
         models.Snapshot.child_id,
-    ).filter(tuple_(
-        models.Snapshot.parent_type, models.Snapshot.parent_id
-    ).in_(self.parents)))
-
-    existing_scope = {Pair.from_4tuple(fields) for fields in query}
+    )
 
     full_scope = {Pair(parent, child)
                   for parent, children in self.snapshots.items()
                   for child in children}
 
+    existing_scope = set()
+    full_parents = self.parents - self.incremental_parents
+    if full_parents:
+      query = columns.filter(tuple_(
+          models.Snapshot.parent_type, models.Snapshot.parent_id
+      ).in_(full_parents))
+      existing_scope |= {Pair.from_4tuple(fields) for fields in query}
+
+    # only changed children of incrementally added parents are compared
+    incremental_scope = {pair for pair in full_scope
+                         if pair.parent in self.incremental_parents}
+    if incremental_scope:
+      query = columns.filter(tuple_(
+          models.Snapshot.parent_type, models.Snapshot.parent_id,
+          models.Snapshot.child_type, models.Snapshot.child_id
+      ).in_({pair.to_4tuple() for pair in incremental_scope}))
+      existing_scope |= {Pair.from_4tuple(fields) for fields in query}
+
     for_update = existing_scope
     for_create = full_scope - existing_scope
 
@@ -314,6 +466,94 @@ class SnapshotGenerator(object):
         "dry-run": self.dry_run
     })
 
+  def _run_batch(self, pairs, event, revisions, update_existing):
+    """Create snapshots of a batch of pairs and reindex them.
+
+    Snapshots, their relationships and revisions of the whole batch are
+    written in a single transaction, so a failed batch leaves nothing behind
+    and can be run again. Pairs that already have snapshots, e.g. ones
+    written by a concurrent run, are updated if update_existing is set and
+    skipped otherwise.
+    """
+    self.atomic = True
+    try:
+      self._write_batch(pairs, event, revisions, update_existing)
+      db.session.commit()
+    finally:
+      self.atomic = False
+
+  def _write_batch(self, pairs, event, revisions, update_existing):
+    """Write snapshots of a batch of pairs without committing them."""
+    existing = {
+        Pair.from_4tuple((snapshot.parent_type, snapshot.parent_id,
+                          snapshot.child_type, snapshot.child_id))
+        for snapshot in get_snapshots(pairs)
+    }
+    changed = set()
+    if update_existing and existing:
+      changed |= self._update(for_update=existing, event=event,
+                              revisions=revisions, _filter=None).response
+    for_create = pairs - existing
+    if for_create:
+      changed |= self._create(for_create=for_create, event=event,
+                              revisions=revisions, _filter=None).response
+    # reindexing commits the written snapshots, so snapshots of an attempt
+    # that failed while reindexing exist but still need to be reindexed
+    reindex_pairs(changed | existing)
+
+  def run_in_batches(self, operation, event, revisions, batch_size,
+                     retries=0, report=None):
+    """Create or upsert snapshots in batches of pairs.
+
+    Every batch is committed on its own and a failed batch is rolled back and
+    retried at most retries times. Running the whole operation again resumes it, since created
+    snapshots are not part of the scope of the next "create" operation and
+    updating a snapshot to the revision it already has does nothing.
+
+    Args:
+      operation: "create" or "upsert".
+      event: A ggrc.models.Event instance
+      revisions: A dict of pairs and revision ids to which snapshots should
+        be created or updated
+      batch_size: number of pairs in a single batch.
+      retries: number of retries of a failed batch.
+      report: callable that receives a progress dict after every batch.
+    Returns:
+      OperationResponse
+    """
+    for_create, for_update = self.analyze()
+    if operation == "upsert":
+      pairs = sorted(for_create | for_update)
+    else:
+      pairs = sorted(for_create)
+    batches = list(list_chunks(pairs, batch_size))
+    progress = {"pairs": len(pairs), "done": 0, "batches": len(batches)}
+    for index, batch in enumerate(batches):
+      for attempt in range(retries + 1):
+        try:
+          with benchmark("Snapshot.run_in_batches.batch"):
+            self._run_batch(set(batch), event, revisions,
+                            update_existing=operation == "upsert")
+          break
+        except Exception:  # pylint: disable=broad-except
+          if attempt == retries:
+            raise
+          logger.warning("Snapshot batch %s of %s failed, retrying",
+                         index + 1, len(batches), exc_info=True)
+          db.session.rollback()
+      progress["done"] += len(batch)
+      if report:
+        report(progress)
+    self._copy_snapshot_relationships()
+    db.session.commit()
+    return OperationResponse(operation, True, set(pairs), progress)
+
+  def _update_latest_revisions(self, event_id, revision_payload):
+    """Update latest_revisions rows for revisions written with _execute."""
+    if revision_payload and not self.dry_run:
+      update_latest_revisions(event_id,
+                              db.session if self.atomic else db.engine)
+
   def _execute(self, operation, data):
     """Execute bulk operation on data if not in dry mode
 
@@ -325,6 +565,9 @@ class SnapshotGenerator(object):
       True if successful.
     """
     if data and not self.dry_run:
+      if self.atomic:
+        db.session.execute(operation, data)
+        return
       engine = db.engine
       engine.execute(operation, data)
       db.session.commit()
@@ -439,6 +682,7 @@ class SnapshotGenerator(object):
 
       with benchmark("Snapshot._create.write revisions to database"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._update_latest_revisions(event_id, revision_payload)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -486,6 +730,93 @@ class SnapshotGenerator(object):
       })
 
 
+def get_last_revision_id():
+  """Get id of the newest revision."""
+  return db.session.query(func.max(models.Revision.id)).scalar() or 0
+
+
+def get_scope_syncs(parents):
+  """Get newest revisions considered by the last scope syncs of parents.
+
+  Parents whose scope was not fully compared in the last
+  SNAPSHOT_FULL_SYNC_INTERVAL seconds are treated as never synced.
+
+  Args:
+    parents: set of parent object stubs.
+  Returns:
+    dict: revision ids by parent stub, parents that were never synced are
+      left out.
+  """
+  if not parents:
+    return {}
+  full_sync_after = datetime.utcnow() - timedelta(
+      seconds=settings.SNAPSHOT_FULL_SYNC_INTERVAL)
+  query = db.session.query(
+      SnapshotScopeSync.parent_type,
+      SnapshotScopeSync.parent_id,
+      SnapshotScopeSync.revision_id,
+  ).filter(tuple_(
+      SnapshotScopeSync.parent_type,
+      SnapshotScopeSync.parent_id,
+  ).in_(parents)).filter(
+      SnapshotScopeSync.full_synced_at >= full_sync_after,
+  )
+  return {Stub(parent_type, parent_id): revision_id
+          for parent_type, parent_id, revision_id in query}
+
+
+def record_scope_syncs(parents, revision_id, full_parents):
+  """Store that scopes of parents are in sync with all revisions up to one.
+
+  Args:
+    parents: set of parent object stubs.
+    revision_id: id of the newest revision at the start of the sync.
+    full_parents: set of parents whose whole scope was compared.
+  """
+  if not parents:
+    return
+  db.session.execute(text("""
+      INSERT INTO snapshot_scope_syncs (
+          parent_type, parent_id, revision_id, full_synced_at
+      )
+      VALUES (:parent_type, :parent_id, :revision_id, :full_synced_at)
+      ON DUPLICATE KEY UPDATE
+          revision_id = VALUES(revision_id),
+          full_synced_at = COALESCE(VALUES(full_synced_at), full_synced_at)
+  """), [{
+      "parent_type": parent.type,
+      "parent_id": parent.id,
+      "revision_id": revision_id,
+      "full_synced_at": datetime.utcnow() if parent in full_parents else None,
+  } for parent in parents])
+  db.session.commit()
+
+
+def _record_generator_syncs(generator, revision_id):
+  """Store scope syncs of all parents of a generator."""
+  record_scope_syncs(generator.parents, revision_id,
+                     generator.parents - generator.incremental_parents)
+
+
+def _add_parents(generator, objs, revisions):
+  """Add parent objects to a generator for an upsert.
+
+  With the SNAPSHOT_INCREMENTAL_UPSERT setting, parents with a recorded scope
+  sync are added with changes since SNAPSHOT_SYNC_REVISION_MARGIN revisions
+  before that sync only.
+  """
+  syncs = {}
+  if settings.SNAPSHOT_INCREMENTAL_UPSERT:
+    syncs = get_scope_syncs({Stub.from_object(obj) for obj in objs})
+  for obj in objs:
+    since = syncs.get(Stub.from_object(obj))
+    if since is None:
+      generator.add_parent(obj)
+    else:
+      since = max(since - settings.SNAPSHOT_SYNC_REVISION_MARGIN, 0)
+      generator.add_parent_changes(obj, since, revisions)
+
+
 def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
   """Create snapshots of parent objects."""
   # pylint: disable=unused-argument
@@ -494,6 +825,7 @@ def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
 
   with benchmark("Snapshot.create_snapshots"):
     with benchmark("Snapshot.create_snapshots.init"):
+      sync_revision_id = get_last_revision_id()
       generator = SnapshotGenerator(dry_run)
       if not isinstance(objs, set):
         objs = {objs}
@@ -502,9 +834,12 @@ def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
         with benchmark("Snapshot.create_snapshots.add_parent_objects"):
           generator.add_parent(obj)
     with benchmark("Snapshot.create_snapshots.create"):
-      return generator.create(event=event,
-                              revisions=revisions,
-                              _filter=_filter)
+      result = generator.create(event=event,
+                                revisions=revisions,
+                                _filter=_filter)
+    if not dry_run and _filter is None:
+      _record_generator_syncs(generator, sync_revision_id)
+    return result
 
 
 def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
@@ -514,13 +849,101 @@ def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
     revisions = set()
 
   with benchmark("Snapshot.update_snapshots"):
+    sync_revision_id = get_last_revision_id()
     generator = SnapshotGenerator(dry_run)
     if not isinstance(objs, set):
       objs = {objs}
     for obj in objs:
       db.session.add(obj)
+    _add_parents(generator, objs, revisions)
+    result = generator.upsert(event=event, revisions=revisions,
+                              _filter=_filter)
+    if not dry_run and _filter is None:
+      _record_generator_syncs(generator, sync_revision_id)
+    return result
+
+
+def set_scope_status(obj, status):
+  """Store the scope status of a parent object.
+
+  The status is written without logging a change of the object or changing
+  its last modification time, so clients can still update the object after
+  its scope is created. Cached entries of the object are removed, since the
+  cache manager does not see the write.
+  """
+  from ggrc.services.common import clear_object_cache
+  table = obj.__table__
+  db.session.execute(table.update().where(table.c.id == obj.id).values(
+      scope_status=status, updated_at=table.c.updated_at))
+  db.session.commit()
+  set_committed_value(obj, "scope_status", status)
+  clear_object_cache([obj])
+
+
+def schedule_snapshots(obj, event, operation, revisions=None):
+  """Create or upsert snapshots of a parent object in a background task.
+
+  Args:
+    obj: parent object.
+    event: A ggrc.models.Event instance
+    operation: "create" or "upsert".
+    revisions: list of {"parent", "child", "revision_id"} dicts of pairs with
+      specified revisions.
+  Returns:
+    The scheduled BackgroundTask.
+  """
+  from ggrc.views import build_snapshot_scope
+  set_scope_status(obj, obj.SCOPE_PENDING)
+  return create_task(
+      "snapshot_scope_{}_{}_".format(obj.type, obj.id),
+      url_for(build_snapshot_scope.__name__),
+      build_snapshot_scope,
+      {
+          "parent": {"type": obj.type, "id": obj.id},
+          "event_id": event.id,
+          "operation": operation,
+          "revisions": revisions or [],
+      },
+  )
+
+
+def build_scope(task):
+  """Create or upsert snapshots of the parent object of a background task.
+
+  Progress of the batches is stored with the task and the scope status of the
+  parent object is set once all batches are done or one of them failed.
+
+  Returns:
+    dict: final progress report.
+  """
+  params = task.parameters
+  parent = Stub.from_dict(params["parent"])
+  obj = getattr(models.all_models, parent.type).query.get(parent.id)
+  event = models.Event.query.get(params["event_id"])
+  revisions = {
+      Pair(Stub.from_dict(revision["parent"]),
+           Stub.from_dict(revision["child"])): revision["revision_id"]
+      for revision in params["revisions"]}
+  sync_revision_id = get_last_revision_id()
+  generator = SnapshotGenerator(dry_run=False)
+  try:
+    if params["operation"] == "upsert":
+      _add_parents(generator, [obj], revisions)
+    else:
       generator.add_parent(obj)
-    return generator.upsert(event=event, revisions=revisions, _filter=_filter)
+    result = generator.run_in_batches(
+        params["operation"], event, revisions,
+        batch_size=settings.SNAPSHOT_BATCH_SIZE,
+        retries=settings.SNAPSHOT_BATCH_RETRIES,
+        report=task.update_progress)
+  except Exception:  # pylint: disable=broad-except
+    exc_type, exc_value, exc_trace = sys.exc_info()
+    db.session.rollback()
+    set_scope_status(obj, obj.SCOPE_FAILED)
+    raise exc_type, exc_value, exc_trace
+  _record_generator_syncs(generator, sync_revision_id)
+  set_scope_status(obj, obj.SCOPE_READY)
+  return result.data
 
 
 def clone_scope(base_parent, new_parent, event):
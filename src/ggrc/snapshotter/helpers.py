@@ -3,13 +3,14 @@
 
 """Various simple helper functions for snapshot generator"""
 
-import collections
 from logging import getLogger
 
+from sqlalchemy import func
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.revision import LatestRevision
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
@@ -17,6 +18,65 @@ from ggrc.utils import benchmark
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def _filter_revisions(query, filters):
+  """Apply predicates to a revisions query."""
+  for _filter in filters or []:
+    query = query.filter(_filter)
+  return query
+
+
+def get_latest_revision_ids(child_stubs, filters=None):
+  """Retrieve ids of the newest revisions of objects.
+
+  The newest revisions are read from the latest_revisions table. Objects that
+  have no row in it or whose newest revision does not pass the filters, e.g.
+  objects with a "deleted" revision, are looked up in the whole revision
+  history.
+
+  Args:
+    child_stubs: set of object stubs.
+    filters: predicates on the Revision model.
+
+  Returns:
+    dict: revision ids by object stub.
+  """
+  latest_ids = {}
+  with benchmark("get_revisions.retrieve latest revisions"):
+    query = db.session.query(
+        models.Revision.id,
+        models.Revision.resource_type,
+        models.Revision.resource_id,
+    ).join(
+        LatestRevision,
+        LatestRevision.revision_id == models.Revision.id,
+    ).filter(
+        tuple_(
+            LatestRevision.resource_type,
+            LatestRevision.resource_id).in_(child_stubs)
+    )
+    for revid, restype, resid in _filter_revisions(query, filters):
+      latest_ids[Stub(restype, resid)] = revid
+
+  missing = set(child_stubs) - set(latest_ids)
+  if missing:
+    with benchmark("get_revisions.retrieve revisions from history"):
+      query = db.session.query(
+          func.max(models.Revision.id),
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+      ).filter(
+          tuple_(
+              models.Revision.resource_type,
+              models.Revision.resource_id).in_(missing)
+      ).group_by(
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+      )
+      for revid, restype, resid in _filter_revisions(query, filters):
+        latest_ids[Stub(restype, resid)] = revid
+  return latest_ids
+
+
 def get_revisions(pairs, revisions, filters=None):
   """Retrieve revision ids for pairs
 
@@ -32,42 +92,32 @@ def get_revisions(pairs, revisions, filters=None):
     revision_id_cache = dict()
 
     if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
-            parents_cache[child].add(parent)
-
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
-
-      with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+      specified = {pair: revisions[pair] for pair in pairs
+                   if pair in revisions}
+      child_stubs = {pair.child for pair in pairs if pair not in specified}
+
+      if child_stubs:
+        latest_ids = get_latest_revision_ids(child_stubs, filters)
+        for pair in pairs:
+          if pair not in specified and pair.child in latest_ids:
+            revision_id_cache[pair] = latest_ids[pair.child]
+
+      if specified:
+        with benchmark("get_revisions.retrieve specified revisions"):
+          query = db.session.query(
+              models.Revision.id,
+              models.Revision.resource_type,
+              models.Revision.resource_id,
+          ).filter(models.Revision.id.in_(set(specified.values())))
+          history = {revid: Stub(restype, resid) for revid, restype, resid
+                     in _filter_revisions(query, filters)}
+        for key, revid in specified.iteritems():
+          if history.get(revid) == key.child:
+            revision_id_cache[key] = revid
+          else:
+            logger.warning(
+                "Specified revision for object %s but couldn't find the"
+                "revision '%s' in object history", key, revid)
     return revision_id_cache
 
 
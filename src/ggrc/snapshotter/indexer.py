@@ -8,15 +8,17 @@ from collections import defaultdict
 import itertools
 
 from sqlalchemy.sql.expression import tuple_
-from sqlalchemy import orm
+from sqlalchemy import select
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.models import all_models
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.fulltext import get_indexer
 from ggrc.models.reflection import AttributeInfo
 from ggrc.utils import generate_query_chunks
+from ggrc.utils import list_chunks
 
 from ggrc.snapshotter.rules import Types
 from ggrc.snapshotter.datastructures import Pair
@@ -51,6 +53,9 @@ def _get_class_properties():
 CLASS_PROPERTIES = _get_class_properties()
 
 
+# Number of full text records inserted with a single statement
+RECORDS_CHUNK_SIZE = 5000
+
 TAG_TMPL = u"{parent_type}-{parent_id}-{child_type}"
 PARENT_PROPERTY_TMPL = u"{parent_type}-{parent_id}"
 CHILD_PROPERTY_TMPL = u"{child_type}-{child_id}"
@@ -267,16 +272,168 @@ def get_record_value(prop, val, rec):
   return []
 
 
+def _iter_snapshot_rows(snapshot_query, batch_size):
+  """Generate batches of snapshot columns needed for indexing.
+
+  Batches are paged by snapshot id, so every batch is a small query even for
+  parents with many snapshots.
+  """
+  query = snapshot_query.with_entities(
+      models.Snapshot.id,
+      models.Snapshot.context_id,
+      models.Snapshot.parent_type,
+      models.Snapshot.parent_id,
+      models.Snapshot.child_type,
+      models.Snapshot.child_id,
+      models.Snapshot.revision_id,
+  ).order_by(models.Snapshot.id)
+  last_id = 0
+  while True:
+    rows = query.filter(models.Snapshot.id > last_id).limit(batch_size).all()
+    if not rows:
+      return
+    yield rows
+    last_id = rows[-1].id
+
+
+def _get_searchable_contents(cad_dict, revision_ids):
+  """Get searchable attributes of revisions.
+
+  Revision content is read without loading Revision objects and only the
+  searchable attributes of every content are kept after it is decoded.
+
+  Returns:
+    dict: searchable attributes by revision id.
+  """
+  table = models.Revision.__table__
+  rows = db.session.execute(select([
+      table.c.id,
+      table.c.resource_type,
+      table.c.content,
+  ]).where(table.c.id.in_(revision_ids)))
+  return {
+      revision_id: get_searchable_attributes(
+          CLASS_PROPERTIES[resource_type], cad_dict, content)
+      for revision_id, resource_type, content in rows
+  }
+
+
+def _get_referenced_people(snapshots):
+  """Get ids of people and access control roles used in snapshot attributes.
+  """
+  person_ids = set()
+  role_ids = set()
+  for snapshot in snapshots:
+    for prop, val in snapshot["revision"].iteritems():
+      if prop == "assignees":
+        val = [person for person, _ in val or []]
+      for item in val if isinstance(val, list) else [val]:
+        if not isinstance(item, dict):
+          continue
+        if item.get("type") == "Person":
+          person_ids.add(item["id"])
+        elif prop == "access_control_list":
+          person_ids.add(item["person_id"])
+          role_ids.add(item["ac_role_id"])
+  return person_ids, role_ids
+
+
+def _cache_people(snapshots):
+  """Load people and roles of snapshots into the indexer cache.
+
+  Record builders look up every person and access control role that is not
+  in the cache with a separate query, so the missing ones are loaded at once
+  for the whole batch. Cached entries are reused by the following batches.
+  """
+  cache = get_indexer().cache
+  person_ids, role_ids = _get_referenced_people(snapshots)
+  missing_people = list(person_ids - set(cache["people_map"]))
+  for ids in list_chunks(missing_people):
+    people = db.session.query(
+        models.Person.id,
+        models.Person.name,
+        models.Person.email,
+    ).filter(models.Person.id.in_(ids))
+    cache["people_map"].update(
+        (person.id, (person.name, person.email)) for person in people)
+  missing_roles = list(role_ids - set(cache["ac_role_map"]))
+  if missing_roles:
+    cache["ac_role_map"].update(db.session.query(
+        all_models.AccessControlRole.id,
+        all_models.AccessControlRole.name,
+    ).filter(all_models.AccessControlRole.id.in_(missing_roles)))
+
+
+def iter_snapshots(snapshot_query, batch_size=None):
+  """Generate batches of snapshots with their searchable attributes.
+
+  Args:
+    snapshot_query: Snapshot query whose results should be indexed.
+    batch_size: number of snapshots in a batch, defaults to the
+      SNAPSHOT_INDEX_BATCH_SIZE setting.
+  Yields:
+    Lists of snapshot dicts.
+  """
+  batch_size = batch_size or settings.SNAPSHOT_INDEX_BATCH_SIZE
+  cad_dict = _get_custom_attribute_dict()
+  for rows in _iter_snapshot_rows(snapshot_query, batch_size):
+    contents = _get_searchable_contents(
+        cad_dict, {row.revision_id for row in rows})
+    snapshots = [{
+        "id": row.id,
+        "context_id": row.context_id,
+        "parent_type": row.parent_type,
+        "parent_id": row.parent_id,
+        "child_type": row.child_type,
+        "child_id": row.child_id,
+        "revision": contents[row.revision_id],
+    } for row in rows if row.revision_id in contents]
+    _cache_people(snapshots)
+    yield snapshots
+
+
+def iter_records(snapshots):
+  """Generate full text records of snapshots."""
+  for snapshot in snapshots:
+    for prop, val in get_properties(snapshot).iteritems():
+      for record in get_record_value(prop, val, {
+          "key": snapshot["id"],
+          "type": "Snapshot",
+          "context_id": snapshot["context_id"],
+          "tags": TAG_TMPL.format(**snapshot),
+          "subproperty": "",
+      }):
+        yield record
+
+
+def get_snapshots_payload(snapshot_ids):
+  """Get full text records for snapshots with the given ids.
+
+  Args:
+    snapshot_ids: An iterable with snapshot IDs that should be indexed.
+  Returns:
+    List of dictionaries that represent full text record entries.
+  """
+  if not snapshot_ids:
+    return []
+  snapshot_query = models.Snapshot.query.filter(
+      models.Snapshot.id.in_(snapshot_ids))
+  return [record for snapshots in iter_snapshots(snapshot_query)
+          for record in iter_records(snapshots)]
+
+
 def reindex_pairs(pairs):
   """Reindex selected snapshots.
 
+  Snapshots are reindexed in batches, records of a batch are generated and
+  inserted in chunks, so memory use does not grow with the number of pairs.
+
   Args:
     pairs: A list of parent-child pairs that uniquely represent snapshot
     object whose properties should be reindexed.
   """
   if not pairs:
     return
-  snapshots = dict()
   snapshot_query = models.Snapshot.query.filter(
       tuple_(
           models.Snapshot.parent_type,
@@ -286,48 +443,12 @@ def reindex_pairs(pairs):
       ).in_(
           {pair.to_4tuple() for pair in pairs}
       )
-  ).options(
-      orm.subqueryload("revision").load_only("id", "resource_type", "content"),
-      orm.load_only(
-          "id",
-          "context_id",
-          "parent_type",
-          "parent_id",
-          "child_type",
-          "child_id",
-          "revision_id",
-      )
   )
-  cad_dict = _get_custom_attribute_dict()
-  for snapshot in snapshot_query:
-    revision = snapshot.revision
-    snapshots[snapshot.id] = {
-        "id": snapshot.id,
-        "context_id": snapshot.context_id,
-        "parent_type": snapshot.parent_type,
-        "parent_id": snapshot.parent_id,
-        "child_type": snapshot.child_type,
-        "child_id": snapshot.child_id,
-        "revision": get_searchable_attributes(
-            CLASS_PROPERTIES[revision.resource_type],
-            cad_dict,
-            revision.content)
-    }
-  search_payload = []
-  for snapshot in snapshots.values():
-    for prop, val in get_properties(snapshot).items():
-      search_payload.extend(
-          get_record_value(
-              prop,
-              val,
-              {
-                  "key": snapshot["id"],
-                  "type": "Snapshot",
-                  "context_id": snapshot["context_id"],
-                  "tags": TAG_TMPL.format(**snapshot),
-                  "subproperty": "",
-              }
-          )
-      )
-  delete_records(snapshots.keys())
-  insert_records(search_payload)
+  for snapshots in iter_snapshots(snapshot_query):
+    delete_records([snapshot["id"] for snapshot in snapshots])
+    records = iter_records(snapshots)
+    while True:
+      chunk = list(itertools.islice(records, RECORDS_CHUNK_SIZE))
+      if not chunk:
+        break
+      insert_records(chunk)
@@ -4,18 +4,29 @@
 """Register various listeners needed for snapshot operation"""
 
 from ggrc import models
+from ggrc import settings
 from ggrc.services import signals
 from ggrc.snapshotter import create_snapshots
+from ggrc.snapshotter import schedule_snapshots
 from ggrc.snapshotter import upsert_snapshots
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.rules import get_rules
 
 
+def mark_scope_pending(sender, obj=None, src=None, service=None):  # noqa  # pylint: disable=unused-argument
+  """Mark scope of a new object pending if it is created in the background"""
+  if settings.SNAPSHOT_BACKGROUND and not src.get("operation"):
+    obj.scope_status = obj.SCOPE_PENDING
+
+
 def create_all(sender, obj=None, src=None, service=None, event=None):  # noqa  # pylint: disable=unused-argument
   """Create snapshots"""
   # We use "operation" for non-standard operations (e.g. cloning)
   if not src.get("operation"):
-    create_snapshots(obj, event)
+    if settings.SNAPSHOT_BACKGROUND:
+      schedule_snapshots(obj, event, "create")
+    else:
+      create_snapshots(obj, event)
 
 
 def upsert_all(sender, obj=None, src=None, service=None, event=None):  # noqa  # pylint: disable=unused-argument
@@ -23,11 +34,15 @@ def upsert_all(sender, obj=None, src=None, service=None, event=None):  # noqa  #
   snapshot_settings = src.get("snapshots")
   if snapshot_settings:
     if snapshot_settings["operation"] == "upsert":
-      revisions = {
-          (Stub.from_dict(revision["parent"]),
-           Stub.from_dict(revision["child"])): revision["revision_id"]
-          for revision in snapshot_settings.get("revisions", {})}
-      upsert_snapshots(obj, event, revisions=revisions)
+      if settings.SNAPSHOT_BACKGROUND:
+        schedule_snapshots(obj, event, "upsert",
+                           snapshot_settings.get("revisions", []))
+      else:
+        revisions = {
+            (Stub.from_dict(revision["parent"]),
+             Stub.from_dict(revision["child"])): revision["revision_id"]
+            for revision in snapshot_settings.get("revisions", {})}
+        upsert_snapshots(obj, event, revisions=revisions)
 
 
 def register_snapshot_listeners():
@@ -38,6 +53,8 @@ def register_snapshot_listeners():
   # Initialize listening on parent objects
   for type_ in rules.rules.keys():
     model = getattr(models.all_models, type_)
+    signals.Restful.model_posted.connect(
+        mark_scope_pending, model, weak=False)
     signals.Restful.model_posted_after_commit.connect(
         create_all, model, weak=False)
     signals.Restful.model_put_after_commit.connect(
@@ -254,6 +254,12 @@ def generate_query_chunks(query, chunk_size=1000):
     yield query.order_by("id").limit(chunk_size).offset(offset)
 
 
+def list_chunks(items, chunk_size=1000):
+  """Make a generator splitting `items` list into chunks of `chunk_size`."""
+  for offset in range(0, len(items), chunk_size):
+    yield items[offset:offset + chunk_size]
+
+
 def create_stub(object_, context_id=None):
   """Create stub from model attribute
 
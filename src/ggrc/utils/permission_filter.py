@@ -0,0 +1,122 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Precomputed permission filters for search and query API queries.
+
+Allowed contexts and resources of the current user are computed once per
+request and kept in memory on flask.g. Search, counts and query API
+statements of the request reuse them instead of computing them again for
+every model and every extra column. Long lists of allowed ids are split into
+several ``IN (...)`` lists.
+"""
+
+from flask import g
+from flask import has_request_context
+from sqlalchemy import and_
+from sqlalchemy import false
+from sqlalchemy import or_
+
+from ggrc.utils import list_chunks
+from ggrc.utils import query_helpers
+
+
+# Number of ids rendered in a single IN list
+IN_LIST_SIZE = 1000
+
+
+def _in_lists(column, values):
+  """Get filter for values in a column, split into several IN lists."""
+  if not values:
+    return false()
+  return or_(*[column.in_(chunk)
+               for chunk in list_chunks(values, IN_LIST_SIZE)])
+
+
+class PermissionFilter(object):
+  """Permission filter with allowed contexts and resources of the user."""
+
+  def __init__(self):
+    self._permissions = {}
+
+  def _load(self, model_name, permission_type, permission_model):
+    """Get allowed contexts and resources of a model.
+
+    Returns:
+      None if all objects of the model are allowed, otherwise a tuple with
+      a flag for the NULL context, sorted list of allowed context ids and
+      sorted list of allowed resource ids.
+    """
+    key = (permission_type, permission_model, model_name)
+    if key not in self._permissions:
+      contexts, resources = query_helpers.get_context_resource(
+          model_name=model_name,
+          permission_type=permission_type,
+          permission_model=permission_model
+      )
+      if contexts is None:
+        self._permissions[key] = None
+      else:
+        contexts = set(contexts)
+        self._permissions[key] = (
+            None in contexts,
+            sorted(contexts - {None}),
+            sorted(set(resources or [])),
+        )
+    return self._permissions[key]
+
+  @staticmethod
+  def _get_allowed_expression(permissions, id_column, context_column):
+    """Get IN lists of allowed contexts and resources."""
+    null_context, contexts, resources = permissions
+    filters = []
+    if null_context:
+      filters.append(context_column.is_(None))
+    if contexts:
+      filters.append(_in_lists(context_column, contexts))
+    if resources:
+      filters.append(_in_lists(id_column, resources))
+    if not filters:
+      return false()
+    return or_(*filters)
+
+  def get_records_filter(self, record_type, model_names,
+                         permission_type='read', permission_model=None):
+    """Get permission filter for full text records of the given models."""
+    unrestricted = []
+    filters = []
+    for model_name in model_names:
+      permissions = self._load(model_name, permission_type, permission_model)
+      if permissions is None:
+        unrestricted.append(model_name)
+        continue
+      filters.append(and_(
+          record_type.type == model_name,
+          self._get_allowed_expression(permissions, record_type.key,
+                                       record_type.context_id),
+      ))
+    if unrestricted:
+      filters.append(record_type.type.in_(unrestricted))
+    if not filters:
+      return false()
+    return or_(*filters)
+
+  def get_model_filter(self, model, permission_type='read'):
+    """Get permission filter for objects of a model.
+
+    Returns:
+      None if all objects are allowed, otherwise the filter expression.
+    """
+    permissions = self._load(model.__name__, permission_type, None)
+    if permissions is None:
+      return None
+    return self._get_allowed_expression(permissions, model.id,
+                                        model.context_id)
+
+
+def get_permission_filter():
+  """Get permission filter of the current request."""
+  if not has_request_context():
+    return PermissionFilter()
+  if not hasattr(g, "permission_filter"):
+    g.permission_filter = PermissionFilter()
+  return g.permission_filter
@@ -13,6 +13,7 @@ from ggrc import db
 from ggrc.utils import benchmark
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models.revision import update_latest_revisions
 from ggrc.snapshotter.rules import Types
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
@@ -127,6 +128,7 @@ def _recover_delete_revisions(revisions_table, event,
           ),
       ),
   )
+  update_latest_revisions(event.id)
 
 
 def _recover_create_revisions(revisions_table, event, object_type,
@@ -167,6 +169,7 @@ def _recover_create_revisions(revisions_table, event, object_type,
         "destination_id": obj_content.get("destination_id")}
        for (obj_id, obj_content) in object_ids_with_jsons],
   )
+  update_latest_revisions(event.id)
 
 
 def set_resource_slugs():
@@ -17,13 +17,14 @@ from werkzeug.exceptions import Forbidden
 
 from ggrc import models
 from ggrc import settings
+from ggrc import snapshotter
 from ggrc.app import app
 from ggrc.app import db
 from ggrc.builder.json import publish
 from ggrc.builder.json import publish_representation
 from ggrc.converters import get_importables, get_exportables
 from ggrc.extensions import get_extension_modules
-from ggrc.fulltext import get_indexer, get_indexed_model_names, mixin
+from ggrc.fulltext import reindex as reindex_engine
 from ggrc.login import get_current_user
 from ggrc.login import login_required
 from ggrc.models import all_models
@@ -37,7 +38,6 @@ from ggrc.services.common import as_json
 from ggrc.services.common import inclusion_filter
 from ggrc.services import query as services_query
 from ggrc.snapshotter import rules
-from ggrc.snapshotter.indexer import reindex as reindex_snapshots
 from ggrc.views import converters
 from ggrc.views import cron
 from ggrc.views import filters
@@ -46,7 +46,6 @@ from ggrc.views import notifications
 from ggrc.views.common import RedirectedPolymorphView
 from ggrc.views.registry import object_view
 from ggrc.utils import benchmark
-from ggrc.utils import generate_query_chunks
 from ggrc.utils import revisions
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -63,51 +62,35 @@ def refresh_revisions(_):
 
 @app.route("/_background_tasks/reindex", methods=["POST"])
 @queued_task
-def reindex(_):
+def reindex(task):
   """Web hook to update the full text search index."""
-  do_reindex()
-  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+  progress = do_reindex(task)
+  return app.make_response((
+      as_json(progress), 200, [("Content-Type", "application/json")]))
+
+
+@app.route("/_background_tasks/build_snapshot_scope", methods=["POST"])
+@queued_task
+def build_snapshot_scope(task):
+  """Web hook to create snapshots of an object in batches."""
+  progress = snapshotter.build_scope(task)
+  return app.make_response((
+      as_json(progress), 200, [("Content-Type", "application/json")]))
 
 
-def do_reindex():
-  """Update the full text search index."""
-
-  indexer = get_indexer()
-  indexed_models = get_indexed_model_names()
-
-  people = db.session.query(all_models.Person.id, all_models.Person.name,
-                            all_models.Person.email)
-  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people}
-  indexer.cache["ac_role_map"] = dict(db.session.query(
-      all_models.AccessControlRole.id,
-      all_models.AccessControlRole.name,
-  ))
-  for model in sorted(indexed_models):
-    # pylint: disable=protected-access
-    logger.info("Updating index for: %s", model)
-    with benchmark("Create records for %s" % model):
-      model = get_model(model)
-      mapper_class = model._sa_class_manager.mapper.base_mapper.class_
-      if issubclass(model, mixin.Indexed):
-        for query_chunk in generate_query_chunks(db.session.query(model.id)):
-          model.bulk_record_update_for([i.id for i in query_chunk])
-          db.session.commit()
-      else:
-        logger.warning(
-            "Try to index model that not inherited from Indexed mixin: %s",
-            model.__name__
-        )
-        indexer.delete_records_by_type(model.__name__)
-        query = model.query.options(
-            db.undefer_group(mapper_class.__name__ + '_complete'),
-        )
-        for query_chunk in generate_query_chunks(query):
-          for instance in query_chunk:
-            indexer.create_record(indexer.fts_record_for(instance), False)
-          db.session.commit()
-
-  reindex_snapshots()
-  indexer.invalidate_cache()
+def do_reindex(task=None):
+  """Update the full text search index.
+
+  The index is rebuilt into a shadow table and swapped in at the end. An
+  interrupted reindex is resumed from the stored checkpoints.
+
+  Args:
+    task: optional background task that receives per partition progress.
+  Returns:
+    Progress report dict of the reindex.
+  """
+  progress_callback = task.update_progress if task else None
+  return reindex_engine.Reindexer().run(progress_callback=progress_callback)
 
 
 def get_permissions_json():
@@ -338,6 +321,24 @@ def admin():
   return render_template("admin/index.haml")
 
 
+@app.route("/admin/cache_stats")
+@login_required
+def admin_cache_stats():
+  """Hit ratios of the caches used by this instance"""
+  if not permissions.is_allowed_read("/admin", None, 1):
+    raise Forbidden()
+  stats = {}
+  if settings.MEMCACHE_MECHANISM:
+    from ggrc.cache import get_local_cache
+    from ggrc.rbac import permission_cache
+    from ggrc.services.common import _get_cache_manager
+    memcache_client = _get_cache_manager().cache_object.memcache_client
+    stats["local"] = get_local_cache().get_stats()
+    stats["permissions"] = permission_cache.get_stats(memcache_client)
+  return app.make_response((as_json(stats), 200,
+                            [("Content-Type", "application/json")]))
+
+
 @app.route("/assessments_view")
 @login_required
 def assessments_view():
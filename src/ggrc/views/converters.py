@@ -13,21 +13,34 @@ from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
+from flask import url_for
 from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import Forbidden
+from werkzeug.exceptions import NotFound
 
 from ggrc.app import app
 from ggrc.converters.base import Converter
-from ggrc.converters.import_helper import generate_csv_string
+from ggrc.converters.import_helper import generate_csv_lines
 from ggrc.converters.import_helper import read_csv_file
 from ggrc.converters.query_helper import BadQueryException
 from ggrc.converters.query_helper import QueryHelper
+from ggrc.login import get_current_user_id
 from ggrc.login import login_required
+from ggrc.models.background_task import BackgroundTask
+from ggrc.models.background_task import create_task
+from ggrc.models.background_task import queued_task
 from ggrc.utils import benchmark
 
 
 # pylint: disable=invalid-name
 logger = getLogger(__name__)
 
+# Requests with this header are handled by a background task.
+BACKGROUND_TASK_HEADER = "X-GGRC-BackgroundTask"
+
+JSON_HEADERS = [("Content-Type", "application/json")]
+
 
 def check_required_headers(required_headers):
   errors = []
@@ -52,26 +65,44 @@ def parse_export_request():
   return request.json
 
 
+def get_export_filename(converter):
+  object_names = "_".join(converter.get_object_names())
+  return "{}.csv".format(object_names)
+
+
+def get_export_headers(filename):
+  return [
+      ("Content-Type", "text/csv"),
+      ("Content-Disposition", "attachment; filename='{}'".format(filename)),
+  ]
+
+
 def handle_export_request():
+  """Export objects as a streamed csv file.
+
+  The csv file is generated block by block while the response is being sent,
+  so the whole file is never held in memory.
+  """
   try:
     with benchmark("handle export request"):
       data = parse_export_request()
+      if BACKGROUND_TASK_HEADER in request.headers:
+        task = create_task("export_csv", url_for("export_csv_task"),
+                           run_export_task, parameters=data)
+        return make_task_status_response(task)
       query_helper = QueryHelper(data)
       ids_by_type = query_helper.get_ids()
-    with benchmark("Generate CSV array"):
+    with benchmark("Create block converters"):
       converter = Converter(ids_by_type=ids_by_type)
-      csv_data = converter.to_array()
-    with benchmark("Generate CSV string"):
-      csv_string = generate_csv_string(csv_data)
+      converter.block_converters_from_ids()
     with benchmark("Make response."):
-      object_names = "_".join(converter.get_object_names())
-      filename = "{}.csv".format(object_names)
-      headers = [
-          ("Content-Type", "text/csv"),
-          ("Content-Disposition",
-           "attachment; filename='{}'".format(filename)),
-      ]
-      return current_app.make_response((csv_string, 200, headers))
+      headers = get_export_headers(get_export_filename(converter))
+      csv_lines = generate_csv_lines(converter.generate_csv_rows())
+      return current_app.response_class(
+          stream_with_context(_log_stream_errors(csv_lines)),
+          200,
+          headers,
+      )
   except BadQueryException as exception:
     raise BadRequest(exception.message)
   except:  # pylint: disable=bare-except
@@ -79,6 +110,16 @@ def handle_export_request():
   raise BadRequest("Export failed due to server error.")
 
 
+def _log_stream_errors(lines):
+  """Log errors that happen after the response headers have been sent."""
+  try:
+    for line in lines:
+      yield line
+  except:  # pylint: disable=bare-except
+    logger.exception("Export failed")
+    raise
+
+
 def check_import_file():
   if "file" not in request.files or not request.files["file"]:
     raise BadRequest("Missing csv file")
@@ -88,7 +129,7 @@ def check_import_file():
   return csv_file
 
 
-def parse_import_request():
+def check_import_request():
   """ Check if request contains all required fields """
   required_headers = {
       "X-Requested-By": ["GGRC"],
@@ -96,25 +137,111 @@ def parse_import_request():
   }
   check_required_headers(required_headers)
   csv_file = check_import_file()
-  csv_data = read_csv_file(csv_file)
   dry_run = request.headers["X-test-only"] == "true"
-  return dry_run, csv_data
+  return dry_run, csv_file
+
+
+def parse_import_request():
+  dry_run, csv_file = check_import_request()
+  return dry_run, read_csv_file(csv_file)
+
+
+def make_import_response(converter):
+  response_json = json.dumps(converter.get_info())
+  return current_app.make_response((response_json, 200, JSON_HEADERS))
 
 
 def handle_import_request():
+  """Import a csv file or start a background task that imports it."""
   try:
+    if BACKGROUND_TASK_HEADER in request.headers:
+      dry_run, csv_file = check_import_request()
+      task = create_task("import_csv", url_for("import_csv_task"),
+                         run_import_task, parameters={"dry_run": dry_run},
+                         data={"input": csv_file})
+      return make_task_status_response(task)
     dry_run, csv_data = parse_import_request()
     converter = Converter(dry_run=dry_run, csv_data=csv_data)
     converter.import_csv()
-    response_data = converter.get_info()
-    response_json = json.dumps(response_data)
-    headers = [("Content-Type", "application/json")]
-    return current_app.make_response((response_json, 200, headers))
+    return make_import_response(converter)
   except:  # pylint: disable=bare-except
     logger.exception("Import failed")
   raise BadRequest("Import failed due to server error.")
 
 
+@queued_task
+def run_import_task(task):
+  """Import the csv file stored with an import background task."""
+  csv_data = read_csv_file(task.iter_data_lines("input"))
+  converter = Converter(dry_run=task.parameters["dry_run"],
+                        csv_data=csv_data,
+                        progress_callback=task.update_progress)
+  converter.import_csv()
+  return make_import_response(converter)
+
+
+@queued_task
+def run_export_task(task):
+  """Export objects into a csv file stored with an export background task."""
+  query_helper = QueryHelper(task.parameters)
+  ids_by_type = query_helper.get_ids()
+  converter = Converter(ids_by_type=ids_by_type,
+                        progress_callback=task.update_progress)
+  converter.block_converters_from_ids()
+  task.write_data("output", generate_csv_lines(converter.generate_csv_rows()))
+  response_json = json.dumps({"filename": get_export_filename(converter)})
+  return current_app.make_response((response_json, 200, JSON_HEADERS))
+
+
+def get_user_task(task_id):
+  """Get a background task started by the current user."""
+  task = BackgroundTask.query.get(task_id)
+  if task is None:
+    raise NotFound()
+  if task.modified_by_id != get_current_user_id():
+    raise Forbidden()
+  return task
+
+
+def make_task_status_response(task):
+  """Make a JSON response with the status and progress of a task.
+
+  Unfinished tasks are reported with the 202 status code.
+  """
+  progress = None
+  if task.status == "Running" and task.result:
+    progress = json.loads(task.result["content"])
+  response_json = json.dumps({
+      "id": task.id,
+      "name": task.name,
+      "status": task.status,
+      "progress": progress,
+  })
+  status_code = 202 if task.status in ("Pending", "Running") else 200
+  return current_app.make_response((response_json, status_code, JSON_HEADERS))
+
+
+def handle_import_task_request(task_id):
+  """Get the import result of a finished import task or its status."""
+  task = get_user_task(task_id)
+  if task.status == "Success":
+    return task.make_response()
+  return make_task_status_response(task)
+
+
+def handle_export_task_request(task_id):
+  """Download the csv file of a finished export task or get its status."""
+  task = get_user_task(task_id)
+  if task.status != "Success":
+    return make_task_status_response(task)
+  filename = json.loads(task.result["content"])["filename"]
+  return current_app.response_class(
+      stream_with_context(task.iter_data("output")),
+      200,
+      get_export_headers(filename),
+  )
+
+
 def init_converter_views():
   """Initialize views for import and export."""
 
@@ -132,6 +259,25 @@ def init_converter_views():
     with benchmark("handle import request"):
       return handle_import_request()
 
+  @app.route("/_service/export_csv/<int:task_id>", methods=["GET"])
+  @login_required
+  def handle_export_csv_task(task_id):
+    return handle_export_task_request(task_id)
+
+  @app.route("/_service/import_csv/<int:task_id>", methods=["GET"])
+  @login_required
+  def handle_import_csv_task(task_id):
+    return handle_import_task_request(task_id)
+
+  # Needs to be secured as we are removing @login_required
+  @app.route("/_background_tasks/export_csv", methods=["POST"])
+  def export_csv_task():
+    return run_export_task()
+
+  @app.route("/_background_tasks/import_csv", methods=["POST"])
+  def import_csv_task():
+    return run_import_task()
+
   @app.route("/import")
   @login_required
   def import_view():
@@ -3,10 +3,17 @@
 
 """Views for email notifications."""
 
+from ggrc.models.background_task import queued_task
 from ggrc.notifications import common
 from ggrc.login import login_required
 
 
+@queued_task
+def send_daily_digest_shard_task(task):
+  """Send daily digest emails of the shard set in task parameters."""
+  return common.send_daily_digest_shard(**task.parameters)
+
+
 def init_notification_views(app):
   """Add url rules for all notification views.
 
@@ -17,6 +24,11 @@ def init_notification_views(app):
       "/_notifications/send_daily_digest", "send_daily_digest_notifications",
       view_func=common.send_daily_digest_notifications)
 
+  app.add_url_rule(
+      "/_background_tasks/send_daily_digest_shard",
+      send_daily_digest_shard_task.__name__,
+      view_func=send_daily_digest_shard_task, methods=["GET", "POST"])
+
   app.add_url_rule(
       "/_notifications/show_pending", "show_pending_notifications",
       view_func=login_required(common.show_pending_notifications))
@@ -23,6 +23,7 @@ from ggrc.models import all_models
 from ggrc.models.audit import Audit
 from ggrc.models.program import Program
 from ggrc.models.object_owner import ObjectOwner
+from ggrc.rbac import permission_cache
 from ggrc.rbac import permissions as rbac_permissions
 from ggrc.rbac.permissions_provider import DefaultUserPermissions
 from ggrc.services.common import _get_cache_manager
@@ -48,7 +49,7 @@ blueprint = Blueprint(
     static_url_path='/static/ggrc_basic_permissions',
 )
 
-PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+PERMISSION_CACHE_TIMEOUT = permission_cache.CACHE_TIMEOUT
 
 
 def get_public_config(_):
@@ -351,35 +352,32 @@ def collect_permissions(src_permissions, context_id, permissions):
             })
 
 
-def query_memcache(key):
+def query_memcache(user_id):
   """Check if cached permissions are available
 
   Args:
-      key (string): key of the stored permissions
+      user_id (int): id of the user whose permissions are stored
   Returns:
       cache (memcache_client): memcache client or None if caching
                                is not available
       permissions_cache (dict): dict with all permissions or None if there
                                 was a cache miss
+      generations (tuple): permission cache generations before the
+                           permissions are loaded from the database
   """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
-    return None, None
+    return None, None, None
 
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key not in cached_keys_set:
-    # We set the permissions:list variable so that we are able to batch
-    # remove all permissions related keys from memcache
-    cached_keys_set.add(key)
-    cache.set('permissions:list', cached_keys_set, PERMISSION_CACHE_TIMEOUT)
-    return cache, None
-
-  permissions_cache = cache.get(key)
+  permissions_cache, generations = permission_cache.get_cached_permissions(
+      cache, user_id)
   if permissions_cache:
-    # If the key is both in permissions:list and in memcache itself
-    # it is safe to return the cached permissions
-    return cache, permissions_cache
-  return cache, None
+    # Cached permissions are only returned while the generations they were
+    # stored with are unchanged
+    permission_cache.record(cache, "hits")
+    return cache, permissions_cache, generations
+  permission_cache.record(cache, "misses")
+  return cache, None, generations
 
 
 def load_default_permissions(permissions):
@@ -738,26 +736,78 @@ def load_backlog_workflows(permissions):
             .append(wf_context_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+def load_permission_dependencies(user, permissions,
+                                 source_contexts_to_rolenames):
+  """Load inputs that the permissions of a user were derived from
+
+  Args:
+      user (Person): Person object
+      permissions (dict): dict with loaded permissions of the user
+      source_contexts_to_rolenames (dict): Role names for contexts
+  Returns:
+      dependencies (set): permission cache dependencies of the user
+  """
+  dependencies = {
+      permission_cache.person_dependency(user.id),
+      permission_cache.object_dependency("Person", user.id),
+  }
+  dependencies.update(permission_cache.context_dependency(context_id)
+                      for context_id in source_contexts_to_rolenames)
+
+  program_contexts = set()
+  for action in ("read", "update"):
+    program_contexts.update(
+        permissions.get(action, {}).get("Program", {}).get("contexts", []))
+  program_contexts.discard(None)
+  if program_contexts:
+    context_objects = db.session.query(
+        all_models.Context.related_object_type,
+        all_models.Context.related_object_id,
+    ).filter(all_models.Context.id.in_(program_contexts))
+    dependencies.update(permission_cache.object_dependency(type_, id_)
+                        for type_, id_ in context_objects
+                        if type_ is not None)
+
+  rel = all_models.Relationship
+  attrs = all_models.RelationshipAttr
+  is_destination = rel.destination_type == "Person"
+  assigned_objects = db.session.query(
+      case([(is_destination, rel.source_type)], else_=rel.destination_type),
+      case([(is_destination, rel.source_id)], else_=rel.destination_id),
+  ).join(attrs, and_(
+      attrs.relationship_id == rel.id,
+      attrs.attr_name == "AssigneeType",
+  )).filter(
+      case([(is_destination, rel.destination_id)],
+           else_=rel.source_id) == user.id,
+  )
+  dependencies.update(permission_cache.object_dependency(type_, id_)
+                      for type_, id_ in assigned_objects)
+  return dependencies
+
+
+def store_results_into_memcache(permissions, cache, user_id, generations,
+                                dependencies):
+  """Store loaded permissions of a user into memcache
 
   Args:
       permissions (dict): dict where the permissions will be stored
       cache (cache_manager): Cache manager that should be used for storing
                              permissions
-      key (string): key of under which permissions should be stored
+      user_id (int): id of the user whose permissions should be stored
+      generations (tuple): permission cache generations before the
+                           permissions were loaded
+      dependencies (set): inputs that the permissions were derived from
   Returns:
       None
   """
   if cache is None:
     return
 
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key in cached_keys_set:
-    # We only add the permissions to the cache if the
-    # key still exists in the permissions:list after
-    # the query has executed.
-    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
+  # We only add the permissions to the cache if no permission inputs of the
+  # user were modified while the permissions were loaded.
+  permission_cache.store(cache, user_id, permissions, dependencies,
+                         generations)
 
 
 def load_permissions_for(user):
@@ -779,10 +829,9 @@ def load_permissions_for(user):
   'terms' are the arguments to the 'condition'.
   """
   permissions = {}
-  key = 'permissions:{}'.format(user.id)
 
   with benchmark("load_permissions > query memcache"):
-    cache, result = query_memcache(key)
+    cache, result, generations = query_memcache(user.id)
     if result:
       return result
 
@@ -821,8 +870,14 @@ def load_permissions_for(user):
   with benchmark("load_permissions > load backlog workflows"):
     load_backlog_workflows(permissions)
 
-  with benchmark("load_permissions > store results into memcache"):
-    store_results_into_memcache(permissions, cache, key)
+  if cache is not None:
+    with benchmark("load_permissions > load permission dependencies"):
+      dependencies = load_permission_dependencies(
+          user, permissions, source_contexts_to_rolenames)
+
+    with benchmark("load_permissions > store results into memcache"):
+      store_results_into_memcache(permissions, cache, user.id, generations,
+                                  dependencies)
 
   return permissions
 
@@ -2,6 +2,9 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 from datetime import datetime, date
+from logging import getLogger
+from traceback import format_exc
+
 from flask import Blueprint
 from sqlalchemy import inspect, and_, orm
 
@@ -11,8 +14,10 @@ from ggrc.models import all_models
 from ggrc.models.relationship import Relationship
 from ggrc.rbac.permissions import is_allowed_update
 from ggrc.services import signals
+from ggrc.services.common import get_cache
 from ggrc.services.common import log_event
 from ggrc.services.registry import service
+from ggrc.utils import list_chunks
 from ggrc_workflows import models, notification
 from ggrc_workflows.models import relationship_helper
 from ggrc_workflows.models import WORKFLOW_OBJECT_TYPES
@@ -29,6 +34,9 @@ from ggrc_basic_permissions.contributed_roles import (
 )
 
 
+# pylint: disable=invalid-name
+logger = getLogger(__name__)
+
 # Initialize Flask Blueprint for extension
 blueprint = Blueprint(
     'ggrc_workflows',
@@ -202,8 +210,28 @@ def handle_cycle_post(sender, obj=None, src=None, service=None):  # noqa pylint:
     db.session.add(workflow)
 
 
+def _get_task_date_ranges(calculator, task_group_tasks, base_date):
+  """Get start and end dates of all tasks in a task group.
+
+  Tasks with the same relative or fixed dates share a single calculation.
+
+  Returns:
+    dict: (start_date, end_date) tuples by task id.
+  """
+  date_ranges = {}
+  computed = {}
+  for task in task_group_tasks:
+    key = (task.relative_start_month, task.relative_start_day,
+           task.relative_end_month, task.relative_end_day,
+           task.start_date, task.end_date)
+    if key not in computed:
+      computed[key] = calculator.task_date_range(task, base_date=base_date)
+    date_ranges[task.id] = computed[key]
+  return date_ranges
+
+
 def _create_cycle_task(task_group_task, cycle, cycle_task_group,
-                       current_user, base_date=None):
+                       current_user, base_date=None, date_range=None):
   """Create a cycle task along with relations to other objects"""
   # TaskGroupTasks for one_time workflows don't save relative start/end
   # month/day. They only saves start and end dates.
@@ -215,8 +243,9 @@ def _create_cycle_task(task_group_task, cycle, cycle_task_group,
   description = models.CycleTaskGroupObjectTask.default_description if \
       task_group_task.object_approval else task_group_task.description
 
-  date_range = cycle.calculator.task_date_range(
-      task_group_task, base_date=base_date)
+  if date_range is None:
+    date_range = cycle.calculator.task_date_range(
+        task_group_task, base_date=base_date)
   start_date, end_date = date_range
 
   cycle_task_group_object_task = models.CycleTaskGroupObjectTask(
@@ -238,29 +267,78 @@ def _create_cycle_task(task_group_task, cycle, cycle_task_group,
   return cycle_task_group_object_task
 
 
+def _insert_task_relationships(task_objects, current_user):
+  """Insert relationships between cycle tasks and objects in bulk.
+
+  Relationships are inserted with a single statement per chunk instead of
+  flushing one ORM object for each of them. The inserted relationships are
+  then loaded with one query and registered as new objects of the request,
+  so that their revisions are logged with the rest of the cycle.
+
+  Args:
+    task_objects: list of (cycle task, object) tuples. Cycle tasks must
+        already be flushed.
+    current_user: Person that is creating the cycle.
+  """
+  if not task_objects:
+    return
+  modified_by_id = current_user.id if current_user else None
+  rows = [{
+      "source_id": task.id,
+      "source_type": task.type,
+      "destination_id": object_.id,
+      "destination_type": object_.type,
+      "modified_by_id": modified_by_id,
+      "context_id": None,
+  } for task, object_ in task_objects]
+  for chunk in list_chunks(rows):
+    db.session.execute(Relationship.__table__.insert(), chunk)
+
+  cache = get_cache(create=True)
+  if not cache:
+    return
+  task_ids = list({task.id for task, _ in task_objects})
+  for ids in list_chunks(task_ids):
+    relationships = Relationship.query.filter(
+        Relationship.source_type == models.CycleTaskGroupObjectTask.__name__,
+        Relationship.source_id.in_(ids),
+    )
+    for relationship in relationships:
+      cache.new[relationship] = relationship.log_json()
+
+
 def create_old_style_cycle(cycle, task_group, cycle_task_group, current_user,
-                           base_date):
+                           base_date, date_ranges=None):
   """ This function preserves the old style of creating cycles, so each object
   gets its own task assigned to it.
+
+  Returns:
+    list of (cycle task, object) tuples that should be related.
   """
+  date_ranges = date_ranges or {}
+  task_objects = []
   if len(task_group.task_group_objects) == 0:
     for task_group_task in task_group.task_group_tasks:
-      cycle_task_group_object_task = _create_cycle_task(
+      _create_cycle_task(
           task_group_task, cycle, cycle_task_group,
-          current_user, base_date)
+          current_user, base_date, date_ranges.get(task_group_task.id))
 
   for task_group_object in task_group.task_group_objects:
     object_ = task_group_object.object
     for task_group_task in task_group.task_group_tasks:
       cycle_task_group_object_task = _create_cycle_task(
           task_group_task, cycle, cycle_task_group,
-          current_user, base_date)
-      db.session.add(Relationship(source=cycle_task_group_object_task,
-                                  destination=object_))
+          current_user, base_date, date_ranges.get(task_group_task.id))
+      task_objects.append((cycle_task_group_object_task, object_))
+  return task_objects
 
 
 def build_cycle(cycle, current_user=None, base_date=None):
-  """Build a cycle with it's child objects"""
+  """Build a cycle with it's child objects
+
+  Task dates are computed once per task group and relationships between the
+  cycle tasks and objects are inserted in bulk.
+  """
 
   if not base_date:
     base_date = date.today()
@@ -281,6 +359,7 @@ def build_cycle(cycle, current_user=None, base_date=None):
   cycle.description = workflow.description
   cycle.status = 'Assigned'
 
+  task_objects = []
   # Populate CycleTaskGroups based on Workflow's TaskGroups
   for task_group in workflow.task_groups:
     cycle_task_group = models.CycleTaskGroup(
@@ -295,21 +374,28 @@ def build_cycle(cycle, current_user=None, base_date=None):
         status="Assigned",
         sort_index=task_group.sort_index,
     )
+    date_ranges = _get_task_date_ranges(
+        cycle.calculator, task_group.task_group_tasks, base_date)
 
     # preserve the old cycle creation for old workflows, so each object
     # gets its own cycle task
     if workflow.is_old_workflow:
-      create_old_style_cycle(cycle, task_group, cycle_task_group, current_user,
-                             base_date)
+      task_objects.extend(create_old_style_cycle(
+          cycle, task_group, cycle_task_group, current_user, base_date,
+          date_ranges))
     else:
+      objects = [task_group_object.object
+                 for task_group_object in task_group.task_group_objects]
       for task_group_task in task_group.task_group_tasks:
         cycle_task_group_object_task = _create_cycle_task(
-            task_group_task, cycle, cycle_task_group, current_user, base_date)
+            task_group_task, cycle, cycle_task_group, current_user,
+            base_date, date_ranges[task_group_task.id])
+        task_objects.extend((cycle_task_group_object_task, object_)
+                            for object_ in objects)
 
-        for task_group_object in task_group.task_group_objects:
-          object_ = task_group_object.object
-          db.session.add(Relationship(source=cycle_task_group_object_task,
-                                      destination=object_))
+  if task_objects:
+    db.session.flush()
+    _insert_task_relationships(task_objects, current_user)
 
   update_cycle_dates(cycle)
 
@@ -835,47 +921,70 @@ def init_extra_views(app):
 
 
 def start_recurring_cycles():
+  """Start new cycles of all workflows that should start a cycle today.
+
+  Every workflow is committed separately, so that a failure to start a cycle
+  of one workflow does not roll back cycles of the others. Failures are
+  raised after all workflows were handled, so that the cron job reports them.
+  """
   # Get all workflows that should start a new cycle today
   # The next_cycle_start_date is precomputed and stored when a cycle is created
   today = date.today()
-  workflows = db.session.query(models.Workflow)\
-      .filter(
+  workflow_ids = [workflow_id for workflow_id, in db.session.query(
+      models.Workflow.id
+  ).filter(
       models.Workflow.next_cycle_start_date == today,
       models.Workflow.recurrences == True  # noqa
-  ).all()
+  )]
 
   # For each workflow, start and save a new cycle.
-  for workflow in workflows:
-    cycle = models.Cycle()
-    cycle.workflow = workflow
-    cycle.calculator = workflow_cycle_calculator.get_cycle_calculator(workflow)
-    cycle.context = workflow.context
-    # We can do this because we selected only workflows with
-    # next_cycle_start_date = today
-    cycle.start_date = date.today()
-
-    # Flag the cycle to be saved
-    db.session.add(cycle)
+  failures = []
+  for workflow_id in workflow_ids:
+    try:
+      _start_recurring_cycle(models.Workflow.query.get(workflow_id))
+      log_event(db.session)
+      db.session.commit()
+    except Exception:  # pylint: disable=broad-except
+      db.session.rollback()
+      logger.exception("Failed to start a cycle of workflow %s", workflow_id)
+      failures.append((workflow_id, format_exc()))
+
+  if failures:
+    raise RuntimeError("Failed to start cycles of workflows {}:\n{}".format(
+        ", ".join(str(workflow_id) for workflow_id, _ in failures),
+        "\n".join(error for _, error in failures),
+    ))
+
+
+def _start_recurring_cycle(workflow):
+  """Start and save a new cycle of a workflow."""
+  cycle = models.Cycle()
+  cycle.workflow = workflow
+  cycle.calculator = workflow_cycle_calculator.get_cycle_calculator(workflow)
+  cycle.context = workflow.context
+  # We can do this because we selected only workflows with
+  # next_cycle_start_date = today
+  cycle.start_date = date.today()
 
-    if workflow.non_adjusted_next_cycle_start_date:
-      base_date = workflow.non_adjusted_next_cycle_start_date
-    else:
-      base_date = date.today()
+  # Flag the cycle to be saved
+  db.session.add(cycle)
 
-    # Create the cycle (including all child objects)
-    build_cycle(cycle, base_date=base_date)
+  if workflow.non_adjusted_next_cycle_start_date:
+    base_date = workflow.non_adjusted_next_cycle_start_date
+  else:
+    base_date = date.today()
 
-    # Update the workflow next_cycle_start_date to push it ahead based on the
-    # frequency.
-    adjust_next_cycle_start_date(cycle.calculator, workflow, move_forward=True)
+  # Create the cycle (including all child objects)
+  build_cycle(cycle, base_date=base_date)
 
-    db.session.add(workflow)
+  # Update the workflow next_cycle_start_date to push it ahead based on the
+  # frequency.
+  adjust_next_cycle_start_date(cycle.calculator, workflow, move_forward=True)
 
-    notification.handle_workflow_modify(None, workflow)
-    notification.handle_cycle_created(None, obj=cycle)
+  db.session.add(workflow)
 
-  log_event(db.session)
-  db.session.commit()
+  notification.handle_workflow_modify(None, workflow)
+  notification.handle_cycle_created(None, obj=cycle)
 
 
 def get_cycles(workflow):
@@ -1026,6 +1135,7 @@ ROLE_DECLARATIONS = WorkflowRoleDeclarations()
 ROLE_IMPLICATIONS = WorkflowRoleImplications()
 
 contributed_notifications = notification.contributed_notifications
+contributed_batch_notifications = notification.contributed_batch_notifications
 contributed_importables = IMPORTABLE
 contributed_exportables = EXPORTABLE
 contributed_column_handlers = COLUMN_HANDLERS
@@ -12,6 +12,7 @@ from ggrc_workflows.notification.data_handler import (
     get_cycle_data,
     get_workflow_data,
     get_cycle_task_data,
+    get_cycle_task_data_batch,
 )
 from ggrc_workflows.notification.notification_handler import (
     handle_workflow_modify,
@@ -38,6 +39,14 @@ def contributed_notifications():
   }
 
 
+def contributed_batch_notifications():
+  """ return handler functions for lists of notifications of one object type
+  """
+  return {
+      'CycleTaskGroupObjectTask': get_cycle_task_data_batch,
+  }
+
+
 def register_listeners():
 
   @signals.Restful.model_put.connect_via(Workflow)
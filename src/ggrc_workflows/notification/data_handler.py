@@ -367,6 +367,30 @@ def get_cycle_task_data(notification, tasks_cache=None, del_rels_cache=None):
   return {}
 
 
+def get_cycle_task_data_batch(notifications, tasks_cache=None,
+                              del_rels_cache=None):
+  """Return data for a list of cycle task notifications.
+
+  Args:
+    notifications: a list of Notification instances for cycle tasks
+    tasks_cache: prefetched CycleTaskGroupObjectTask instances accessible by
+      their ID as a key, fetched for the given notifications if missing
+    del_rels_cache: prefetched Revision instances of deleted relationships
+      grouped by task ID, fetched for the given notifications if missing
+  Returns:
+    A list of dicts with data for each of the given notifications.
+  """
+  if tasks_cache is None:
+    tasks_cache = cycle_tasks_cache(notifications)
+  if del_rels_cache is None:
+    del_rels_cache = deleted_task_rels_cache(tasks_cache.keys())
+  return [
+      get_cycle_task_data(notification, tasks_cache=tasks_cache,
+                          del_rels_cache=del_rels_cache)
+      for notification in notifications
+  ]
+
+
 def get_workflow_starts_in_data(notification, workflow):
   if workflow.status != "Active":
     return {}
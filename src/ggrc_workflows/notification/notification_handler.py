@@ -73,7 +73,7 @@ def handle_workflow_modify(sender, obj=None, src=None, service=None):
       handle_task_group_task(task_group_task, notif_type)
 
 
-def add_cycle_task_due_notifications(task):
+def add_cycle_task_due_notifications(task, notif_types=None):
   """Add notifications entries for cycle task due dates.
 
   Create notification entries: one for X days before the due date, one on the
@@ -81,30 +81,36 @@ def add_cycle_task_due_notifications(task):
 
   Args:
     task: CycleTaskGroupObjectTask instance to generate the notifications for.
+    notif_types: optional dict of preloaded notification types by name.
   """
   if task.status == "Verified":
     return
   if not task.cycle_task_group.cycle.is_current:
     return
 
-  notif_type = get_notification_type("{}_cycle_task_due_in".format(
-      task.cycle_task_group.cycle.workflow.frequency))
+  due_in_name = "{}_cycle_task_due_in".format(
+      task.cycle_task_group.cycle.workflow.frequency)
+  if notif_types is None:
+    notif_types = get_notification_types([
+        due_in_name, "cycle_task_due_today", "cycle_task_overdue"])
+
+  notif_type = notif_types[due_in_name]
   send_on = task.end_date - timedelta(notif_type.advance_notice)
   add_notif(task, notif_type, send_on)
 
-  notif_type = get_notification_type("cycle_task_due_today")
+  notif_type = notif_types["cycle_task_due_today"]
   send_on = task.end_date - timedelta(notif_type.advance_notice)
   add_notif(task, notif_type, send_on)
 
-  notif_type = get_notification_type("cycle_task_overdue")
+  notif_type = notif_types["cycle_task_overdue"]
   send_on = task.end_date + timedelta(1)
   add_notif(task, notif_type, send_on, repeating=True)
 
 
-def add_cycle_task_notifications(obj, start_notif_type=None):
+def add_cycle_task_notifications(obj, start_notif_type=None, notif_types=None):
   """Add start and due  notification entries for cycle tasks."""
   add_notif(obj, start_notif_type, date.today())
-  add_cycle_task_due_notifications(obj)
+  add_cycle_task_due_notifications(obj, notif_types)
 
 
 def add_cycle_task_reassigned_notification(obj):
@@ -294,9 +300,15 @@ def handle_cycle_created(sender, obj=None, src=None, service=None,
     )
     add_notif(obj, notification_type)
 
+  # notification types of all tasks are loaded at once
+  notif_types = get_notification_types([
+      "{}_cycle_task_due_in".format(obj.workflow.frequency),
+      "cycle_task_due_today",
+      "cycle_task_overdue",
+  ])
   for cycle_task_group in obj.cycle_task_groups:
     for task in cycle_task_group.cycle_task_group_tasks:
-      add_cycle_task_notifications(task, notification_type)
+      add_cycle_task_notifications(task, notification_type, notif_types)
 
 
 def get_notification(obj):
@@ -317,6 +329,12 @@ def get_notification_type(name):
       NotificationType.name == name).first()
 
 
+def get_notification_types(names):
+  """Get notification types with the given names by their name."""
+  return {notif_type.name: notif_type for notif_type in db.session.query(
+      NotificationType).filter(NotificationType.name.in_(names))}
+
+
 def add_notif(obj, notif_type, send_on=None, repeating=False):
   if not send_on:
     send_on = date.today()
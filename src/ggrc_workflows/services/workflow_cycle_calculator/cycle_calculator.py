@@ -8,6 +8,7 @@ import abc
 import datetime
 
 from ggrc_workflows.services.workflow_cycle_calculator import google_holidays
+from ggrc_workflows.services.workflow_cycle_calculator import workday_calendar
 
 # pylint: disable=invalid-name
 
@@ -94,6 +95,15 @@ class CycleCalculator(object):
   def sort_tasks(self):
     self.tasks.sort(key=lambda t: self.get_relative_start(t))  # noqa #pylint: disable=unnecessary-lambda
 
+  @property
+  def calendar(self):
+    """Workday calendar shared by all calculators with the same holidays.
+
+    Holidays are only read when the calendar is first built, so holiday
+    lists must not be changed once they are used by a calculator.
+    """
+    return workday_calendar.get_calendar(self.holidays)
+
   def is_work_day(self, ddate):
     """Check whether specific ddate is workday or if it's a holiday/weekend.
 
@@ -102,38 +112,20 @@ class CycleCalculator(object):
     Returns:
       Boolean: True if it's workday otherwise false.
     """
-    return ddate.isoweekday() < 6 and ddate not in self.holidays
+    return self.calendar.is_work_day(ddate)
 
   def adjust_date(self, ddate):
     """Adjust date if it's not a work day.
 
-    Calculates the first workday by going backwards by either subtracting
-    appropriate number of days (if ddate is during weekend) or subtracting
-    by one day if it's a holiday. In case we still aren't on a workday we
-    repeat the process recursively until we find the first workday.
+    Finds the last workday on or before ddate in the precomputed workday
+    calendar instead of stepping back over weekends and holidays day by day.
 
     Args:
       date: datetime object
     Returns:
       datetime.date: First available workday.
     """
-    # Short path
-    if self.is_work_day(ddate):
-      return ddate
-
-    # Adjusting for weekends
-    weekday = ddate.isoweekday()
-    if weekday > 5:
-      ddate = ddate - datetime.timedelta(days=(weekday - 5))
-
-    # Adjusting for holidays
-    if ddate in self.holidays:
-      ddate = ddate - datetime.timedelta(days=1)
-
-    # In case we still don't have a workday, repeat
-    if not self.is_work_day(ddate):
-      return self.adjust_date(ddate)
-    return ddate
+    return self.calendar.previous_work_day(ddate)
 
   def get_base_date(self, base_date=None):
     """Base date from which we will calculate must be less than or equal to the
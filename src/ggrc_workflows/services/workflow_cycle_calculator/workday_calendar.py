@@ -0,0 +1,141 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Precomputed calendar of workdays used by cycle calculators.
+
+Workdays are kept as a sorted list of date ordinals, which is extended a
+whole year at a time when dates outside of the computed years are queried.
+Queries for the closest workday or for a workday a number of workdays away
+are bisect lookups in that list instead of stepping through the calendar day
+by day.
+
+Calendars are shared by all calculators in the process that use the same
+holidays object, see get_calendar.
+"""
+
+import bisect
+import datetime
+import threading
+
+
+class WorkdayCalendar(object):
+  """Workdays excluding weekends and the given holidays.
+
+  Attributes:
+    holidays: Object supporting the 'in' operation with dates of holidays.
+  """
+
+  def __init__(self, holidays):
+    self.holidays = holidays
+    self._workdays = []
+    self._years = set()
+    self._lock = threading.Lock()
+
+  def _year_workdays(self, year):
+    """Get ordinals of all workdays in a year."""
+    day = datetime.date(year, 1, 1)
+    last_day = datetime.date(year, 12, 31)
+    workdays = []
+    while day <= last_day:
+      if day.isoweekday() < 6 and day not in self.holidays:
+        workdays.append(day.toordinal())
+      day += datetime.timedelta(days=1)
+    return workdays
+
+  def _load_years(self, first_year, last_year):
+    """Make sure workdays of the given range of years are computed."""
+    years = set(range(first_year, last_year + 1)) - self._years
+    if not years:
+      return
+    with self._lock:
+      years -= self._years
+      workdays = list(self._workdays)
+      for year in sorted(years):
+        workdays.extend(self._year_workdays(year))
+      workdays.sort()
+      # readers without the lock always see a complete list
+      self._workdays = workdays
+      self._years.update(years)
+
+  @staticmethod
+  def _to_ordinal(ddate):
+    if isinstance(ddate, datetime.datetime):
+      ddate = ddate.date()
+    return ddate.toordinal()
+
+  @staticmethod
+  def _shift(ddate, ordinal):
+    """Move a date or datetime to the day with the given ordinal."""
+    return ddate + datetime.timedelta(
+        days=ordinal - WorkdayCalendar._to_ordinal(ddate))
+
+  def is_work_day(self, ddate):
+    """Check whether a date is a workday."""
+    self._load_years(ddate.year, ddate.year)
+    workdays = self._workdays
+    ordinal = self._to_ordinal(ddate)
+    index = bisect.bisect_left(workdays, ordinal)
+    return index < len(workdays) and workdays[index] == ordinal
+
+  def previous_work_day(self, ddate):
+    """Get the last workday on or before a date.
+
+    The result has the same type as ddate, so the time of datetimes is kept.
+    """
+    ordinal = self._to_ordinal(ddate)
+    first_year = ddate.year - 1
+    while True:
+      self._load_years(first_year, ddate.year)
+      workdays = self._workdays
+      index = bisect.bisect_right(workdays, ordinal) - 1
+      if index >= 0 and workdays[index] >= datetime.date(
+          first_year, 1, 1).toordinal():
+        return self._shift(ddate, workdays[index])
+      first_year -= 1
+
+  def next_work_day(self, ddate):
+    """Get the first workday on or after a date."""
+    ordinal = self._to_ordinal(ddate)
+    last_year = ddate.year + 1
+    while True:
+      self._load_years(ddate.year, last_year)
+      workdays = self._workdays
+      index = bisect.bisect_left(workdays, ordinal)
+      if index < len(workdays) and workdays[index] <= datetime.date(
+          last_year, 12, 31).toordinal():
+        return self._shift(ddate, workdays[index])
+      last_year += 1
+
+  def add_work_days(self, ddate, count):
+    """Get the workday that is count workdays after a date.
+
+    The count is taken from the last workday on or before ddate, negative
+    counts go backwards.
+    """
+    start = self.previous_work_day(ddate)
+    # a year has at least 200 workdays
+    years = abs(count) // 200 + 1
+    first_year = start.year - (years if count < 0 else 0)
+    last_year = start.year + (years if count > 0 else 0)
+    self._load_years(first_year, last_year)
+    workdays = self._workdays
+    index = bisect.bisect_left(workdays, self._to_ordinal(start)) + count
+    return self._shift(ddate, workdays[index])
+
+
+_calendars = {}  # pylint: disable=invalid-name
+_calendars_lock = threading.Lock()  # pylint: disable=invalid-name
+
+
+def get_calendar(holidays):
+  """Get the calendar shared by all users of a holidays object.
+
+  Calendars keep a reference to their holidays, so the id of a holidays
+  object with a calendar is never reused by another object.
+  """
+  calendar = _calendars.get(id(holidays))
+  if calendar is None:
+    with _calendars_lock:
+      calendar = _calendars.setdefault(id(holidays),
+                                       WorkdayCalendar(holidays))
+  return calendar
@@ -177,6 +177,39 @@ class TestAutomappings(TestCase):
           implied=[],
       )
 
+  def test_collection_post(self):
+    """Test automappings of relationships posted in a single request."""
+    program = self.create_object(models.Program, {
+        'title': make_name('Program')
+    })
+    regulation = self.create_object(models.Regulation, {
+        'title': make_name('Test PD Regulation')
+    })
+    objective = self.create_object(models.Objective, {
+        'title': make_name('Objective')
+    })
+    control = self.create_object(models.Control, {
+        'title': make_name('Control')
+    })
+    response = self.api.post(models.Relationship, [{
+        'relationship': {
+            'source': {'id': src.id, 'type': src.type},
+            'destination': {'id': dst.id, 'type': dst.type},
+            'context': None,
+        },
+    } for src, dst in [(regulation, objective),
+                       (objective, program),
+                       (program, regulation),
+                       (regulation, control)]])
+    self.assert200(response)
+    for src, dst in [(program, objective),
+                     (program, regulation),
+                     (regulation, objective),
+                     (regulation, control),
+                     (program, control)]:
+      self.assert_mapping(src, dst)
+    self.assert_mapping(objective, control, missing=True)
+
   def test_mapping_to_objective(self):
     regulation = self.create_object(models.Regulation, {
         'title': make_name('Test PD Regulation')
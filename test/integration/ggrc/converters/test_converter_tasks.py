@@ -0,0 +1,89 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for imports and exports done by background tasks."""
+
+import json
+import os
+
+from ggrc import db
+from ggrc import models
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestConverterTasks(TestCase):
+  """Test import and export background tasks."""
+
+  def setUp(self):
+    super(TestConverterTasks, self).setUp()
+    self.client.get("/login")
+
+  def start_import_task(self, filename, dry_run=False):
+    """Start an import task for a file from the test csv directory."""
+    data = {"file": (open(os.path.join(self.CSV_DIR, filename)), filename)}
+    headers = {
+        "X-test-only": "true" if dry_run else "false",
+        "X-requested-by": "GGRC",
+        "X-GGRC-BackgroundTask": "true",
+    }
+    response = self.client.post("/_service/import_csv", data=data,
+                                headers=headers)
+    self.assert200(response)
+    return json.loads(response.data)
+
+  def test_import_task(self):
+    """Test import result of a finished import task."""
+    task = self.start_import_task("policy_basic_import.csv")
+    self.assertEqual(task["status"], "Success")
+
+    response = self.client.get("/_service/import_csv/{}".format(task["id"]))
+    self.assert200(response)
+    info = json.loads(response.data)
+    self.assertEqual(info[0]["name"], "Policy")
+    self.assertEqual(info[0]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 3)
+
+  def test_dry_run_import_task(self):
+    """Test that dry run import tasks do not save any objects."""
+    task = self.start_import_task("policy_basic_import.csv", dry_run=True)
+    self.assertEqual(task["status"], "Success")
+
+    response = self.client.get("/_service/import_csv/{}".format(task["id"]))
+    self.assertEqual(json.loads(response.data)[0]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 0)
+
+  def test_export_task(self):
+    """Test downloading the csv file of a finished export task."""
+    with factories.single_commit():
+      slugs = [factories.PolicyFactory().slug for _ in range(3)]
+    data = [{"object_name": "Policy", "fields": "all",
+             "filters": {"expression": {}}}]
+    headers = dict(self._custom_headers)
+    headers.update({
+        "Content-Type": "application/json",
+        "X-Requested-By": "GGRC",
+        "X-export-view": "blocks",
+        "X-GGRC-BackgroundTask": "true",
+    })
+    response = self.client.post("/_service/export_csv",
+                                data=json.dumps(data), headers=headers)
+    self.assert200(response)
+    task = json.loads(response.data)
+    self.assertEqual(task["status"], "Success")
+
+    response = self.client.get("/_service/export_csv/{}".format(task["id"]))
+    self.assert200(response)
+    self.assertIn("attachment", response.headers["Content-Disposition"])
+    for slug in slugs:
+      self.assertIn(slug, response.data)
+
+  def test_task_of_other_user(self):
+    """Test that tasks of other users can not be read."""
+    task = self.start_import_task("policy_basic_import.csv", dry_run=True)
+    person = factories.PersonFactory()
+    models.BackgroundTask.query.get(task["id"]).modified_by_id = person.id
+    db.session.commit()
+
+    response = self.client.get("/_service/import_csv/{}".format(task["id"]))
+    self.assert403(response)
@@ -0,0 +1,83 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for csv imports done in windows of rows."""
+
+import mock
+from sqlalchemy import and_
+from sqlalchemy import or_
+
+from ggrc import models
+from ggrc import settings
+from ggrc.converters import errors
+from integration.ggrc import TestCase
+
+
+@mock.patch.object(settings, "IMPORT_CHUNK_SIZE", 2)
+class TestChunkedImport(TestCase):
+  """Test chunked csv imports."""
+
+  def setUp(self):
+    super(TestChunkedImport, self).setUp()
+    self.client.get("/login")
+
+  @staticmethod
+  def get_relationships_for(obj):
+    return models.Relationship.query.filter(or_(
+        and_(models.Relationship.source_id == obj.id,
+             models.Relationship.source_type == obj.type),
+        and_(models.Relationship.destination_id == obj.id,
+             models.Relationship.destination_type == obj.type),
+    ))
+
+  def test_mappings_to_later_blocks(self):
+    """Test mappings to objects created by later windows and blocks."""
+    filename = "multi_basic_policy_orggroup_product_with_mappings.csv"
+    response_json = self.import_file(filename)
+
+    object_counts = {
+        "Policy": (4, 0, 0),
+        "Org Group": (4, 0, 0),
+        "Product": (5, 0, 0),
+    }
+    for block in response_json:
+      created, updated, ignored = object_counts[block["name"]]
+      self.assertEqual(created, block["created"])
+      self.assertEqual(updated, block["updated"])
+      self.assertEqual(ignored, block["ignored"])
+      self.assertEqual(set(), set(block["row_warnings"]))
+
+    self.assertEqual(models.Policy.query.count(), 4)
+    self.assertEqual(models.OrgGroup.query.count(), 4)
+    self.assertEqual(models.Product.query.count(), 5)
+    policy = models.Policy.query.filter_by(slug="p-1").first()
+    org_group = models.OrgGroup.query.filter_by(slug="org-1").first()
+    self.assertEqual(self.get_relationships_for(policy).count(), 3)
+    self.assertEqual(self.get_relationships_for(org_group).count(), 5)
+
+  def test_duplicates_in_other_windows(self):
+    """Test unique values repeated in different windows."""
+    response_json = self.import_file("policy_same_titles.csv")
+
+    self.assertEqual(3, response_json[0]["created"])
+    self.assertEqual(6, response_json[0]["ignored"])
+    self.assertEqual(0, response_json[0]["updated"])
+    self.assertEqual(9, response_json[0]["rows"])
+
+    expected_errors = {
+        errors.DUPLICATE_VALUE_IN_CSV.format(
+            line_list="3, {}".format(line), column_name="Title",
+            value="A title", s="", ignore_lines=line)
+        for line in (4, 6, 10, 11)
+    } | {
+        errors.DUPLICATE_VALUE_IN_CSV.format(
+            line_list="5, 7", column_name="Title", value="A different title",
+            s="", ignore_lines="7"),
+    } | {
+        errors.DUPLICATE_VALUE_IN_CSV.format(
+            line_list="8, {}".format(line), column_name="Code", value="code",
+            s="", ignore_lines=line)
+        for line in (9, 10, 11)
+    }
+    self.assertEqual(expected_errors, set(response_json[0]["row_errors"]))
+    self.assertEqual(models.Policy.query.count(), 3)
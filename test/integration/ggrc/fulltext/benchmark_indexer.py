@@ -0,0 +1,87 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark fulltext index writes
+
+ Compares the per row ORM write path of the SQL indexer (update_record for
+ every object) with the set based write path (bulk_update_records) on
+ generated fulltext records and prints written rows per second for both.
+
+ The benchmark writes into the database configured for the test environment
+ and removes the generated records afterwards.
+
+ Usage:
+   python benchmark_indexer.py [object_count] [properties_per_object]
+
+"""
+
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext.recordbuilder import Record
+
+
+BENCHMARK_TYPE = "BenchmarkIndexerObject"
+
+
+def generate_records(object_count, property_count):
+  """Generate fulltext records for fake objects."""
+  return [
+      Record(
+          key,
+          BENCHMARK_TYPE,
+          None,
+          {
+              "property_{}".format(prop): {"": u"value {} {}".format(key, prop)}
+              for prop in range(property_count)
+          },
+      )
+      for key in range(1, object_count + 1)
+  ]
+
+
+def run_per_row(indexer, records):
+  """Write records one object at a time through the ORM."""
+  for record in records:
+    indexer.update_record(record, commit=False)
+  db.session.commit()
+
+
+def run_bulk(indexer, records):
+  """Write all records with set based statements."""
+  indexer.bulk_update_records(records)
+
+
+def measure(write_function, indexer, records, row_count):
+  """Measure rows per second for a single write function.
+
+  Records are written twice so that the second run also measures the removal
+  of the obsolete entries.
+  """
+  indexer.delete_records_by_type(BENCHMARK_TYPE)
+  write_function(indexer, records)
+  start = time.time()
+  write_function(indexer, records)
+  duration = time.time() - start
+  indexer.delete_records_by_type(BENCHMARK_TYPE)
+  return row_count / duration if duration else float("inf"), duration
+
+
+def main(object_count=2000, property_count=6):
+  """Run the benchmark and print the results."""
+  with app.app_context():
+    indexer = get_indexer()
+    records = generate_records(object_count, property_count)
+    row_count = object_count * property_count
+    print "Writing {} rows for {} objects".format(row_count, object_count)
+    for name, function in [("per row", run_per_row), ("bulk", run_bulk)]:
+      rate, duration = measure(function, indexer, records, row_count)
+      print "{:>8}: {:10.1f} rows/sec ({:.3f}s)".format(name, rate, duration)
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:3]])
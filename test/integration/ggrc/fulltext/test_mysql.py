@@ -73,3 +73,38 @@ class TestCAD(TestCase):
           property=u"\u5555" * 240 + u"2",
       ))
       db.session.commit()
+
+
+class TestFulltextSearchMode(TestCase):
+  """Tests for searching with the MySQL FULLTEXT index."""
+
+  def setUp(self):
+    super(TestFulltextSearchMode, self).setUp()
+    for key, title in enumerate([u"Quarterly access review",
+                                 u"Annual access audit",
+                                 u"Firewall configuration"], 1):
+      db.session.add(mysql.MysqlRecordProperty(
+          key=key,
+          type="Control",
+          property="title",
+          subproperty=u"",
+          content=title,
+      ))
+    db.session.commit()
+
+  def _search(self, terms):
+    # pylint: disable=protected-access
+    query = db.session.query(mysql.MysqlRecordProperty.key).filter(
+        mysql.MysqlFulltextIndexer._get_filter_query(terms))
+    return sorted(key for key, in query)
+
+  def test_prefix_search(self):
+    """Words are matched as prefixes and all of them must be present."""
+    self.assertEqual(self._search(u"acc"), [1, 2])
+    self.assertEqual(self._search(u"access rev"), [1])
+    self.assertEqual(self._search(u"firewall acc"), [])
+
+  def test_short_words(self):
+    """Words shorter than the FULLTEXT token size are still matched."""
+    self.assertEqual(self._search(u"fi"), [3])
+    self.assertEqual(self._search(u"access au"), [2])
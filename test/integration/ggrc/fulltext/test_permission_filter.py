@@ -0,0 +1,127 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for precomputed permission filters."""
+
+from mock import patch
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.fulltext import mysql
+from ggrc.models import all_models
+from ggrc.utils import permission_filter
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.generator import ObjectGenerator
+from integration.ggrc.models import factories
+
+
+class TestPermissionFilter(TestCase):
+  """Tests for permission filters of a request."""
+
+  def setUp(self):
+    super(TestPermissionFilter, self).setUp()
+    with factories.single_commit():
+      self.context = factories.ContextFactory()
+      self.allowed = factories.ControlFactory(context=self.context)
+      self.resource = factories.ControlFactory()
+      self.forbidden = factories.ControlFactory()
+
+  def _get_ids(self, perm_filter):
+    model = all_models.Control
+    query = db.session.query(model.id).filter(
+        perm_filter.get_model_filter(model))
+    return {id_ for id_, in query}
+
+  @patch("ggrc.utils.query_helpers.get_context_resource")
+  def test_model_filter(self, get_context_resource):
+    """Objects are filtered by allowed contexts and resources."""
+    get_context_resource.return_value = ([self.context.id],
+                                         [self.resource.id])
+    perm_filter = permission_filter.PermissionFilter()
+    self.assertEqual(self._get_ids(perm_filter),
+                     {self.allowed.id, self.resource.id})
+    self.assertEqual(self._get_ids(perm_filter),
+                     {self.allowed.id, self.resource.id})
+    # permissions are loaded only once for every model
+    self.assertEqual(get_context_resource.call_count, 1)
+
+  @patch("ggrc.utils.permission_filter.IN_LIST_SIZE", 1)
+  @patch("ggrc.utils.query_helpers.get_context_resource")
+  def test_split_in_lists(self, get_context_resource):
+    """Long lists of allowed ids are split into several IN lists."""
+    get_context_resource.return_value = (
+        [None, self.context.id], [self.resource.id, self.forbidden.id])
+    perm_filter = permission_filter.PermissionFilter()
+    self.assertEqual(self._get_ids(perm_filter),
+                     {self.allowed.id, self.resource.id, self.forbidden.id})
+
+  @patch("ggrc.utils.query_helpers.get_context_resource")
+  def test_admin_filter(self, get_context_resource):
+    """No filter is needed for objects with unrestricted access."""
+    get_context_resource.return_value = (None, [])
+    perm_filter = permission_filter.PermissionFilter()
+    self.assertIsNone(perm_filter.get_model_filter(all_models.Control))
+
+  @patch("ggrc.utils.query_helpers.get_context_resource")
+  def test_request_cache(self, get_context_resource):
+    """Search and counts in a request share the permission filter."""
+    get_context_resource.return_value = ([self.context.id], [])
+    indexer = mysql.MysqlIndexer(None)
+    with app.test_request_context():
+      indexer.search(u"", types=["Control"])
+      indexer.counts(u"", types=["Control"])
+    self.assertEqual(get_context_resource.call_count, 1)
+
+
+class TestPermissionFilterUnions(TestCase):
+  """Tests for search queries that filter several union branches."""
+
+  def setUp(self):
+    super(TestPermissionFilterUnions, self).setUp()
+    self.api = Api()
+    self.generator = ObjectGenerator()
+    _, self.creator = self.generator.generate_person(user_role="Creator")
+    _, admin = self.generator.generate_person(user_role="Administrator")
+    self.api.set_user(admin)
+    self.hidden = self._create(all_models.Control, "Hidden control", admin)
+    self.api.set_user(self.creator)
+    self.control = self._create(all_models.Control, "Own control",
+                                self.creator)
+    self.objective = self._create(all_models.Objective, "Own objective",
+                                  self.creator)
+
+  def _create(self, model, title, owner):
+    """Create an object owned by a user through the API."""
+    name = model._inflector.table_singular
+    response = self.api.post(model, {name: {
+        "title": title,
+        "context": None,
+        "owners": [{"id": owner.id, "type": "Person"}],
+    }})
+    self.assertEqual(response.status_code, 201)
+    return response.json[name]["id"]
+
+  def test_search_extra_params(self):
+    """Search with extra params only returns allowed objects."""
+    response = self.api.client.get(
+        "/search?q=&types=Control,Objective"
+        "&extra_params=Objective:title=Own%20objective")
+    self.assert200(response)
+    self.assertEqual(
+        {(entry["type"], entry["id"])
+         for entry in response.json["results"]["entries"]},
+        {("Control", self.control), ("Objective", self.objective)},
+    )
+
+  def test_counts_extra_columns(self):
+    """Counts of several types and extra columns only count allowed objects."""
+    response = self.api.client.get(
+        "/search?q=&types=Control,Objective&counts_only=true"
+        "&extra_columns=OwnControls=Control")
+    self.assert200(response)
+    self.assertEqual(response.json["results"]["counts"], {
+        "Control": 1,
+        "Objective": 1,
+        "OwnControls": 1,
+    })
@@ -4,6 +4,7 @@
 """Test for total reindex procedure"""
 
 from ggrc import fulltext
+from ggrc.fulltext import reindex
 
 from ggrc import views
 from integration.ggrc import TestCase
@@ -54,3 +55,28 @@ class TestTotalTeindex(TestCase):
     count = indexer.record_type.query.count()
     views.do_reindex()
     self.assertEqual(count, indexer.record_type.query.count())
+
+  def test_resume_reindex(self):
+    """Test that an interrupted reindex is resumed from checkpoints."""
+    with ggrc_factories.single_commit():
+      for factory in self.INDEXED_MODEL_FACTORIES:
+        for _ in range(5):
+          factory()
+    indexer = fulltext.get_indexer()
+    views.do_reindex()
+    count = indexer.record_type.query.count()
+
+    engine = reindex.Reindexer(chunk_size=2, partition_size=3)
+    engine.start()
+    engine.load_cache()
+    partitions = engine.get_pending_partitions()
+    engine.reindex_partition(*partitions[0])
+    # live index must stay intact while the shadow table is being built
+    self.assertEqual(count, indexer.record_type.query.count())
+    self.assertTrue(engine.can_resume())
+
+    progress = reindex.Reindexer().run()
+    self.assertEqual(progress["total"], len(partitions) - 1)
+    self.assertEqual(progress["done"], progress["total"])
+    self.assertFalse(reindex.Reindexer().can_resume())
+    self.assertEqual(count, indexer.record_type.query.count())
@@ -0,0 +1,97 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark CompressedType encoding
+
+ Compares the legacy pickle storage format of CompressedType with the current
+ compressed format on payloads shaped like background task parameters and
+ results, and prints stored size and encode/decode throughput for both.
+
+ Usage:
+   python benchmark_compressed_type.py [rows] [repeat]
+
+"""
+
+import json
+import pickle
+import sys
+import time
+
+from ggrc.models.types import CompressedType
+from ggrc.utils import as_json
+
+
+def generate_payloads(rows):
+  """Generate representative background task payloads."""
+  csv_lines = u"".join(
+      u",POLICY-{0},Policy title {0},user@example.com,Draft,"
+      u"\"Description of policy {0}\"\n".format(i)
+      for i in range(rows)
+  )
+  import_info = [{
+      "name": "Policy",
+      "rows": rows,
+      "created": rows,
+      "updated": 0,
+      "ignored": 0,
+      "deleted": 0,
+      "block_warnings": [],
+      "block_errors": [],
+      "row_warnings": [u"Line {}: Unknown user.".format(i)
+                       for i in range(0, rows, 10)],
+      "row_errors": [],
+  }]
+  return [
+      ("collection post body", u"[{}]".format(u",".join(
+          u'{{"policy": {{"title": "Policy {0}", "context": null}}}}'.format(i)
+          for i in range(rows)))),
+      ("export csv result", {
+          "content": csv_lines,
+          "status_code": 200,
+          "headers": [["Content-Type", "text/csv"]],
+      }),
+      ("import info result", {
+          "content": json.dumps(import_info),
+          "status_code": 200,
+          "headers": [["Content-Type", "application/json"]],
+      }),
+  ]
+
+
+def legacy_encode(value):
+  """Encode a value like CompressedType did before format versioning."""
+  return pickle.dumps(value)
+
+
+def measure(function, value, repeat):
+  """Get average duration of a function call in seconds."""
+  start = time.time()
+  for _ in range(repeat):
+    result = function(value)
+  return (time.time() - start) / repeat, result
+
+
+def main(rows=5000, repeat=20):
+  """Run the benchmark and print the results."""
+  codecs = [
+      ("pickle", legacy_encode, CompressedType.decode),
+      ("zlib json", CompressedType.encode, CompressedType.decode),
+  ]
+  for name, value in generate_payloads(rows):
+    # throughput is measured on the size of the payload serialized as JSON
+    megabytes = len(as_json(value)) / 1024.0 / 1024.0
+    print "{} ({:.2f} MB)".format(name, megabytes)
+    for codec_name, encode, decode in codecs:
+      encode_time, stored = measure(encode, value, repeat)
+      decode_time, _ = measure(decode, stored, repeat)
+      print "{:>10}: {:9d} bytes, encode {:7.1f}, decode {:7.1f} MB/s".format(
+          codec_name,
+          len(stored),
+          megabytes / encode_time if encode_time else float("inf"),
+          megabytes / decode_time if decode_time else float("inf"),
+      )
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:3]])
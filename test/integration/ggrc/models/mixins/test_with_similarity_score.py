@@ -7,6 +7,7 @@ import json
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.similarity_index import SimilarityIndex
 from ggrc.snapshotter.rules import Types
 
 from integration.ggrc import TestCase
@@ -487,3 +488,46 @@ class TestWithSimilarityScore(TestCase):
         response.json[0]["Issue"]["ids"],
         expected_ids
     )
+
+  def test_similarity_index_updated(self):
+    """Similarity index follows created and deleted mappings."""
+    audit = factories.AuditFactory()
+    assessment1 = factories.AssessmentFactory(audit=audit)
+    assessment2 = factories.AssessmentFactory(audit=audit)
+    control = factories.ControlFactory()
+    snapshot = factories.SnapshotFactory(
+        parent=audit,
+        child_id=control.id,
+        child_type=control.type,
+        revision_id=models.Revision.query.filter_by(
+            resource_type=control.type).one().id
+    )
+    factories.RelationshipFactory(source=snapshot, destination=assessment1)
+    relationship = factories.RelationshipFactory(source=assessment2,
+                                                 destination=snapshot)
+    assessment1_id, assessment2_id = assessment1.id, assessment2.id
+
+    index_rows = SimilarityIndex.query.filter_by(
+        related_type="Control",
+        related_id=control.id,
+        via_snapshot=True,
+    )
+    self.assertEqual(
+        {(row.object_id, row.mappings) for row in index_rows},
+        {(assessment1_id, 1), (assessment2_id, 1)},
+    )
+    similar_objects = models.Assessment.get_similar_objects_query(
+        id_=assessment1_id,
+        types=["Assessment"],
+    ).all()
+    self.assertEqual([(obj.id, obj.weight) for obj in similar_objects],
+                     [(assessment2_id, 2)])
+
+    db.session.delete(relationship)
+    db.session.commit()
+
+    similar_objects = models.Assessment.get_similar_objects_query(
+        id_=assessment1_id,
+        types=["Assessment"],
+    ).all()
+    self.assertEqual(similar_objects, [])
@@ -4,6 +4,9 @@
 """ Tests for ggrc.models.Revision """
 
 import ggrc.models
+from ggrc import db
+from ggrc.models.revision import LatestRevision
+import integration.ggrc.api_helper
 import integration.ggrc.generator
 from integration.ggrc import TestCase
 
@@ -125,3 +128,65 @@ class TestRevisions(TestCase):
     self.assertIsNotNone(revision)
     self.assertEqual(revision.content["title"], process.title)
     self.assertEqual(revision.content["description"], process.description)
+
+  def test_collection_post_revisions(self):
+    """Test revisions of objects created by a single collection POST."""
+    api = integration.ggrc.api_helper.Api()
+    response = api.post(ggrc.models.DataAsset, [
+        {"data_asset": {"title": "bulk {}".format(i), "context": None}}
+        for i in range(3)
+    ])
+    self.assert200(response)
+    revisions = ggrc.models.Revision.query.filter_by(
+        resource_type="DataAsset").all()
+    self.assertEqual(
+        {r.content["title"] for r in revisions},
+        {"bulk 0", "bulk 1", "bulk 2"},
+    )
+    self.assertEqual({r.action for r in revisions}, {"created"})
+    self.assertEqual(len({r.event_id for r in revisions}), 1)
+
+  def test_latest_revisions(self):
+    """Test latest_revisions rows point to the newest revisions."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "latest v1",
+        "context": None,
+    }})
+    self.gen.modify(obj, name, {name: {
+        "slug": obj.slug,
+        "title": "latest v2",
+        "context": None,
+    }})
+    process = factories.ProcessFactory()
+    for instance in (obj, process):
+      latest = LatestRevision.query.filter_by(
+          resource_type=instance.type,
+          resource_id=instance.id,
+      ).one()
+      self.assertEqual(
+          latest.revision_id,
+          max(r.id for r in _get_revisions(instance)),
+      )
+
+  def test_refresh_latest_revisions(self):
+    """Test latest_revisions rows of revisions recovered by a refresh."""
+    process = factories.ProcessFactory()
+    process_id = process.id
+    table = ggrc.models.Process.__table__
+    db.session.execute(table.delete().where(table.c.id == process_id))
+    db.session.commit()
+
+    api = integration.ggrc.api_helper.Api()
+    response = api.client.post("/admin/refresh_revisions")
+    self.assert200(response)
+
+    latest = LatestRevision.query.filter_by(
+        resource_type="Process",
+        resource_id=process_id,
+    ).one()
+    self.assertEqual(
+        ggrc.models.Revision.query.get(latest.revision_id).action,
+        "deleted",
+    )
@@ -0,0 +1,126 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for resumable sending of daily digests."""
+
+from datetime import date
+from datetime import timedelta
+
+from mock import patch
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models import BackgroundTask
+from ggrc.models import Notification
+from ggrc.notifications import delivery
+from ggrc.notifications.delivery import NotificationDelivery
+from integration.ggrc.notifications.test_assignable_notifications import \
+    TestAssignableNotification
+
+
+class TestDigestDelivery(TestAssignableNotification):
+  """Tests for the daily digest delivery ledger."""
+
+  def setUp(self):
+    super(TestDigestDelivery, self).setUp()
+    self.import_file("assessment_with_templates.csv")
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_resumed_digest(self, send_email):
+    """Test that digests are not sent again after an interrupted run."""
+    self.client.get("/_notifications/send_daily_digest")
+    sent_count = send_email.call_count
+    self.assertGreater(sent_count, 0)
+    self.assertEqual(self._get_notifications().count(), 0)
+
+    # the run was interrupted before the notifications were marked as sent
+    Notification.query.update({"sent_at": None})
+    db.session.commit()
+
+    self.client.get("/_notifications/send_daily_digest")
+    self.assertEqual(send_email.call_count, sent_count)
+    self.assertEqual(self._get_notifications().count(), 0)
+
+    delivery = NotificationDelivery.query.filter_by(
+        recipient=u"user@example.com").one()
+    self.assertIsNotNone(delivery.sent_at)
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_digest_sent_after_ledger_read(self, send_email):
+    """Test that digests sent by another run after the ledger was read are
+    not sent again."""
+    self.client.get("/_notifications/send_daily_digest")
+    sent_count = send_email.call_count
+    Notification.query.update({"sent_at": None})
+    db.session.commit()
+
+    get_delivered = delivery.get_delivered
+    stale_reads = []
+
+    def read_before_other_run(recipients, day, notifications):
+      """Return nothing delivered for the first ledger read."""
+      if not stale_reads:
+        stale_reads.append(recipients)
+        return {}
+      return get_delivered(recipients, day, notifications)
+
+    with patch("ggrc.notifications.delivery.get_delivered",
+               side_effect=read_before_other_run):
+      self.client.get("/_notifications/send_daily_digest")
+    self.assertTrue(stale_reads)
+    self.assertEqual(send_email.call_count, sent_count)
+    self.assertEqual(self._get_notifications().count(), 0)
+    self.assertEqual(NotificationDelivery.query.filter(
+        NotificationDelivery.sent_at.is_(None)).count(), 0)
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_failed_digest(self, send_email):
+    """Test that digests that failed are sent by the next run."""
+    pending_count = self._get_notifications().count()
+    send_email.side_effect = Exception("Mail service unavailable")
+    self.client.get("/_notifications/send_daily_digest")
+    self.assertEqual(self._get_notifications().count(), pending_count)
+    self.assertEqual(NotificationDelivery.query.filter(
+        NotificationDelivery.sent_at.isnot(None)).count(), 0)
+
+    send_email.side_effect = None
+    send_email.reset_mock()
+    self.client.get("/_notifications/send_daily_digest")
+    self.assertGreater(send_email.call_count, 0)
+    self.assertEqual(self._get_notifications().count(), 0)
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_sharded_digest(self, send_email):
+    """Test sending the digest in multiple background tasks."""
+    with patch.object(settings, "DIGEST_SHARDS", 3):
+      response = self.client.get("/_notifications/send_daily_digest")
+    self.assert200(response)
+    self.assertEqual(BackgroundTask.query.count(), 3)
+    self.assertEqual(
+        set(task.status for task in BackgroundTask.query), {"Success"})
+    recipients = [call[0][0] for call in send_email.call_args_list]
+    self.assertIn(u"user@example.com", recipients)
+    self.assertEqual(len(recipients), len(set(recipients)))
+    self.assertEqual(self._get_notifications().count(), 0)
+
+  def test_expired_claim(self):
+    """Test that a sender with an expired claim keeps the new delivery."""
+    day = date.today()
+    recipient = u"user@example.com"
+    first_claim, claimed = delivery.claim([recipient], day)
+    self.assertEqual(claimed, {recipient: []})
+    # the first sender claimed the row long enough ago for the claim to expire
+    first_claim -= timedelta(seconds=settings.DIGEST_CLAIM_TIMEOUT + 60)
+    NotificationDelivery.query.update({"claimed_at": first_claim})
+    db.session.commit()
+
+    second_claim, claimed = delivery.claim([recipient], day)
+    self.assertEqual(claimed, {recipient: []})
+    self.assertEqual(
+        delivery.mark_sent(day, second_claim, {recipient: {1, 2}}),
+        [recipient])
+
+    self.assertEqual(
+        delivery.mark_sent(day, first_claim, {recipient: {3}}), [])
+    row = NotificationDelivery.query.filter_by(recipient=recipient).one()
+    self.assertEqual(row.notification_ids, [1, 2])
@@ -12,10 +12,12 @@ import unittest
 from datetime import datetime
 from operator import itemgetter
 from flask import json
+import mock
 
 from ggrc import app
 from ggrc import db
 from ggrc.models import CustomAttributeDefinition as CAD
+from ggrc.services.query_helper import QueryAPIQueryHelper
 
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
@@ -534,6 +536,20 @@ class TestAdvancedQueryAPI(BaseQueryAPITestCase):
         set(programs_ids["ids"]),
     )
 
+  def test_query_fields_projection(self):
+    """Values of plain fields match values published by the builder."""
+    query = self._make_query_dict("Program", type_="values",
+                                  order_by=[{"name": "title"}])
+    query["fields"] = ["id", "type", "title", "slug", "modified_by",
+                       "not_a_field"]
+    projected = self._get_first_result_set(query, "Program")
+    with mock.patch.object(QueryAPIQueryHelper, "_get_projection",
+                           return_value=None):
+      published = self._get_first_result_set(query, "Program")
+
+    self.assertTrue(projected["values"])
+    self.assertEqual(projected, published)
+
   @unittest.skip("Not implemented")
   def test_self_link(self):
     # It would be good if the api accepted get requests and we could add the
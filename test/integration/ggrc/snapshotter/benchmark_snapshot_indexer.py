@@ -0,0 +1,113 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark snapshot reindex
+
+ Compares the legacy snapshot reindex, which loads Revision objects of all
+ snapshots and builds every fulltext record in memory before writing them,
+ with the streaming reindex_pairs, and prints written rows per second and peak
+ resident memory for both.
+
+ Every variant runs in its own process, so that peak memory of one does not
+ hide the other. The benchmark reindexes snapshots of an audit from the
+ database configured for the environment, which ends up with the same
+ records as before.
+
+ Usage:
+   python benchmark_snapshot_indexer.py audit_id [legacy|streaming]
+
+"""
+
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import orm
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc import models
+from ggrc.app import app
+from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.snapshotter import indexer
+from ggrc.snapshotter.datastructures import Pair
+
+
+def legacy_reindex(pairs):
+  """Reindex snapshots the way reindex_pairs did before streaming."""
+  snapshot_query = models.Snapshot.query.filter(
+      tuple_(
+          models.Snapshot.parent_type,
+          models.Snapshot.parent_id,
+          models.Snapshot.child_type,
+          models.Snapshot.child_id,
+      ).in_({pair.to_4tuple() for pair in pairs})
+  ).options(
+      orm.subqueryload("revision").load_only("id", "resource_type", "content"),
+  )
+  # pylint: disable=protected-access
+  cad_dict = indexer._get_custom_attribute_dict()
+  snapshots = {}
+  for snapshot in snapshot_query:
+    snapshots[snapshot.id] = {
+        "id": snapshot.id,
+        "context_id": snapshot.context_id,
+        "parent_type": snapshot.parent_type,
+        "parent_id": snapshot.parent_id,
+        "child_type": snapshot.child_type,
+        "child_id": snapshot.child_id,
+        "revision": indexer.get_searchable_attributes(
+            indexer.CLASS_PROPERTIES[snapshot.revision.resource_type],
+            cad_dict,
+            snapshot.revision.content)
+    }
+  payload = list(indexer.iter_records(snapshots.values()))
+  indexer.delete_records(snapshots.keys())
+  indexer.insert_records(payload)
+
+
+def count_rows(audit_id):
+  """Count fulltext rows of snapshots of an audit."""
+  return db.session.query(Record).filter(
+      Record.type == "Snapshot",
+      Record.tags.like(u"Audit-{}-%".format(audit_id)),
+  ).count()
+
+
+def run(audit_id, variant):
+  """Reindex snapshots of an audit and print rows/sec and peak RSS."""
+  with app.app_context():
+    pairs = {Pair.from_4tuple(row) for row in db.session.query(
+        models.Snapshot.parent_type,
+        models.Snapshot.parent_id,
+        models.Snapshot.child_type,
+        models.Snapshot.child_id,
+    ).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit_id,
+    )}
+    reindex = legacy_reindex if variant == "legacy" else indexer.reindex_pairs
+    start = time.time()
+    reindex(pairs)
+    duration = time.time() - start
+    rows = count_rows(audit_id)
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print "{:>10}: {} snapshots, {:10.1f} rows/sec, peak RSS {:.1f} MB".format(
+        variant, len(pairs), rows / duration if duration else float("inf"),
+        peak)
+
+
+def main(audit_id, variant=None):
+  """Run the benchmark and print the results."""
+  if variant:
+    run(int(audit_id), variant)
+    return
+  for name in ("legacy", "streaming"):
+    subprocess.check_call([sys.executable, __file__, str(audit_id), name])
+
+
+if __name__ == "__main__":
+  main(*sys.argv[1:3])
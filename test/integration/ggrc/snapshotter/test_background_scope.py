@@ -0,0 +1,125 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for snapshot creation in a background task."""
+
+import json
+
+from mock import patch
+
+from ggrc import db
+from ggrc import settings
+import ggrc.models as models
+
+from ggrc.snapshotter import helpers
+
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+@patch.object(settings, "SNAPSHOT_BACKGROUND", True)
+@patch.object(settings, "SNAPSHOT_BATCH_SIZE", 2)
+class TestBackgroundScope(SnapshotterBaseTestCase):
+  """Test cases for batched snapshot creation."""
+
+  def test_background_create(self):
+    """Test audit scope creation in batches."""
+    program = self.create_object(models.Program, {
+        "title": "Background program",
+    })
+    for i in range(3):
+      control = self.create_object(models.Control, {
+          "title": "Background control {}".format(i),
+      })
+      self.create_mapping(program, control)
+
+    self.create_object(models.Audit, {
+        "title": "Background audit",
+        "program": {"id": program.id},
+        "status": "Planned",
+        "snapshots": {
+            "operation": "create",
+        }
+    })
+
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title == "Background audit").one()
+    self.assertEqual(audit.scope_status, models.Audit.SCOPE_READY)
+
+    snapshots = db.session.query(models.Snapshot).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    )
+    self.assertEqual(snapshots.count(), 3)
+
+    task = models.BackgroundTask.query.filter(
+        models.BackgroundTask.name.like("snapshot_scope_Audit_%")).one()
+    self.assertEqual(task.status, "Success")
+    self.assertEqual(
+        json.loads(task.result["content"]),
+        {"pairs": 3, "done": 3, "batches": 2},
+    )
+
+  @patch("ggrc.services.common.clear_object_cache")
+  def test_scope_status_cache(self, clear_object_cache):
+    """Test that cached entries of the audit are removed with its status."""
+    program = self.create_object(models.Program, {
+        "title": "Cached program",
+    })
+    audit = self.create_object(models.Audit, {
+        "title": "Cached audit",
+        "program": {"id": program.id},
+        "status": "Planned",
+        "snapshots": {
+            "operation": "create",
+        }
+    })
+
+    cleared = [obj.id for call in clear_object_cache.call_args_list
+               for obj in call[0][0]]
+    self.assertIn(audit.id, cleared)
+
+  @patch.object(settings, "SNAPSHOT_BATCH_RETRIES", 1)
+  def test_batch_retry(self):
+    """Test that a batch failing after writing snapshots is written again."""
+    program = self.create_object(models.Program, {
+        "title": "Retry program",
+    })
+    for i in range(3):
+      control = self.create_object(models.Control, {
+          "title": "Retry control {}".format(i),
+      })
+      self.create_mapping(program, control)
+
+    calls = []
+
+    def get_relationships(relationships):
+      """Fail the first time relationships are retrieved."""
+      calls.append(relationships)
+      if len(calls) == 1:
+        raise ValueError("Injected failure")
+      return helpers.get_relationships(relationships)
+
+    with patch("ggrc.snapshotter.get_relationships", get_relationships):
+      self.create_object(models.Audit, {
+          "title": "Retry audit",
+          "program": {"id": program.id},
+          "status": "Planned",
+          "snapshots": {
+              "operation": "create",
+          }
+      })
+
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title == "Retry audit").one()
+    self.assertEqual(audit.scope_status, models.Audit.SCOPE_READY)
+    snapshots = db.session.query(models.Snapshot).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    ).all()
+    self.assertEqual(len(snapshots), 3)
+    for snapshot in snapshots:
+      self.assertIsNotNone(models.Relationship.find_related(
+          audit, getattr(models, snapshot.child_type).query.get(
+              snapshot.child_id)))
+      self.assertEqual(models.Revision.query.filter_by(
+          resource_type="Snapshot", resource_id=snapshot.id).count(), 1)
@@ -3,13 +3,17 @@
 
 """Test for indexing of snapshotted objects"""
 
+from mock import patch
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.views import do_reindex
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.snapshotter.datastructures import Pair
 from ggrc.snapshotter.indexer import delete_records
+from ggrc.snapshotter.indexer import reindex_pairs
 
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
 from integration.ggrc.models import factories
@@ -339,3 +343,31 @@ class TestSnapshotIndexing(SnapshotterBaseTestCase):
     records = get_records(audit, snapshots)
 
     self.assertEqual(records.count(), 57)
+
+  def test_batched_reindex(self):
+    """Test reindex of snapshots in small batches"""
+    self._import_file("snapshotter_create.csv")
+
+    program = db.session.query(models.Program).filter(
+        models.Program.slug == "Prog-13211"
+    ).one()
+
+    self.create_audit(program)
+
+    snapshots = db.session.query(models.Snapshot).all()
+    pairs = {Pair.from_snapshot(s) for s in snapshots}
+
+    def get_all_records():
+      return {
+          (r.key, r.property, r.subproperty, r.content)
+          for r in db.session.query(Record).filter(Record.type == "Snapshot")
+      }
+
+    expected = get_all_records()
+    delete_records({s.id for s in snapshots})
+    self.assertEqual(get_all_records(), set())
+
+    with patch.object(settings, "SNAPSHOT_INDEX_BATCH_SIZE", 2):
+      reindex_pairs(pairs)
+
+    self.assertEqual(get_all_records(), expected)
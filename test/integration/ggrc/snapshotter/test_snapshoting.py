@@ -6,9 +6,13 @@
 import collections
 
 import sqlalchemy as sa
+from mock import patch
 
 from ggrc import db
+from ggrc import settings
 import ggrc.models as models
+from ggrc.models.snapshot import SnapshotScopeSync
+from ggrc.snapshotter import SnapshotGenerator
 from ggrc.snapshotter.rules import Types
 
 from integration.ggrc.models import factories
@@ -790,3 +794,113 @@ class TestSnapshoting(SnapshotterBaseTestCase):
 
     self.assertIsNotNone(models.Relationship.find_related(program, objective))
     self.assertIsNotNone(models.Relationship.find_related(program, control))
+
+  @patch.object(settings, "SNAPSHOT_INCREMENTAL_UPSERT", True)
+  def test_incremental_upsert(self):
+    """Test upsert of changes since the last scope sync"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1"
+    })
+    controls = [self.create_object(models.Control, {
+        "title": "Test Control Snapshot {}".format(i)
+    }) for i in range(2)]
+    for control in controls:
+      self.create_mapping(program, control)
+
+    self.create_audit(program)
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+
+    objective = self.create_object(models.Objective, {
+        "title": "Test Objective Snapshot UNEDITED"
+    })
+    self.create_mapping(objective, program)
+    control = self.refresh_object(controls[0])
+    self.api.modify_object(control, {
+        "title": "Test Control Snapshot EDIT"
+    })
+
+    audit = self.refresh_object(audit)
+    with patch.object(SnapshotGenerator, "_fetch_neighborhood") as fetch:
+      self.api.modify_object(audit, {
+          "snapshots": {
+              "operation": "upsert"
+          }
+      })
+    self.assertFalse(fetch.called)
+
+    snapshots = db.session.query(models.Snapshot).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    )
+    self.assertEqual(
+        {(s.child_type, s.revision.content["title"]) for s in snapshots},
+        {
+            ("Control", "Test Control Snapshot EDIT"),
+            ("Control", "Test Control Snapshot 1"),
+            ("Objective", "Test Objective Snapshot UNEDITED"),
+        },
+    )
+
+  @patch.object(settings, "SNAPSHOT_INCREMENTAL_UPSERT", True)
+  def test_incremental_upsert_late_commit(self):
+    """Test upsert of changes committed after the last scope sync started"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1"
+    })
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot 1"
+    })
+    self.create_mapping(program, control)
+    self.create_audit(program)
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+
+    control = self.refresh_object(control)
+    self.api.modify_object(control, {
+        "title": "Test Control Snapshot EDIT"
+    })
+    # the change was committed by a transaction that got its revision id
+    # before the last sync read the newest revision id
+    last_revision_id = db.session.query(
+        sa.func.max(models.Revision.id)).scalar()
+    SnapshotScopeSync.query.update({"revision_id": last_revision_id})
+    db.session.commit()
+
+    audit = self.refresh_object(audit)
+    self.api.modify_object(audit, {
+        "snapshots": {
+            "operation": "upsert"
+        }
+    })
+
+    snapshot = db.session.query(models.Snapshot).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    ).one()
+    self.assertEqual(snapshot.revision.content["title"],
+                     "Test Control Snapshot EDIT")
+
+  @patch.object(settings, "SNAPSHOT_INCREMENTAL_UPSERT", True)
+  @patch.object(settings, "SNAPSHOT_FULL_SYNC_INTERVAL", -1)
+  def test_periodic_full_upsert(self):
+    """Test upsert of the whole scope once the last full sync is too old"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1"
+    })
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot 1"
+    })
+    self.create_mapping(program, control)
+    self.create_audit(program)
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+
+    with patch.object(SnapshotGenerator, "_fetch_neighborhood",
+                      return_value=set()) as fetch:
+      self.api.modify_object(audit, {
+          "snapshots": {
+              "operation": "upsert"
+          }
+      })
+    self.assertTrue(fetch.called)
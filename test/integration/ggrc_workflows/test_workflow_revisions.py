@@ -6,8 +6,10 @@
 from freezegun import freeze_time
 from mock import patch
 
-from ggrc.models import Revision, Event
+from ggrc.models import Revision, Event, Relationship
+import ggrc_workflows
 from ggrc_workflows import start_recurring_cycles
+from ggrc_workflows.models import Cycle
 from integration.ggrc_workflows.generator import WorkflowsGenerator
 from integration.ggrc.generator import ObjectGenerator
 from integration.ggrc import TestCase
@@ -46,6 +48,57 @@ class TestRecurringWorkflowRevisions(TestCase):
     self.assertEqual(event_count + 1, Event.query.count())
     self.assertNotEqual(revision_count, revision_query.count())
 
+  @patch("ggrc.notifications.common.send_email")
+  def test_relationship_revisions(self, mock_mail):  # noqa pylint: disable=unused-argument
+    """Relationships of cycle tasks to objects get revisions."""
+    with freeze_time("2015-04-01"):
+      _, workflow = self.wf_generator.generate_workflow(self.monthly_workflow)
+      self.wf_generator.activate_workflow(workflow)
+
+    with freeze_time("2015-04-03"):
+      start_recurring_cycles()
+
+    relationships = Relationship.query.filter_by(
+        source_type="CycleTaskGroupObjectTask").all()
+    self.assertTrue(relationships)
+    revision_ids = set(resource_id for resource_id, in Revision.query.filter(
+        Revision.resource_type == "Relationship",
+        Revision.resource_id.in_([rel.id for rel in relationships]),
+    ).values(Revision.resource_id))
+    self.assertEqual(revision_ids, set(rel.id for rel in relationships))
+
+  @patch("ggrc.notifications.common.send_email")
+  def test_failed_workflow(self, mock_mail):  # noqa pylint: disable=unused-argument
+    """A failing workflow does not prevent cycles of other workflows and is
+    reported after all workflows were handled."""
+    with freeze_time("2015-04-01"):
+      _, failing = self.wf_generator.generate_workflow(self.monthly_workflow)
+      self.wf_generator.activate_workflow(failing)
+      _, workflow = self.wf_generator.generate_workflow(self.monthly_workflow)
+      self.wf_generator.activate_workflow(workflow)
+    failing_id, workflow_id = failing.id, workflow.id
+    failing_count = Cycle.query.filter_by(workflow_id=failing_id).count()
+    workflow_count = Cycle.query.filter_by(workflow_id=workflow_id).count()
+
+    # pylint: disable=protected-access
+    start_cycle = ggrc_workflows._start_recurring_cycle
+
+    def start_or_fail(workflow):
+      start_cycle(workflow)
+      if workflow.id == failing_id:
+        raise ValueError("Broken workflow")
+
+    with freeze_time("2015-04-03"):
+      with patch("ggrc_workflows._start_recurring_cycle",
+                 side_effect=start_or_fail):
+        with self.assertRaisesRegexp(RuntimeError, str(failing_id)):
+          start_recurring_cycles()
+
+    self.assertEqual(Cycle.query.filter_by(workflow_id=failing_id).count(),
+                     failing_count)
+    self.assertEqual(Cycle.query.filter_by(workflow_id=workflow_id).count(),
+                     workflow_count + 1)
+
   def _create_test_cases(self):
     def person_dict(person_id):
       return {
@@ -0,0 +1,100 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Benchmark cycle date computation
+
+ Computes task start and end dates of monthly workflows with many tasks over
+ a number of consecutive cycles, once with the legacy day by day adjustment
+ of dates to workdays and once with the precomputed workday calendar, and
+ prints the time spent on both.
+
+ Usage:
+   python benchmark_cycle_calculator.py [tasks] [cycles]
+
+"""
+
+import collections
+import datetime
+import sys
+import time
+
+from dateutil import relativedelta
+
+from ggrc_workflows.services.workflow_cycle_calculator import google_holidays
+from ggrc_workflows.services.workflow_cycle_calculator import (
+    monthly_cycle_calculator
+)
+
+
+Task = collections.namedtuple("Task", [
+    "id", "relative_start_day", "relative_start_month",
+    "relative_end_day", "relative_end_month"])
+TaskGroup = collections.namedtuple("TaskGroup", ["task_group_tasks"])
+Workflow = collections.namedtuple("Workflow", ["task_groups"])
+
+
+class LegacyMonthlyCycleCalculator(
+        monthly_cycle_calculator.MonthlyCycleCalculator):
+  """Monthly calculator adjusting dates like before the workday calendar."""
+
+  def is_work_day(self, ddate):
+    return ddate.isoweekday() < 6 and ddate not in self.holidays
+
+  def adjust_date(self, ddate):
+    if self.is_work_day(ddate):
+      return ddate
+    weekday = ddate.isoweekday()
+    if weekday > 5:
+      ddate = ddate - datetime.timedelta(days=(weekday - 5))
+    if ddate in self.holidays:
+      ddate = ddate - datetime.timedelta(days=1)
+    if not self.is_work_day(ddate):
+      return self.adjust_date(ddate)
+    return ddate
+
+
+def generate_workflow(tasks):
+  """Generate a workflow with tasks spread over the whole month."""
+  return Workflow([TaskGroup([
+      Task(i, i % 28 + 1, None, (i + 7) % 28 + 1, None)
+      for i in range(tasks)
+  ])])
+
+
+def compute_dates(calculator_class, workflow, cycles):
+  """Compute dates of all tasks in consecutive cycles."""
+  # holidays of the whole range are loaded before the measurement for both
+  # calculators
+  holidays = google_holidays.GoogleHolidays()
+  base_date = datetime.date(2017, 1, 1)
+  for year in range(base_date.year - 1, base_date.year + cycles // 12 + 2):
+    datetime.date(year, 1, 1) in holidays  # pylint: disable=pointless-statement
+  calculator = calculator_class(workflow, base_date)
+  calculator.holidays = holidays
+  start = time.time()
+  dates = []
+  for cycle in range(cycles):
+    cycle_date = base_date + relativedelta.relativedelta(months=cycle)
+    dates.extend(calculator.task_date_range(task, cycle_date)
+                 for task in calculator.tasks)
+  return time.time() - start, dates
+
+
+def main(tasks=5000, cycles=12):
+  """Run the benchmark and print the results."""
+  workflow = generate_workflow(tasks)
+  legacy_time, legacy_dates = compute_dates(
+      LegacyMonthlyCycleCalculator, workflow, cycles)
+  calendar_time, calendar_dates = compute_dates(
+      monthly_cycle_calculator.MonthlyCycleCalculator, workflow, cycles)
+  assert legacy_dates == calendar_dates
+  print "{} tasks, {} cycles".format(tasks, cycles)
+  for name, duration in [("legacy", legacy_time),
+                         ("calendar", calendar_time)]:
+    print "{:>10}: {:8.3f} s, {:8.1f} us per task date range".format(
+        name, duration, duration * 1e6 / (tasks * cycles))
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,97 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the process local LRU cache."""
+
+import unittest
+
+import mock
+
+from ggrc.cache.localcache import LocalCache
+from ggrc.cache.memcache import LocalMemcacheClient
+
+
+class TestLocalCache(unittest.TestCase):
+  """Tests for LocalCache bounds, expiration and statistics."""
+
+  def setUp(self):
+    self.cache = LocalCache(max_entries=3, max_bytes=10000, ttl=10)
+
+  def test_returns_copies(self):
+    """Test that modifying returned values does not change the cache."""
+    self.cache.add_multi({"collection:controls:1": {"title": "a"}})
+    value = self.cache.get_multi(["collection:controls:1"])
+    value["collection:controls:1"]["title"] = "b"
+    self.assertEqual(self.cache.get_multi(["collection:controls:1"]),
+                     {"collection:controls:1": {"title": "a"}})
+
+  def test_least_recently_used_eviction(self):
+    """Test that least recently used entries are evicted first."""
+    self.cache.add_multi({"collection:controls:{}".format(i): i
+                          for i in range(3)})
+    self.cache.get_multi(["collection:controls:0"])
+    self.cache.add_multi({"collection:controls:3": 3})
+    self.assertEqual(
+        sorted(self.cache.get_multi(
+            ["collection:controls:{}".format(i) for i in range(4)])),
+        ["collection:controls:0", "collection:controls:2",
+         "collection:controls:3"],
+    )
+
+  def test_size_bound(self):
+    """Test that the total size of entries is bounded."""
+    cache = LocalCache(max_entries=100, max_bytes=2500, ttl=10)
+    cache.add_multi({"a": "x" * 1000})
+    cache.add_multi({"b": "x" * 1000})
+    cache.add_multi({"c": "x" * 1000})
+    self.assertEqual(sorted(cache.get_multi(["a", "b", "c"])), ["b", "c"])
+    self.assertEqual(cache.add_multi({"d": "x" * 3000}), ["d"])
+
+  def test_expiration(self):
+    """Test that expired entries are not returned."""
+    with mock.patch("ggrc.cache.localcache.time.time", return_value=100):
+      self.cache.add_multi({"collection:controls:1": 1})
+    with mock.patch("ggrc.cache.localcache.time.time", return_value=111):
+      self.assertEqual(self.cache.get_multi(["collection:controls:1"]), {})
+    self.assertEqual(self.cache.size, 0)
+
+  def test_remove(self):
+    """Test removing invalidated keys."""
+    self.cache.add_multi({"collection:controls:1": 1,
+                          "collection:controls:2": 2})
+    self.cache.remove_multi(["collection:controls:1", "collection:other:5"])
+    self.assertEqual(
+        self.cache.get_multi(["collection:controls:1",
+                              "collection:controls:2"]),
+        {"collection:controls:2": 2},
+    )
+
+  def test_stats(self):
+    """Test hit ratios per resource type."""
+    self.cache.add_multi({"collection:controls:1": 1})
+    self.cache.get_multi(["collection:controls:1", "collection:controls:2",
+                          "collection:programs:1"])
+    stats = self.cache.get_stats()
+    self.assertEqual(stats["controls"],
+                     {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+    self.assertEqual(stats["programs"],
+                     {"misses": 1, "hit_ratio": 0.0})
+
+  def test_invalidation_by_other_instance(self):
+    """Test that entries invalidated by another instance are discarded."""
+    memcache_client = LocalMemcacheClient()
+    memcache_client.flush_all()
+    self.addCleanup(memcache_client.flush_all)
+    other_cache = LocalCache(max_entries=3, max_bytes=10000, ttl=10)
+    keys = ["collection:controls:1", "collection:programs:1"]
+
+    generations = self.cache.get_generations(memcache_client, keys)
+    self.cache.add_multi({key: 1 for key in keys}, generations=generations)
+    self.assertEqual(self.cache.get_multi(keys, generations),
+                     {key: 1 for key in keys})
+
+    other_cache.invalidate(memcache_client, ["collection:controls:1"])
+
+    generations = self.cache.get_generations(memcache_client, keys)
+    self.assertEqual(self.cache.get_multi(keys, generations),
+                     {"collection:programs:1": 1})
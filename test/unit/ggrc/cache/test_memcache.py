@@ -0,0 +1,64 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for multi key MemCache operations."""
+
+import unittest
+
+from ggrc.cache.cachemanager import CacheManager
+from ggrc.cache.memcache import LocalMemcacheClient
+from ggrc.cache.memcache import MemCache
+
+
+class TestMemCache(unittest.TestCase):
+  """Tests for MemCache with the local memcache stand-in."""
+
+  def setUp(self):
+    client = LocalMemcacheClient()
+    client.flush_all()
+    self.cache = MemCache(client)
+    self.manager = CacheManager()
+    self.manager.initialize(self.cache)
+    self.cache.add("collection", "controls", {
+        1: {"id": 1, "title": "a"},
+        2: {"id": 2, "title": "b"},
+    })
+
+  def test_partial_hits(self):
+    """Test that ids found in cache are returned when others are missing."""
+    data = self.cache.get("collection", "controls",
+                          {"ids": [1, 2, 3], "attrs": ["title"]})
+    self.assertEqual(data, {1: {"title": "a"}, 2: {"title": "b"}})
+
+  def test_add_existing(self):
+    """Test that adding existing entries replaces them."""
+    stored = self.cache.add("collection", "controls", {
+        2: {"id": 2, "title": "c"},
+        3: {"id": 3, "title": "d"},
+    })
+    self.assertEqual(sorted(stored), [2, 3])
+    data = self.cache.get("collection", "controls", {"ids": [2, 3]})
+    self.assertEqual([value["title"] for value in data.values()], ["c", "d"])
+
+  def test_update_missing(self):
+    """Test that updates skip entries that are not in cache."""
+    updated = self.cache.update("collection", "controls", {
+        1: {"id": 1, "title": "e"},
+        4: {"id": 4, "title": "f"},
+    }, 0)
+    self.assertEqual(updated.keys(), [1])
+    self.assertEqual(
+        self.cache.get("collection", "controls", {"ids": [1, 4]}),
+        {1: {"id": 1, "title": "e"}},
+    )
+
+  def test_bulk_operations(self):
+    """Test cache manager bulk operations with partial hits."""
+    keys = ["collection:controls:1", "collection:controls:5"]
+    self.assertEqual(self.manager.bulk_get(keys).keys(), keys[:1])
+    self.assertEqual(
+        self.manager.bulk_update({key: {"title": "g"} for key in keys}), [])
+    self.assertEqual(self.manager.bulk_get(keys),
+                     {keys[0]: {"id": 1, "title": "g"}})
+    self.assertTrue(self.manager.bulk_delete(keys, 0))
+    self.assertEqual(self.manager.bulk_get(keys), {})
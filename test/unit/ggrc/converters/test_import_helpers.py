@@ -16,6 +16,18 @@ from ggrc.converters import import_helper
 from ggrc.converters.column_handlers import model_column_handlers
 
 
+class TestGenerateCsvLines(unittest.TestCase):
+  """Tests for streaming csv lines."""
+
+  def test_lines(self):
+    """Every row is encoded into a separate csv line."""
+    rows = [[u"a", u"b,c"], [u"\u5555"], []]
+    self.assertEqual(
+        list(import_helper.generate_csv_lines(rows)),
+        ["a,\"b,c\"\r\n", u"\u5555\r\n".encode("utf-8"), "\r\n"],
+    )
+
+
 class TestSplitArry(unittest.TestCase):
   """Class for testing the split array function
   """
@@ -0,0 +1,53 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for custom ORM data types."""
+
+import pickle
+import unittest
+
+from ggrc.models.types import CompressedType
+
+
+class TestCompressedType(unittest.TestCase):
+  """Tests for storing values with CompressedType."""
+
+  def setUp(self):
+    self.type_ = CompressedType()
+    self.value = {
+        "content": u"Object type,\nPolicy,Code*,Title*\n" * 100,
+        "status_code": 200,
+        "headers": [["Content-Type", "text/csv"]],
+    }
+
+  def test_round_trip(self):
+    """Test that stored values are read back unchanged."""
+    stored = self.type_.process_bind_param(self.value, None)
+    self.assertEqual(self.type_.process_result_value(stored, None),
+                     self.value)
+
+  def test_compressed_with_header(self):
+    """Test that values are stored compressed with a version header."""
+    stored = self.type_.process_bind_param(self.value, None)
+    self.assertTrue(stored.startswith(CompressedType.MAGIC))
+    self.assertEqual(ord(stored[len(CompressedType.MAGIC)]),
+                     CompressedType.VERSION)
+    self.assertLess(len(stored), len(pickle.dumps(self.value)) / 10)
+
+  def test_legacy_pickle(self):
+    """Test reading values stored as pickles by older versions."""
+    for protocol in (0, pickle.HIGHEST_PROTOCOL):
+      stored = pickle.dumps(self.value, protocol)
+      self.assertEqual(self.type_.process_result_value(stored, None),
+                       self.value)
+
+  def test_unknown_version(self):
+    """Test that values of unknown format versions are not guessed."""
+    stored = CompressedType.MAGIC + chr(CompressedType.VERSION + 1) + "data"
+    with self.assertRaises(ValueError):
+      self.type_.process_result_value(stored, None)
+
+  def test_none(self):
+    """Test that None is stored as NULL."""
+    self.assertIsNone(self.type_.process_bind_param(None, None))
+    self.assertIsNone(self.type_.process_result_value(None, None))
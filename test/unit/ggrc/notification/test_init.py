@@ -4,6 +4,7 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 import unittest
+from mock import Mock
 from mock import patch
 
 from ggrc import app  # noqa
@@ -12,6 +13,8 @@ from ggrc.notifications import common
 
 class TestNotificationsInit(unittest.TestCase):
 
+  @patch("ggrc.notifications.common.load_people")
+  @patch("ggrc.notifications.common.get_service_data")
   @patch("ggrc.notifications.common.deleted_task_rels_cache")
   @patch("ggrc.notifications.common.cycle_tasks_cache")
   @patch("ggrc.notifications.common.get_filter_data")
@@ -19,6 +22,8 @@ class TestNotificationsInit(unittest.TestCase):
     """ Test that data does not contain empty emails """
     for cache_func in cache_mocks:
       cache_func.return_value = {}
+    get_service_data = cache_mocks[2]
+    get_service_data.return_value = [(1, {}), (2, {})]
 
     get_filter_data.return_value = {
         "email@example.com": {},
@@ -27,3 +32,72 @@ class TestNotificationsInit(unittest.TestCase):
     notification_data = common.get_notification_data([1, 2])
     self.assertIn("email@example.com", notification_data)
     self.assertNotIn("", notification_data)
+
+  @patch("ggrc.notifications.common.load_people")
+  @patch("ggrc.notifications.common.get_service_data")
+  @patch("ggrc.notifications.common.deleted_task_rels_cache")
+  @patch("ggrc.notifications.common.cycle_tasks_cache")
+  def test_people_loaded_once(self, tasks_cache, rels_cache, get_service_data,
+                              load_people):
+    """ Test that recipients of all notifications are loaded at once """
+    tasks_cache.return_value = {}
+    rels_cache.return_value = {}
+    notifications = [Mock(id=1), Mock(id=2)]
+    get_service_data.return_value = [
+        (notifications[0], {"a@example.com": {"user": {"id": 1}}}),
+        (notifications[1], {"a@example.com": {"user": {"id": 1}},
+                            "b@example.com": {"user": {"id": 2}}}),
+    ]
+    load_people.return_value = {
+        1: Mock(system_wide_role="Reader", notification_configs=[]),
+        2: Mock(system_wide_role="No Access", notification_configs=[]),
+    }
+
+    notification_data = common.get_notification_data(notifications)
+
+    self.assertEqual(load_people.call_count, 1)
+    self.assertEqual(sorted(load_people.call_args[0][0]), [1, 1, 2])
+    self.assertEqual(notification_data.keys(), ["a@example.com"])
+
+
+  @patch("ggrc.notifications.common.Services.get_batch_service_function")
+  @patch("ggrc.notifications.common.prefetch_notification_objects")
+  def test_service_called_once_per_type(self, prefetch, get_batch_service):
+    """ Test that batch services are called once per object type """
+    assessments = [Mock(id=1), Mock(id=2)]
+    comments = [Mock(id=3)]
+    prefetch.return_value = {"Assessment": assessments, "Comment": comments}
+    service = Mock(side_effect=lambda notifs: [
+        {"id": notif.id} for notif in notifs])
+    get_batch_service.return_value = service
+
+    service_data = common.get_service_data(assessments + comments)
+
+    self.assertEqual(service.call_count, 2)
+    self.assertEqual(
+        sorted((notif.id, data["id"]) for notif, data in service_data),
+        [(1, 1), (2, 2), (3, 3)],
+    )
+
+
+class TestMapInThreads(unittest.TestCase):
+  """ Tests for calling functions in a pool of threads """
+
+  def test_results_in_order(self):
+    """ Test that results are returned in the order of items """
+    items = range(50)
+    for workers in (1, 4):
+      self.assertEqual(
+          common.map_in_threads(lambda item: item * 2, items, workers),
+          [item * 2 for item in items],
+      )
+
+  def test_errors_are_raised(self):
+    """ Test that errors in worker threads are raised in the caller """
+    def function(item):
+      if item == 3:
+        raise ValueError(item)
+      return item
+
+    with self.assertRaises(ValueError):
+      common.map_in_threads(function, range(10), 4)
@@ -0,0 +1,164 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for dependency tracking of cached user permissions."""
+
+import unittest
+
+import mock
+
+from ggrc.rbac import permission_cache
+
+
+class FakeMemcacheClient(object):
+  """Dict backed client with the memcache calls used by the cache."""
+
+  def __init__(self):
+    self.data = {}
+
+  def get(self, key):
+    return self.data.get(key)
+
+  def set(self, key, value, time=0):  # pylint: disable=unused-argument
+    self.data[key] = value
+
+  def get_multi(self, keys, for_cas=False):  # pylint: disable=unused-argument
+    return {key: self.data[key] for key in keys if key in self.data}
+
+  def add_multi(self, mapping, time=0):  # pylint: disable=unused-argument
+    failed = [key for key in mapping if key in self.data]
+    self.data.update((key, value) for key, value in mapping.items()
+                     if key not in failed)
+    return failed
+
+  def cas_multi(self, mapping, time=0):  # pylint: disable=unused-argument
+    self.data.update(mapping)
+    return []
+
+  def incr(self, key, delta=1, initial_value=None):
+    self.data[key] = self.data.get(key, initial_value) + delta
+    return self.data[key]
+
+  def delete_multi(self, keys):
+    for key in keys:
+      self.data.pop(key, None)
+
+
+def _make_object(type_, **attrs):
+  """Get an object of a class with the given name and attributes."""
+  return type(type_, (object,), attrs)()
+
+
+@mock.patch("ggrc.rbac.permission_cache._get_history_values",
+            lambda obj, names: [[getattr(obj, name)] for name in names])
+class TestPermissionCache(unittest.TestCase):
+  """Tests for fine grained permission cache invalidation."""
+
+  def setUp(self):
+    self.cache = FakeMemcacheClient()
+    self._store(1, {
+        permission_cache.person_dependency(1),
+        permission_cache.object_dependency("Program", 5),
+    })
+    self._store(2, {
+        permission_cache.person_dependency(2),
+        permission_cache.context_dependency(None),
+    })
+
+  def _store(self, user_id, dependencies):
+    """Load and store permissions of a user."""
+    _, generations = permission_cache.get_cached_permissions(self.cache,
+                                                             user_id)
+    return permission_cache.store(self.cache, user_id, {"read": {}},
+                                  dependencies, generations)
+
+  def _get(self, user_id):
+    """Get cached permissions of a user."""
+    permissions, _ = permission_cache.get_cached_permissions(self.cache,
+                                                             user_id)
+    return permissions
+
+  def test_invalidate_dependent_users(self):
+    """Test that only permissions of dependent users are invalidated."""
+    relationship = _make_object(
+        "Relationship", source_type="Program", source_id=5,
+        destination_type="Control", destination_id=3)
+    dependencies = permission_cache.get_changed_dependencies([relationship])
+    permission_cache.invalidate(self.cache, dependencies)
+
+    self.assertIsNone(self._get(1))
+    self.assertEqual(self._get(2), {"read": {}})
+    self.assertEqual(permission_cache.get_stats(self.cache)["invalidations"],
+                     1)
+
+  def test_person_models(self):
+    """Test invalidation of people whose roles or acl entries changed."""
+    objects = [
+        _make_object("UserRole", person_id=2),
+        _make_object("AccessControlList", person_id=7),
+    ]
+    permission_cache.invalidate(
+        self.cache, permission_cache.get_changed_dependencies(objects))
+
+    self.assertEqual(self._get(1), {"read": {}})
+    self.assertIsNone(self._get(2))
+
+  def test_global_models(self):
+    """Test that role definition changes invalidate all cached permissions."""
+    role = _make_object("Role", name="Reader")
+    dependencies = permission_cache.get_changed_dependencies([role])
+    self.assertIsNone(dependencies)
+    permission_cache.invalidate(self.cache, dependencies)
+
+    self.assertIsNone(self._get(1))
+    self.assertIsNone(self._get(2))
+
+  def test_unrelated_objects(self):
+    """Test that changes of unrelated objects keep cached permissions."""
+    control = _make_object("Control", id=3)
+    permission_cache.invalidate(
+        self.cache, permission_cache.get_changed_dependencies([control]))
+
+    self.assertEqual(self._get(1), {"read": {}})
+    self.assertEqual(self._get(2), {"read": {}})
+
+  def test_stats(self):
+    """Test hit ratio computed from hit and miss counters."""
+    permission_cache.record(self.cache, "hits", 3)
+    permission_cache.record(self.cache, "misses")
+    stats = permission_cache.get_stats(self.cache)
+    self.assertEqual(stats["hits"], 3)
+    self.assertEqual(stats["misses"], 1)
+    self.assertEqual(stats["hit_ratio"], 0.75)
+
+  def test_concurrent_invalidation(self):
+    """Test that permissions whose inputs were invalidated while they were
+    loaded are not stored."""
+    dependencies = {permission_cache.object_dependency("Control", 3)}
+    _, generations = permission_cache.get_cached_permissions(self.cache, 3)
+    relationship = _make_object(
+        "Relationship", source_type="Program", source_id=6,
+        destination_type="Control", destination_id=3)
+    permission_cache.invalidate(
+        self.cache, permission_cache.get_changed_dependencies([relationship]))
+
+    self.assertFalse(permission_cache.store(
+        self.cache, 3, {"read": {}}, dependencies, generations))
+    self.assertIsNone(self._get(3))
+    self.assertTrue(self._store(3, dependencies))
+    self.assertEqual(self._get(3), {"read": {}})
+
+  @mock.patch("ggrc.rbac.permission_cache._get_relationship_dependencies")
+  def test_relationship_attrs(self, get_relationship_dependencies):
+    """Test invalidation of users whose assignee roles changed."""
+    get_relationship_dependencies.return_value = {
+        permission_cache.object_dependency("Program", 5),
+        permission_cache.object_dependency("Person", 8),
+    }
+    attr = _make_object("RelationshipAttr", relationship_id=4)
+    permission_cache.invalidate(
+        self.cache, permission_cache.get_changed_dependencies([attr]))
+
+    get_relationship_dependencies.assert_called_once_with({4})
+    self.assertIsNone(self._get(1))
+    self.assertEqual(self._get(2), {"read": {}})
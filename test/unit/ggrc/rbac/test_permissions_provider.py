@@ -0,0 +1,64 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for compiled user permissions."""
+
+import json
+import unittest
+
+from ggrc.rbac.permissions_provider import CompiledPermissions
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+
+
+class TestCompiledPermissions(unittest.TestCase):
+  """Tests for permission lookups on compiled permissions."""
+
+  def setUp(self):
+    self.permissions = {
+        "__user": "user@example.com",
+        "read": {
+            "Program": {
+                "contexts": [3, 4],
+                "resources": [10, 11],
+            },
+            "Control": {
+                "contexts": [None],
+                "conditions": {
+                    None: [{"condition": "is", "terms": {"value": 1}}],
+                },
+            },
+            "Market": {},
+        },
+    }
+    self.compiled = CompiledPermissions(
+        self.permissions, DefaultUserPermissions.ADMIN_PERMISSION)
+
+  def test_entries(self):
+    """Test that contexts and resources are compiled into frozensets."""
+    entry = self.compiled.get("read", "Program")
+    self.assertEqual(entry.contexts, frozenset([3, 4]))
+    self.assertEqual(entry.resources, frozenset([10, 11]))
+    self.assertEqual(self.compiled.get("read", "Control").conditions,
+                     {None: (("is", {"value": 1}),)})
+
+  def test_missing_entries(self):
+    """Test lookups of actions and types without permissions."""
+    self.assertFalse(self.compiled.has("update", "Program"))
+    self.assertFalse(self.compiled.has("read", "Market"))
+    self.assertEqual(self.compiled.get("read", "Market").contexts,
+                     frozenset())
+
+  def test_admin(self):
+    """Test precomputed admin flag."""
+    self.assertFalse(self.compiled.is_admin)
+    admin = CompiledPermissions(
+        {"__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}}},
+        DefaultUserPermissions.ADMIN_PERMISSION)
+    self.assertTrue(admin.is_admin)
+    self.assertEqual(admin.admin_conditions, ())
+
+  def test_source_unchanged(self):
+    """Test that the source dict is kept serializable and unchanged."""
+    before = json.dumps(self.permissions, sort_keys=True)
+    self.assertIs(self.compiled.source, self.permissions)
+    self.assertEqual(json.dumps(self.compiled.source, sort_keys=True), before)
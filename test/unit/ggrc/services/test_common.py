@@ -115,8 +115,8 @@ class TestGetRevisionsList(TestCase):
       action_list = []
       action_dict = collections.defaultdict(list)
       for result in self.get_log_revisions():
-        action_list.append(result.action)
-        action_dict[result.action].append(result.resource_id)
+        action_list.append(result["action"])
+        action_dict[result["action"]].append(result["resource_id"])
       self.assertEqual(self.build_expected_action_list(*values), action_list)
       self.assertEqual(sorted([i.id for i in cache_mock.new]),
                        sorted(action_dict['created']))
@@ -149,7 +149,8 @@ class TestGetRevisionsList(TestCase):
     with self.mock_get_cache(new, deleted, dirty):
       self.assertEqual(
           expected_results,
-          [r.action for r in self.get_log_revisions(self.new_simple_object)])
+          [r["action"] for r in
+           self.get_log_revisions(self.new_simple_object)])
 
   @data(
       # (created_count, modified_count, deleted_count,
@@ -172,4 +173,4 @@ class TestGetRevisionsList(TestCase):
     with self.mock_get_cache(new, deleted, dirty):
       self.assertEqual(
           expected_results,
-          [r.action for r in self.get_log_revisions(dirty[0])])
+          [r["action"] for r in self.get_log_revisions(dirty[0])])
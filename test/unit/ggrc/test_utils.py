@@ -155,3 +155,9 @@ class TestUtilsFunctions(unittest.TestCase):
     self.assertEqual(utils.iso_to_us_date("2002-07-11"), "07/11/2002")
     with self.assertRaises(ValueError):
       utils.iso_to_us_date("1002-07-11")
+
+  def test_list_chunks(self):
+    """Test splitting a list into fixed size chunks."""
+    self.assertEqual(list(utils.list_chunks([1, 2, 3, 4, 5], 2)),
+                     [[1, 2], [3, 4], [5]])
+    self.assertEqual(list(utils.list_chunks([], 2)), [])
@@ -0,0 +1,69 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the precomputed workday calendar."""
+
+import unittest
+from datetime import date, datetime
+
+from ggrc_workflows.services.workflow_cycle_calculator import workday_calendar
+
+
+class TestWorkdayCalendar(unittest.TestCase):
+  """Tests for WorkdayCalendar queries."""
+
+  def setUp(self):
+    # Wednesday to Friday, New Year's Eve (Thursday) and New Year (Friday)
+    self.holidays = [date(2015, 6, 24), date(2015, 6, 25),
+                     date(2015, 6, 26), date(2015, 12, 31), date(2016, 1, 1)]
+    self.calendar = workday_calendar.WorkdayCalendar(self.holidays)
+
+  def test_is_work_day(self):
+    """Weekends and holidays are not workdays."""
+    self.assertTrue(self.calendar.is_work_day(date(2015, 6, 23)))
+    self.assertFalse(self.calendar.is_work_day(date(2015, 6, 24)))
+    self.assertFalse(self.calendar.is_work_day(date(2015, 6, 27)))
+    self.assertTrue(self.calendar.is_work_day(datetime(2015, 6, 29, 10)))
+
+  def test_previous_work_day(self):
+    """Previous workday skips weekends and holidays."""
+    self.assertEqual(self.calendar.previous_work_day(date(2015, 6, 23)),
+                     date(2015, 6, 23))
+    self.assertEqual(self.calendar.previous_work_day(date(2015, 6, 28)),
+                     date(2015, 6, 23))
+    self.assertEqual(self.calendar.previous_work_day(date(2016, 1, 3)),
+                     date(2015, 12, 30))
+    self.assertEqual(self.calendar.previous_work_day(datetime(2015, 6, 27, 8)),
+                     datetime(2015, 6, 23, 8))
+
+  def test_next_work_day(self):
+    """Next workday skips weekends and holidays across years."""
+    self.assertEqual(self.calendar.next_work_day(date(2015, 6, 24)),
+                     date(2015, 6, 29))
+    self.assertEqual(self.calendar.next_work_day(date(2015, 12, 31)),
+                     date(2016, 1, 4))
+    self.assertEqual(self.calendar.next_work_day(date(2016, 1, 2)),
+                     date(2016, 1, 4))
+
+  def test_add_work_days(self):
+    """Workdays are counted from the last workday on or before the date."""
+    self.assertEqual(self.calendar.add_work_days(date(2015, 6, 22), 2),
+                     date(2015, 6, 29))
+    self.assertEqual(self.calendar.add_work_days(date(2015, 6, 28), 1),
+                     date(2015, 6, 29))
+    self.assertEqual(self.calendar.add_work_days(date(2015, 6, 29), -1),
+                     date(2015, 6, 23))
+    self.assertEqual(self.calendar.add_work_days(date(2015, 6, 22), 0),
+                     date(2015, 6, 22))
+    self.assertEqual(self.calendar.add_work_days(date(2016, 1, 4), -1),
+                     date(2015, 12, 30))
+    # 2016 has 261 weekdays and a single holiday in this calendar
+    self.assertEqual(self.calendar.add_work_days(date(2015, 12, 30), 260),
+                     date(2016, 12, 30))
+
+  def test_shared_calendar(self):
+    """Calendars are shared by users of the same holidays object."""
+    calendar = workday_calendar.get_calendar(self.holidays)
+    self.assertIs(workday_calendar.get_calendar(self.holidays), calendar)
+    self.assertIsNot(workday_calendar.get_calendar(list(self.holidays)),
+                     calendar)